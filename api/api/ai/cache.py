@@ -0,0 +1,104 @@
+"""
+ChatAssistant response cache.
+api/api/ai/cache.py
+
+Answers are cached by normalized question, table path, schema hash and
+provider/model, so the same question about the same table schema is
+answered without calling the provider again. With AI_CACHE_URL the cache
+is shared through Redis (bound it with maxmemory + allkeys-lru), else
+each process keeps an LRU of AI_CACHE_MAX_ENTRIES. Workspaces can opt out
+with ai_cache_enabled.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import caches
+
+from api.datasets.models import Table
+from api.users.models import User
+
+HITS_KEY = "ai:chat:hits"
+MISSES_KEY = "ai:chat:misses"
+
+
+def get_cache():
+    return caches[settings.AI_CACHE_ALIAS]
+
+
+def normalize_message(msg: str) -> str:
+    """
+    Case, spacing and surrounding punctuation don't change the question:
+    "  Top 10 by sales?" and "top 10 by sales" share the cache entry.
+    """
+    msg = unicodedata.normalize("NFKC", msg).lower()
+    msg = re.sub(r"\s+", " ", msg)
+    return msg.strip(" ?¿!¡.")
+
+
+def schema_hash(schema) -> str:
+    return hashlib.sha256(
+        json.dumps(schema, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def cache_key(msg: str, table: Table, provider) -> str:
+    parts = [
+        normalize_message(msg),
+        table.path,
+        schema_hash(table.schema),
+        type(provider).__name__,
+        getattr(provider, "default_model", ""),
+    ]
+    digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+    return f"ai:chat:{digest}"
+
+
+def is_enabled(user: User) -> bool:
+    """Disabled globally by AI_CACHE_ENABLED or by a workspace of the user."""
+    from api.workspaces.models import Workspace
+
+    if not settings.AI_CACHE_ENABLED:
+        return False
+    return not Workspace.objects.filter(
+        memberships__user=user,
+        memberships__is_active=True,
+        deleted=False,
+        ai_cache_enabled=False,
+    ).exists()
+
+
+def _count(key: str) -> None:
+    cache = get_cache()
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between add and incr
+        cache.set(key, 1, None)
+
+
+def get(key: str) -> dict | None:
+    """Cached answer (explanation and query), counting hits and misses."""
+    value = get_cache().get(key)
+    _count(HITS_KEY if value is not None else MISSES_KEY)
+    return value
+
+
+def set(key: str, value: dict) -> None:
+    """Stores the answer unless it's bigger than AI_CACHE_MAX_ENTRY_SIZE."""
+    if len(json.dumps(value)) <= settings.AI_CACHE_MAX_ENTRY_SIZE:
+        get_cache().set(key, value, settings.AI_CACHE_TIMEOUT)
+
+
+def stats() -> dict:
+    cache = get_cache()
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return dict(hits=hits, misses=misses, hit_rate=hits / total if total else 0.0)
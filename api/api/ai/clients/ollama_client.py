@@ -3,16 +3,31 @@ Canonical Ollama client.
 api/api/ai/clients/ollama_client.py
 
 Single source of truth — providers.py and any other module imports from here.
-Uses requests with explicit timeouts. Streams disabled for simplicity;
-enable streaming only via Celery tasks, not inside the request cycle.
+Requests go through the shared pooled session (api/utils/http.py) with
+explicit timeouts; generation POSTs are never retried. Stream only from
+Celery tasks (ai.run_chat), not inside the request cycle.
+
+An Ollama server generates one answer at a time per loaded model, so
+generations take one of OLLAMA_MAX_CONCURRENCY slots per server and wait
+at most OLLAMA_QUEUE_TIMEOUT seconds for it, instead of piling up on the
+server until they time out. Requests carry keep_alive=OLLAMA_KEEP_ALIVE
+so the model stays loaded between them.
 """
 
 from __future__ import annotations
 
+import json
 import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
 
 import requests
+from django.conf import settings
+
+from api.utils import http
 
 logger = logging.getLogger(__name__)
 
@@ -21,12 +36,92 @@ _OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3")
 _OLLAMA_TIMEOUT = int(os.environ.get("OLLAMA_TIMEOUT_SECONDS", "120"))
 
 
+class OllamaClientError(Exception):
+    """Base exception for all Ollama client errors."""
+
+
+class OllamaConnectionError(OllamaClientError):
+    """Raised when the Ollama server is unreachable."""
+
+
+class OllamaBusyError(OllamaClientError):
+    """Raised when no generation slot frees up within OLLAMA_QUEUE_TIMEOUT."""
+
+
+class _Slots:
+    """Generation slots of one Ollama server and their queue-time metrics."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    @contextmanager
+    def take(self, timeout: float):
+        start = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        acquired = self._semaphore.acquire(timeout=timeout)
+        waited = time.monotonic() - start
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self.rejected += 1
+            else:
+                self.in_flight += 1
+                self.acquired += 1
+                self.queue_time_total += waited
+                self.queue_time_max = max(self.queue_time_max, waited)
+        if not acquired:
+            raise OllamaBusyError(
+                f"No Ollama generation slot freed up within {timeout}s."
+            )
+        if waited > 1:
+            logger.info("Ollama request queued for %.1fs", waited)
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                size=self.size,
+                in_flight=self.in_flight,
+                waiting=self.waiting,
+                acquired=self.acquired,
+                rejected=self.rejected,
+                queue_time_avg_ms=round(
+                    (
+                        self.queue_time_total / self.acquired * 1000
+                        if self.acquired
+                        else 0
+                    ),
+                    2,
+                ),
+                queue_time_max_ms=round(self.queue_time_max * 1000, 2),
+            )
+
+
 class OllamaClient:
     """
-    Thin, stateless wrapper around the Ollama /api/generate endpoint.
-    Instantiated once per provider instance (see providers.py singleton).
+    Thin wrapper around the Ollama /api/generate endpoint.
+    Instantiated once per provider instance (see providers.py singleton);
+    generation slots are shared by every client of the same server.
     """
 
+    _slots: dict[str, _Slots] = {}
+    _slots_lock = threading.Lock()
+
     def __init__(
         self,
         base_url: str = _OLLAMA_BASE_URL,
@@ -37,19 +132,113 @@ class OllamaClient:
         self.model = model
         self.timeout = timeout
 
-    def complete(self, prompt: str, **kwargs) -> str:
-        """
-        Send a prompt and return the full response string.
-        Raises requests.HTTPError on non-2xx responses.
-        """
+    @classmethod
+    def slots(cls, base_url: str) -> _Slots:
+        with cls._slots_lock:
+            if base_url not in cls._slots:
+                cls._slots[base_url] = _Slots(settings.OLLAMA_MAX_CONCURRENCY)
+            return cls._slots[base_url]
+
+    @classmethod
+    def queue_stats(cls) -> dict:
+        """Slot usage and queue times by server, for health/details/."""
+        with cls._slots_lock:
+            slots = dict(cls._slots)
+        return {base_url: s.stats() for base_url, s in slots.items()}
+
+    def _payload(self, prompt: str, stream: bool, kwargs: dict) -> dict:
         payload = {
             "model": kwargs.get("model", self.model),
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
         }
+        options = {k: v for k, v in kwargs.items() if k != "model"}
+        if options:
+            payload["options"] = options
+        return payload
+
+    @contextmanager
+    def _generate(self, payload: dict, stream: bool):
+        """
+        POSTs to /api/generate holding a generation slot, which is only
+        released once the response (or stream) is closed.
+        """
         url = f"{self.base_url}/api/generate"
         logger.debug("Ollama request: model=%s url=%s", payload["model"], url)
 
-        response = requests.post(url, json=payload, timeout=self.timeout)
-        response.raise_for_status()
-        return response.json().get("response", "")
+        with self.slots(self.base_url).take(settings.OLLAMA_QUEUE_TIMEOUT):
+            try:
+                with http.post(
+                    url,
+                    json=payload,
+                    stream=stream,
+                    timeout=(settings.HTTP_CONNECT_TIMEOUT, self.timeout),
+                ) as response:
+                    response.raise_for_status()
+                    yield response
+            except requests.exceptions.ConnectionError as exc:
+                raise OllamaConnectionError(
+                    "Cannot reach Ollama server. Is ollama serve running?"
+                ) from exc
+            except requests.exceptions.Timeout as exc:
+                raise OllamaClientError(
+                    f"Ollama request timed out after {self.timeout}s."
+                ) from exc
+            except requests.exceptions.HTTPError as exc:
+                raise OllamaClientError(f"Ollama HTTP error: {exc}") from exc
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        """
+        Send a prompt and return the full response string.
+        Raises OllamaClientError (OllamaConnectionError, OllamaBusyError)
+        on failures.
+        """
+        payload = self._payload(prompt, False, kwargs)
+        with self._generate(payload, stream=False) as response:
+            return response.json().get("response", "")
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Send a prompt and yield the response as Ollama generates it, from
+        the newline delimited JSON chunks of /api/generate. The slot is
+        held until the generator is exhausted or closed.
+        """
+        payload = self._payload(prompt, True, kwargs)
+        with self._generate(payload, stream=True) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise OllamaClientError(f"Ollama error: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    return
+
+    def health_check(self) -> dict:
+        """Whether the server answers and has the model pulled."""
+        try:
+            response = http.get(f"{self.base_url}/api/tags", timeout=5)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            return {
+                "status": "error",
+                "model_available": False,
+                "error": "Ollama server unreachable.",
+            }
+
+        models = [m["name"] for m in response.json().get("models", [])]
+        model_available = any(
+            m == self.model or m.startswith(f"{self.model}:") for m in models
+        )
+        return {
+            "status": "ok",
+            "model_available": model_available,
+            "error": (
+                None
+                if model_available
+                else f"Model not pulled. Run: ollama pull {self.model}"
+            ),
+        }
@@ -0,0 +1,108 @@
+"""
+Table context of the ChatAssistant prompts.
+api/api/ai/context.py
+
+Schemas are rendered one column per line as path:TYPE, nested RECORD
+fields by their dotted path (items.sku:STRING) and REPEATED ones as
+ARRAY<TYPE>. Tables wider than AI_CONTEXT_MAX_COLUMNS only keep the
+columns closest to the question (shared words, accents and case aside)
+and then the leading ones, so the prompt doesn't grow with the table.
+The rendered columns are cached by table and modification time.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from django.conf import settings
+
+from api.datasets.models import Table
+from . import cache as chat_cache
+
+MIN_PREFIX = 4
+
+
+def words(text: str) -> list[str]:
+    """Lowercase words without accents, identifiers split at _ . and camelCase."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _type(field: dict) -> str:
+    data_type = field.get("data_type", "STRING").upper()
+    if field.get("mode") == "REPEATED":
+        return f"ARRAY<{data_type}>"
+    return data_type
+
+
+def flatten(schema: list | None, prefix: str = "") -> list[tuple[str, str]]:
+    """(path, type) of every column, RECORD fields after their parent."""
+    columns = []
+    for field in schema or []:
+        path = f"{prefix}{field['column_name']}"
+        columns.append((path, _type(field)))
+        columns += flatten(field.get("fields"), f"{path}.")
+    return columns
+
+
+def columns(table: Table) -> list[tuple[str, str]]:
+    # every save bumps modified, a cheaper version of the schema than its hash
+    if table.pk is None or table.modified is None:
+        return flatten(table.schema)
+    key = f"ai:context:{table.pk}:{table.modified.isoformat()}"
+    cache = chat_cache.get_cache()
+    cached = cache.get(key)
+    if cached is None:
+        cached = flatten(table.schema)
+        cache.set(key, cached, settings.AI_CACHE_TIMEOUT)
+    return [tuple(column) for column in cached]
+
+
+def _matches(word: str, other: str) -> bool:
+    # prefixes so "ventas" meets "venta" and "region" meets "regiones"
+    if word == other:
+        return True
+    short, long = sorted([word, other], key=len)
+    return len(short) >= MIN_PREFIX and long.startswith(short)
+
+
+def score(path: str, question: list[str]) -> int:
+    """Words of the question found in the column path."""
+    return sum(any(_matches(w, q) for q in question) for w in set(words(path)))
+
+
+def prune(columns: list[tuple[str, str]], msg: str, limit: int) -> list:
+    """
+    Up to limit columns, the most related to the question first and then
+    in table order, returned in table order. The parents of kept RECORD
+    fields are kept too, so repeated records are seen as arrays.
+    """
+    if len(columns) <= limit:
+        return columns
+
+    question = words(msg)
+    ranked = sorted(
+        range(len(columns)),
+        key=lambda idx: (-score(columns[idx][0], question), idx),
+    )
+    kept = set(ranked[:limit])
+    paths = {columns[idx][0]: idx for idx in range(len(columns))}
+    for idx in list(kept):
+        parts = columns[idx][0].split(".")
+        for end in range(1, len(parts)):
+            parent = paths.get(".".join(parts[:end]))
+            if parent is not None:
+                kept.add(parent)
+    return [columns[idx] for idx in sorted(kept)]
+
+
+def build(table: Table, msg: str) -> str:
+    every = columns(table)
+    kept = prune(every, msg, settings.AI_CONTEXT_MAX_COLUMNS)
+    lines = [f"table_id = {table.path}", "columns (name:type):"]
+    lines += [f"{path}:{data_type}" for path, data_type in kept]
+    if len(kept) < len(every):
+        lines.append(f"({len(every) - len(kept)} more columns not shown)")
+    return "\n".join(lines)
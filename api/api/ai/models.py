@@ -0,0 +1,26 @@
+from django.db import models
+
+from api.ai.enums import ChatJobStatus
+from api.datasets.models import Table
+from api.users.models import User
+from api.utils.models import BaseModel
+
+
+class ChatJob(BaseModel):
+    """Chat request answered in the background by the ai.run_chat task."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_jobs")
+    table = models.ForeignKey(
+        Table, on_delete=models.SET_NULL, null=True, related_name="chat_jobs"
+    )
+    msg = models.TextField()
+    status = models.CharField(
+        max_length=10, choices=ChatJobStatus.choices, default=ChatJobStatus.PENDING
+    )
+    explanation = models.TextField(null=True, blank=True)
+    query = models.TextField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.msg[:50]}"
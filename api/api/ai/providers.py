@@ -4,7 +4,10 @@ api/api/ai/providers.py
 
 Responsibilities:
   - Define the AIProvider protocol (structural interface).
-  - Implement OpenAI and Ollama providers.
+  - Implement OpenAI, Anthropic, Groq and Ollama providers, each with an
+    optional stream() yielding the answer as it is generated.
+  - Implement RouterProvider, which spreads requests over several of them
+    with failover, circuit breaking and hedging (AI_PROVIDER=router).
   - Expose get_provider() which returns a module-level singleton —
     one client instance per process, not one per request.
 
@@ -18,7 +21,11 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Protocol, runtime_checkable
+import queue
+import threading
+import time
+from collections import deque
+from typing import Iterator, Protocol, runtime_checkable
 
 logger = logging.getLogger(__name__)
 
@@ -33,12 +40,33 @@ class AIProvider(Protocol):
     """
     Every provider must implement complete().
     system is optional; not all backends support system prompts natively.
+    Providers that can stream also implement
+    stream(prompt, *, system="", **kwargs) -> Iterator[str], yielding text
+    deltas; callers fall back to complete() when it's missing.
     """
 
     def complete(self, prompt: str, *, system: str = "", **kwargs) -> str: ...
 
 
+def _chat_messages(prompt: str, system: str) -> list[dict]:
+    """Messages of the OpenAI compatible chat completions APIs."""
+    messages: list[dict] = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _stream_chat_completion(client, model: str, messages: list[dict]) -> Iterator[str]:
+    stream = client.chat.completions.create(model=model, messages=messages, stream=True)
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
 class OpenAIProvider:
+    default_model = "gpt-4o-mini"
+
     def __init__(self) -> None:
         import openai
         from django.conf import settings
@@ -47,19 +75,23 @@ class OpenAIProvider:
         logger.info("OpenAIProvider initialised")
 
     def complete(self, prompt: str, *, system: str = "", **kwargs) -> str:
-        messages: list[dict] = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
-
         completion = self._client.chat.completions.create(
-            model=kwargs.get("model", "gpt-4o-mini"),
-            messages=messages,
+            model=kwargs.get("model", self.default_model),
+            messages=_chat_messages(prompt, system),
         )
         return completion.choices[0].message.content or ""
 
+    def stream(self, prompt: str, *, system: str = "", **kwargs) -> Iterator[str]:
+        return _stream_chat_completion(
+            self._client,
+            kwargs.get("model", self.default_model),
+            _chat_messages(prompt, system),
+        )
+
 
 class AnthropicProvider:
+    default_model = "claude-sonnet-5"
+
     def __init__(self) -> None:
         import anthropic
         from django.conf import settings
@@ -67,22 +99,32 @@ class AnthropicProvider:
         self._client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
         logger.info("AnthropicProvider initialised")
 
-    def complete(self, prompt: str, *, system: str = "", **kwargs) -> str:
+    def _create_kwargs(self, prompt: str, system: str, kwargs: dict) -> dict:
         # NOTE: verify this default against current Anthropic docs before
         # deploying — model strings change and I am not fully certain this
         # is current. Safer to always pass model= explicitly at the call
         # site rather than rely on this default.
         create_kwargs = {
-            "model": kwargs.get("model", "claude-sonnet-5"),
+            "model": kwargs.get("model", self.default_model),
             "max_tokens": kwargs.get("max_tokens", 1024),
             "messages": [{"role": "user", "content": prompt}],
         }
         if system:
             create_kwargs["system"] = system
+        return create_kwargs
 
-        message = self._client.messages.create(**create_kwargs)
+    def complete(self, prompt: str, *, system: str = "", **kwargs) -> str:
+        message = self._client.messages.create(
+            **self._create_kwargs(prompt, system, kwargs)
+        )
         return "".join(block.text for block in message.content if block.type == "text")
 
+    def stream(self, prompt: str, *, system: str = "", **kwargs) -> Iterator[str]:
+        with self._client.messages.stream(
+            **self._create_kwargs(prompt, system, kwargs)
+        ) as stream:
+            yield from stream.text_stream
+
 
 class GroqProvider:
     """
@@ -93,6 +135,8 @@ class GroqProvider:
     (e.g. Llama, Mixtral) at no cost for moderate usage.
     """
 
+    default_model = "openai/gpt-oss-120b"
+
     def __init__(self) -> None:
         import openai
         from django.conf import settings
@@ -104,35 +148,336 @@ class GroqProvider:
         logger.info("GroqProvider initialised")
 
     def complete(self, prompt: str, *, system: str = "", **kwargs) -> str:
-        messages: list[dict] = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
-
         completion = self._client.chat.completions.create(
-            model=kwargs.get("model", "openai/gpt-oss-120b"),
-            messages=messages,
+            model=kwargs.get("model", self.default_model),
+            messages=_chat_messages(prompt, system),
         )
         return completion.choices[0].message.content or ""
 
+    def stream(self, prompt: str, *, system: str = "", **kwargs) -> Iterator[str]:
+        return _stream_chat_completion(
+            self._client,
+            kwargs.get("model", self.default_model),
+            _chat_messages(prompt, system),
+        )
+
 
 class OllamaProvider:
     def __init__(self) -> None:
         from api.ai.clients.ollama_client import OllamaClient
 
         self._client = OllamaClient()
+        self.default_model = self._client.model
         logger.info("OllamaProvider initialised (model=%s)", self._client.model)
 
     def complete(self, prompt: str, *, system: str = "", **kwargs) -> str:
         full_prompt = f"{system}\n\n{prompt}" if system else prompt
         return self._client.complete(full_prompt, **kwargs)
 
+    def stream(self, prompt: str, *, system: str = "", **kwargs) -> Iterator[str]:
+        full_prompt = f"{system}\n\n{prompt}" if system else prompt
+        return self._client.stream(full_prompt, **kwargs)
+
+
+class AIProviderUnavailableError(Exception):
+    """Raised when no routed provider could answer."""
+
+
+class _ProviderHealth:
+    """
+    Rolling latency and error rate of one routed provider and its circuit
+    breaker. The breaker opens after AI_ROUTER_FAILURE_THRESHOLD failures in
+    a row, or when AI_ROUTER_MAX_ERROR_RATE of the last requests failed;
+    after AI_ROUTER_COOLDOWN seconds a single trial request is let through
+    (half open), which closes it again or keeps it open.
+    """
+
+    MIN_REQUESTS = 10
+
+    def __init__(self, window: int) -> None:
+        self._samples: deque[tuple[float, bool]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial = False
+
+    def _state(self) -> str:
+        from django.conf import settings
+
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < settings.AI_ROUTER_COOLDOWN:
+            return "open"
+        return "half_open"
+
+    def _error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(not ok for _, ok in self._samples) / len(self._samples)
+
+    def _percentile(self, q: float) -> float | None:
+        latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def available(self) -> bool:
+        with self._lock:
+            state = self._state()
+            return state == "closed" or (state == "half_open" and not self.trial)
+
+    def acquire(self) -> bool:
+        """Whether a request may be sent now, taking the half open trial."""
+        with self._lock:
+            state = self._state()
+            if state == "half_open" and not self.trial:
+                self.trial = True
+                return True
+            return state == "closed"
+
+    def p95(self) -> float | None:
+        with self._lock:
+            return self._percentile(0.95)
+
+    def record(self, latency: float, ok: bool) -> None:
+        from django.conf import settings
+
+        with self._lock:
+            half_open = self._state() == "half_open"
+            self._samples.append((latency, ok))
+            self.trial = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+
+            self.failures += 1
+            if (
+                half_open
+                or self.failures >= settings.AI_ROUTER_FAILURE_THRESHOLD
+                or (
+                    len(self._samples) >= self.MIN_REQUESTS
+                    and self._error_rate() >= settings.AI_ROUTER_MAX_ERROR_RATE
+                )
+            ):
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            p50, p95 = self._percentile(0.5), self._percentile(0.95)
+            return dict(
+                state=self._state(),
+                requests=len(self._samples),
+                error_rate=round(self._error_rate(), 4),
+                p50_ms=round(p50 * 1000, 2) if p50 is not None else None,
+                p95_ms=round(p95 * 1000, 2) if p95 is not None else None,
+                consecutive_failures=self.failures,
+            )
+
+
+class _Attempt:
+    """
+    One provider answering in its own thread. Its deltas are put in the
+    router's event queue as (attempt, kind, value) with kind "delta", "done"
+    or "error"; once cancelled it stops reading the provider at the next
+    delta. Latency is the time to the first delta, which for complete() is
+    the whole answer.
+    """
+
+    def __init__(self, name: str, provider, health: _ProviderHealth, call, events):
+        self.name = name
+        self.provider = provider
+        self.health = health
+        self.cancelled = threading.Event()
+        self._call = call
+        self._events = events
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self) -> None:
+        start = time.monotonic()
+        latency = None
+        try:
+            for delta in self._call(self.provider):
+                if latency is None:
+                    latency = time.monotonic() - start
+                if self.cancelled.is_set():
+                    break
+                self._events.put((self, "delta", delta))
+        except Exception as exc:
+            self.health.record(time.monotonic() - start, ok=False)
+            self._events.put((self, "error", exc))
+            return
+
+        self.health.record(
+            latency if latency is not None else time.monotonic() - start, ok=True
+        )
+        self._events.put((self, "done", None))
+
+
+class RouterProvider:
+    """
+    Routes each request to the cheapest healthy provider of
+    AI_ROUTER_PROVIDERS (registry keys, cheapest first). Providers whose
+    breaker is open are skipped and those whose p95 latency is over
+    AI_ROUTER_SLOW_P95 seconds go last. A provider failing before its
+    first delta fails over to the next one, and a request without an
+    answer after AI_ROUTER_HEDGE_DELAY seconds is also sent to the next
+    one, keeping whichever answers first.
+
+    A provider that fails halfway through a stream raises: the deltas
+    already sent can't be taken back. The losing request of a hedge can't
+    be interrupted, it finishes in the background and only feeds the
+    metrics. model= is provider specific and isn't passed on.
+    """
+
+    def __init__(self, providers: dict | None = None) -> None:
+        from django.conf import settings
+
+        if providers is None:
+            providers = {}
+            for name in settings.AI_ROUTER_PROVIDERS:
+                if _PROVIDER_REGISTRY.get(name) is RouterProvider:
+                    # a router routing to itself would recurse forever
+                    raise AIProviderUnavailableError(
+                        f"AI_ROUTER_PROVIDERS can't include {name!r}."
+                    )
+                try:
+                    providers[name] = _PROVIDER_REGISTRY[name]()
+                except Exception:
+                    logger.exception("RouterProvider: %r unavailable", name)
+        if not providers:
+            raise AIProviderUnavailableError("AI_ROUTER_PROVIDERS is empty.")
+
+        self.providers = providers
+        self.health = {
+            name: _ProviderHealth(settings.AI_ROUTER_WINDOW) for name in providers
+        }
+        self.default_model = ",".join(
+            f"{name}:{getattr(p, 'default_model', '')}" for name, p in providers.items()
+        )
+        logger.info("RouterProvider initialised (%s)", ", ".join(providers))
+
+    def candidates(self) -> list[str]:
+        """
+        Available providers, fast ones first, then by cost: the order of
+        the providers (AI_ROUTER_PROVIDERS) is their cost order.
+        """
+        from django.conf import settings
+
+        slow_p95 = settings.AI_ROUTER_SLOW_P95
+        cost = {name: rank for rank, name in enumerate(self.providers)}
+
+        def slow(name):
+            p95 = self.health[name].p95()
+            return bool(slow_p95) and p95 is not None and p95 > slow_p95
+
+        names = [name for name in self.providers if self.health[name].available()]
+        return sorted(names, key=lambda name: (slow(name), cost[name]))
+
+    def stats(self) -> dict:
+        """Latency, error rate and breaker state by provider, for /health/."""
+        return {name: health.stats() for name, health in self.health.items()}
+
+    def _route(self, call) -> Iterator[str]:
+        from django.conf import settings
+
+        waiting = deque(self.candidates())
+        events: queue.Queue = queue.Queue()
+        racing: list[_Attempt] = []
+        errors: list[str] = []
+
+        def launch() -> None:
+            while waiting:
+                name = waiting.popleft()
+                if self.health[name].acquire():
+                    racing.append(
+                        _Attempt(
+                            name,
+                            self.providers[name],
+                            self.health[name],
+                            call,
+                            events,
+                        )
+                    )
+                    return
+
+        launch()
+        winner = None
+        try:
+            while winner is None:
+                if not racing:
+                    raise AIProviderUnavailableError(
+                        "No AI provider could answer: "
+                        + ("; ".join(errors) or "every circuit is open")
+                    )
+                hedge = (
+                    settings.AI_ROUTER_HEDGE_DELAY > 0
+                    and len(racing) == 1
+                    and bool(waiting)
+                )
+                try:
+                    attempt, kind, value = events.get(
+                        timeout=settings.AI_ROUTER_HEDGE_DELAY if hedge else None
+                    )
+                except queue.Empty:
+                    logger.info("RouterProvider: hedging %s", racing[0].name)
+                    launch()
+                    continue
+
+                if attempt not in racing:
+                    continue
+                if kind == "error":
+                    logger.warning("RouterProvider: %s failed: %s", attempt.name, value)
+                    racing.remove(attempt)
+                    errors.append(f"{attempt.name}: {value}")
+                    if not racing:
+                        launch()
+                    continue
+
+                winner = attempt
+                for other in racing:
+                    if other is not winner:
+                        other.cancelled.set()
+                if kind == "done":
+                    return
+                yield value
+
+            while True:
+                attempt, kind, value = events.get()
+                if attempt is not winner:
+                    continue
+                if kind == "error":
+                    raise value
+                if kind == "done":
+                    return
+                yield value
+        finally:
+            for attempt in racing:
+                attempt.cancelled.set()
+
+    def complete(self, prompt: str, *, system: str = "", **kwargs) -> str:
+        kwargs.pop("model", None)
+        return "".join(
+            self._route(lambda p: [p.complete(prompt, system=system, **kwargs)])
+        )
+
+    def stream(self, prompt: str, *, system: str = "", **kwargs) -> Iterator[str]:
+        kwargs.pop("model", None)
+
+        def call(provider):
+            if not hasattr(provider, "stream"):
+                return [provider.complete(prompt, system=system, **kwargs)]
+            return provider.stream(prompt, system=system, **kwargs)
+
+        return self._route(call)
+
 
 _PROVIDER_REGISTRY: dict[str, type] = {
     "openai": OpenAIProvider,
     "anthropic": AnthropicProvider,
     "groq": GroqProvider,
     "ollama": OllamaProvider,
+    "router": RouterProvider,
 }
 
 
@@ -157,3 +502,10 @@ def get_provider() -> AIProvider:
 
     _provider_instance = provider_class()
     return _provider_instance
+
+
+def router_stats() -> dict:
+    """Routed provider metrics of this process, empty unless AI_PROVIDER=router."""
+    if isinstance(_provider_instance, RouterProvider):
+        return _provider_instance.stats()
+    return {}
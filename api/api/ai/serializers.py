@@ -2,6 +2,7 @@ from django.db.models import Q
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 
+from api.ai.models import ChatJob
 from api.datasets.models.table import Table
 from api.datasets.services import BigQueryService
 
@@ -23,3 +24,20 @@ class ChatSerializer(serializers.Serializer):
         table.update_schema(bigquery_service)
 
         return table
+
+
+class ChatJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatJob
+        fields = [
+            "id",
+            "msg",
+            "table",
+            "status",
+            "explanation",
+            "query",
+            "error",
+            "created",
+            "finished_at",
+        ]
+        read_only_fields = fields
@@ -1,8 +1,23 @@
 import json
 import re
+import time
+from typing import Callable
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from pydantic import BaseModel
 from django.utils.translation import gettext_lazy as _
+
+from api.datasets.models import Table
+from api.users.models import User
+from api.utils.web_socket import send_message
+from . import cache as chat_cache
+from . import context as chat_context
+from .enums import ChatJobStatus
 from .exceptions import UnrelatedTopicException
+from .models import ChatJob
 from .providers import get_provider
 
 
@@ -12,16 +27,73 @@ class QueryResponse(BaseModel):
 
 
 class ChatAssistant:
+    SYSTEM_PROMPT = (
+        "You are a BigQuery SQL expert specializing in creating queries."
+        ' Respond ONLY with valid JSON: {"explanation": "...", "query": "..."}'
+        " Refuse anything unrelated to queries."
+    )
+
     @staticmethod
-    def chat(msg: str, context: str):
-        system_prompt = (
-            "You are a BigQuery SQL expert specializing in creating queries."
-            ' Respond ONLY with valid JSON: {"explanation": "...", "query": "..."}'
-            " Refuse anything unrelated to queries."
-        )
+    def context(table: Table, msg: str = "") -> str:
+        return chat_context.build(table, msg)
+
+    @classmethod
+    def system_prompt(cls, context: str) -> str:
+        return cls.SYSTEM_PROMPT + "\n\nContext: " + context
+
+    @classmethod
+    def chat(cls, msg: str, context: str):
+        provider = get_provider()
+        raw = provider.complete(msg, system=cls.system_prompt(context))
+        return cls.parse(raw)
+
+    @classmethod
+    def stream_chat(cls, msg: str, context: str, on_token: Callable[[str], None]):
+        """
+        Like chat, passing each piece of the answer to on_token as the
+        provider generates it. Providers without stream() send it whole.
+        """
         provider = get_provider()
-        raw = provider.complete(msg, system=system_prompt + "\n\nContext: " + context)
+        system = cls.system_prompt(context)
+        if not hasattr(provider, "stream"):
+            raw = provider.complete(msg, system=system)
+            on_token(raw)
+            return cls.parse(raw)
 
+        parts = []
+        for delta in provider.stream(msg, system=system):
+            parts.append(delta)
+            on_token(delta)
+        return cls.parse("".join(parts))
+
+    @classmethod
+    def answer(
+        cls,
+        msg: str,
+        table: Table,
+        on_token: Callable[[str], None],
+        cached: bool = True,
+    ) -> QueryResponse:
+        """
+        Answers a question about the table through stream_chat, or from the
+        response cache when it was already answered for the same table
+        schema and provider. A cached answer is passed whole to on_token.
+        """
+        key = chat_cache.cache_key(msg, table, get_provider()) if cached else None
+        if key:
+            data = chat_cache.get(key)
+            if data is not None:
+                result = QueryResponse(**data)
+                on_token(result.model_dump_json())
+                return result
+
+        result = cls.stream_chat(msg, cls.context(table, msg), on_token)
+        if key:
+            chat_cache.set(key, result.model_dump())
+        return result
+
+    @staticmethod
+    def parse(raw: str) -> QueryResponse:
         try:
             cleaned = raw.strip()
             if cleaned.startswith("```"):
@@ -44,3 +116,86 @@ class ChatAssistant:
             raise UnrelatedTopicException(error=_("Error processing the request"))
 
         return res
+
+
+class ChatJobService:
+    """
+    Chats answered off the request cycle: the view stores a ChatJob and the
+    ai.run_chat task runs it, streaming the answer to the user's channel
+    group (ai_chat_token messages, batched every AI_STREAM_FLUSH_INTERVAL
+    seconds) and sending the job on every status change (ai_chat).
+    """
+
+    MESSAGE_TYPE = "ai_chat"
+    TOKEN_MESSAGE_TYPE = "ai_chat_token"
+
+    @staticmethod
+    def create(user: User, msg: str, table: Table) -> ChatJob:
+        from .tasks import run_chat
+
+        job = ChatJob.objects.create(user=user, msg=msg, table=table)
+        transaction.on_commit(lambda: run_chat.delay(job.id))
+        return job
+
+    @classmethod
+    def run(cls, job: ChatJob, attempt: int = 0) -> QueryResponse:
+        """
+        Answers the chat and completes the job. Tokens carry the attempt,
+        so clients drop the partial answer of a failed one.
+        """
+        if job.table is None:
+            raise UnrelatedTopicException(error=_("Table was removed"))
+
+        job.status = ChatJobStatus.RUNNING
+        job.save(update_fields=["status", "modified"])
+        cls.notify(job)
+
+        buffer = []
+        flushed_at = time.monotonic()
+
+        def flush():
+            nonlocal flushed_at
+            if buffer:
+                cls.send(
+                    job,
+                    dict(job=job.id, attempt=attempt, delta="".join(buffer)),
+                    cls.TOKEN_MESSAGE_TYPE,
+                )
+                buffer.clear()
+            flushed_at = time.monotonic()
+
+        def on_token(delta: str):
+            buffer.append(delta)
+            if time.monotonic() - flushed_at >= settings.AI_STREAM_FLUSH_INTERVAL:
+                flush()
+
+        result = ChatAssistant.answer(
+            job.msg, job.table, on_token, cached=chat_cache.is_enabled(job.user)
+        )
+        flush()
+        cls.finish(
+            job,
+            ChatJobStatus.COMPLETE,
+            explanation=result.explanation,
+            query=result.query,
+        )
+        return result
+
+    @classmethod
+    def finish(cls, job: ChatJob, status: str, **fields) -> None:
+        job.status = status
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.finished_at = timezone.now()
+        job.save()
+        cls.notify(job)
+
+    @classmethod
+    def notify(cls, job: ChatJob) -> None:
+        from .serializers import ChatJobSerializer
+
+        cls.send(job, dict(ChatJobSerializer(job).data), cls.MESSAGE_TYPE)
+
+    @staticmethod
+    def send(job: ChatJob, message: dict, message_type: str) -> None:
+        async_to_sync(send_message)(f"event-{job.user_id}", message, message_type)
@@ -2,12 +2,13 @@
 Celery tasks for async AI inference.
 api/api/ai/tasks.py
 
-Views must NOT call providers directly — they dispatch here and return
-a job_id immediately. The client polls /events/ or uses the WebSocket
-consumer for the result.
+Views must NOT call providers directly — they store a ChatJob, dispatch
+it here and return the job id immediately. The answer is streamed to the
+user's WebSocket group; GET /ai/jobs/<id>/ returns the job status.
 
 Retry policy:
   - 3 attempts with exponential backoff (10s, 20s, 40s).
+  - Answers that aren't a query (UnrelatedTopicException) aren't retried.
   - Hard time limit: 5 minutes per task.
   - Soft limit warning at 4 minutes.
 """
@@ -32,28 +33,37 @@ _RETRY_BACKOFF = 10  # seconds; doubles on each retry
     soft_time_limit=240,
     name="ai.run_chat",
 )
-def run_chat(self, msg: str, context: str, event_id: str) -> dict:
+def run_chat(self, job_id: int) -> dict | None:
     """
     Executes AI inference off the request cycle.
 
     Args:
-        msg:      The user's natural language question.
-        context:  BigQuery table path + schema string.
-        event_id: The Event pk to update with the result.
+        job_id: The ChatJob pk to answer.
 
     Returns:
         dict with keys 'explanation' and 'query' on success.
     """
-    from api.ai.services import ChatAssistant
-    from api.events.service.event_service import EventService
+    from api.ai.enums import ChatJobStatus
+    from api.ai.exceptions import UnrelatedTopicException
+    from api.ai.models import ChatJob
+    from api.ai.services import ChatJobService
+
+    job = ChatJob.objects.select_related("table").filter(pk=job_id).first()
+    if job is None:
+        logger.warning("run_chat: chat job %s not found", job_id)
+        return None
 
     try:
-        result = ChatAssistant.chat(msg, context)
-        EventService.mark_complete(event_id, payload=result.__dict__)
-        return result.__dict__
+        result = ChatJobService.run(job, attempt=self.request.retries)
+        return result.model_dump()
+    except UnrelatedTopicException as exc:
+        ChatJobService.finish(job, ChatJobStatus.FAILED, error=str(exc.detail))
+        return None
     except Exception as exc:
         logger.exception(
             "run_chat failed (attempt %d): %s", self.request.retries + 1, exc
         )
-        EventService.mark_failed(event_id, reason=str(exc))
+        if self.request.retries >= self.max_retries:
+            ChatJobService.finish(job, ChatJobStatus.FAILED, error=str(exc))
+            return None
         raise self.retry(exc=exc, countdown=_RETRY_BACKOFF * (2**self.request.retries))
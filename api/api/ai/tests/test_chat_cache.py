@@ -0,0 +1,112 @@
+"""ChatAssistant response cache tests."""
+
+import json
+
+import pytest
+from django.core.cache import caches
+from django.db.models.signals import post_save
+from factory.django import mute_signals
+
+from api.ai import cache as chat_cache
+from api.ai import services
+from api.ai.services import ChatAssistant
+from api.datasets.models import File, Table
+from api.users.factories import UserFactory
+from api.workspaces.models import Organization, Workspace, WorkspaceMembership
+
+pytestmark = pytest.mark.django_db
+
+ANSWER = {"explanation": "Top rows", "query": "SELECT * LIMIT 10"}
+
+
+class CountingProvider:
+    default_model = "m1"
+    calls = 0
+
+    def complete(self, prompt, *, system="", **kwargs):
+        CountingProvider.calls += 1
+        return json.dumps(ANSWER)
+
+
+@pytest.fixture(autouse=True)
+def provider(monkeypatch, settings):
+    caches[settings.AI_CACHE_ALIAS].clear()
+    CountingProvider.calls = 0
+    instance = CountingProvider()
+    monkeypatch.setattr(services, "get_provider", lambda: instance)
+    yield instance
+    caches[settings.AI_CACHE_ALIAS].clear()
+
+
+@pytest.fixture
+def user():
+    # skips the service account created for new users
+    with mute_signals(post_save):
+        return UserFactory()
+
+
+@pytest.fixture
+def table(user):
+    with mute_signals(post_save):
+        file = File.objects.create(
+            name="f", type="csv", storage_url="gs://b/f", description="", owner=user
+        )
+        return Table.objects.create(
+            name="sales",
+            dataset_name="ds",
+            file=file,
+            owner=user,
+            schema=[{"column_name": "total", "data_type": "INT64"}],
+        )
+
+
+def _answer(msg, table, cached=True):
+    return ChatAssistant.answer(msg, table, lambda delta: None, cached=cached)
+
+
+class TestResponseCache:
+    def test_repeated_question_is_cached(self, table):
+        first = _answer("Top 10 by sales?", table)
+        second = _answer("  top 10   BY sales", table)
+
+        assert first == second
+        assert CountingProvider.calls == 1
+        assert chat_cache.stats() == dict(hits=1, misses=1, hit_rate=0.5)
+
+    def test_schema_change_misses(self, table):
+        _answer("Top 10 by sales", table)
+        table.schema = [{"column_name": "amount", "data_type": "FLOAT64"}]
+        _answer("Top 10 by sales", table)
+
+        assert CountingProvider.calls == 2
+
+    def test_model_change_misses(self, table, provider):
+        _answer("Top 10 by sales", table)
+        provider.default_model = "m2"
+        _answer("Top 10 by sales", table)
+
+        assert CountingProvider.calls == 2
+
+    def test_large_answers_are_not_cached(self, table, settings):
+        settings.AI_CACHE_MAX_ENTRY_SIZE = 10
+        _answer("Top 10 by sales", table)
+        _answer("Top 10 by sales", table)
+
+        assert CountingProvider.calls == 2
+
+
+class TestOptOut:
+    def test_workspace_opt_out(self, user):
+        assert chat_cache.is_enabled(user)
+
+        organization = Organization.objects.create(name="o", slug="o", owner=user)
+        workspace = Workspace.objects.create(
+            organization=organization,
+            name="w",
+            slug="w",
+            created_by=user,
+            ai_cache_enabled=False,
+        )
+        WorkspaceMembership.objects.create(workspace=workspace, user=user)
+
+        assert not chat_cache.is_enabled(user)
@@ -0,0 +1,101 @@
+"""Chat prompt context tests."""
+
+from datetime import timedelta
+
+import pytest
+from django.core.cache import caches
+from django.utils import timezone
+
+from api.ai import context as chat_context
+from api.ai.context import build, flatten, prune
+from api.datasets.models import Table
+
+ORDERS = [
+    {"column_name": "id", "data_type": "INT64", "mode": "REQUIRED"},
+    {"column_name": "fechaVenta", "data_type": "DATE"},
+    {
+        "column_name": "items",
+        "data_type": "RECORD",
+        "mode": "REPEATED",
+        "fields": [
+            {"column_name": "sku", "data_type": "STRING"},
+            {"column_name": "precio_unitario", "data_type": "FLOAT64"},
+        ],
+    },
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    caches[settings.AI_CACHE_ALIAS].clear()
+    yield
+    caches[settings.AI_CACHE_ALIAS].clear()
+
+
+def _table(schema):
+    return Table(name="orders", dataset_name="ds", schema=schema)
+
+
+class TestContext:
+    def test_compact_schema(self, settings):
+        settings.BQ_PROJECT_ID = "p"
+
+        assert build(_table(ORDERS), "ventas por día") == "\n".join(
+            [
+                "table_id = p.ds.orders",
+                "columns (name:type):",
+                "id:INT64",
+                "fechaVenta:DATE",
+                "items:ARRAY<RECORD>",
+                "items.sku:STRING",
+                "items.precio_unitario:FLOAT64",
+            ]
+        )
+
+    def test_wide_tables_keep_related_columns(self, settings):
+        settings.AI_CONTEXT_MAX_COLUMNS = 3
+        schema = [
+            {"column_name": f"col_{i}", "data_type": "STRING"} for i in range(200)
+        ]
+
+        context = build(_table(schema + ORDERS), "¿Precio unitario promedio por SKU?")
+
+        assert context.split("\n")[2:] == [
+            "col_0:STRING",
+            "items:ARRAY<RECORD>",
+            "items.sku:STRING",
+            "items.precio_unitario:FLOAT64",
+            "(201 more columns not shown)",
+        ]
+
+    def test_prefixes_and_accents_match(self):
+        columns = flatten(ORDERS)
+
+        assert prune(columns, "Total de ventas", 1) == [("fechaVenta", "DATE")]
+        assert prune(columns, "precios", 1) == [
+            ("items", "ARRAY<RECORD>"),
+            ("items.precio_unitario", "FLOAT64"),
+        ]
+
+    def test_columns_are_cached_by_version(self, monkeypatch):
+        calls = []
+        original = chat_context.flatten
+
+        def flatten(schema, prefix=""):
+            calls.append(prefix)
+            return original(schema, prefix)
+
+        monkeypatch.setattr(chat_context, "flatten", flatten)
+        table = _table(ORDERS)
+        table.pk = 1
+        table.modified = timezone.now()
+
+        build(table, "a")
+        build(table, "b")
+        assert calls.count("") == 1
+
+        # saving the new schema bumps modified
+        table.schema = ORDERS[:1]
+        table.modified += timedelta(seconds=1)
+        assert build(table, "a").endswith("id:INT64")
+        assert calls.count("") == 2
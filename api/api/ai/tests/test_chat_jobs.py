@@ -0,0 +1,106 @@
+"""Asynchronous chat tests."""
+
+import json
+
+import pytest
+from django.core.cache import caches
+from django.db.models.signals import post_save
+from factory.django import mute_signals
+
+from api.ai import services
+from api.ai.enums import ChatJobStatus
+from api.ai.models import ChatJob
+from api.ai.services import ChatJobService
+from api.ai.tasks import run_chat
+from api.datasets.models import File, Table
+from api.users.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+ANSWER = json.dumps({"explanation": "Counts rows", "query": "SELECT COUNT(*)"})
+
+
+class StreamingProvider:
+    def __init__(self, answer=ANSWER):
+        self.answer = answer
+
+    def complete(self, prompt, *, system="", **kwargs):
+        return self.answer
+
+    def stream(self, prompt, *, system="", **kwargs):
+        for start in range(0, len(self.answer), 5):
+            yield self.answer[start : start + 5]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    caches[settings.AI_CACHE_ALIAS].clear()
+    yield
+    caches[settings.AI_CACHE_ALIAS].clear()
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    sent = []
+
+    async def send_message(channel_name, message, message_type):
+        sent.append((message_type, message))
+
+    monkeypatch.setattr(services, "send_message", send_message)
+    return sent
+
+
+@pytest.fixture
+def job():
+    # skips the service account and BigQuery table of new users and tables
+    with mute_signals(post_save):
+        user = UserFactory()
+        file = File.objects.create(
+            name="f", type="csv", storage_url="gs://b/f", description="", owner=user
+        )
+        table = Table.objects.create(
+            name="t", dataset_name="ds", file=file, owner=user, schema=[]
+        )
+    return ChatJob.objects.create(user=user, table=table, msg="How many rows?")
+
+
+class TestRun:
+    def test_streams_tokens(self, monkeypatch, settings, messages, job):
+        settings.AI_STREAM_FLUSH_INTERVAL = 0
+        monkeypatch.setattr(services, "get_provider", StreamingProvider)
+
+        result = ChatJobService.run(job)
+
+        assert result.query == "SELECT COUNT(*)"
+        tokens = [m for t, m in messages if t == ChatJobService.TOKEN_MESSAGE_TYPE]
+        assert "".join(m["delta"] for m in tokens) == ANSWER
+        assert len(tokens) > 1
+        statuses = [
+            m["status"] for t, m in messages if t == ChatJobService.MESSAGE_TYPE
+        ]
+        assert statuses == ["running", "complete"]
+        job.refresh_from_db()
+        assert job.status == ChatJobStatus.COMPLETE
+        assert job.explanation == "Counts rows"
+
+    def test_tokens_are_batched(self, monkeypatch, settings, messages, job):
+        settings.AI_STREAM_FLUSH_INTERVAL = 60
+        monkeypatch.setattr(services, "get_provider", StreamingProvider)
+
+        ChatJobService.run(job)
+
+        tokens = [m for t, m in messages if t == ChatJobService.TOKEN_MESSAGE_TYPE]
+        assert [m["delta"] for m in tokens] == [ANSWER]
+
+
+class TestRunChatTask:
+    def test_unrelated_answer_fails_without_retry(self, monkeypatch, messages, job):
+        monkeypatch.setattr(
+            services, "get_provider", lambda: StreamingProvider("I can't help")
+        )
+
+        assert run_chat.apply(args=[job.id]).get() is None
+
+        job.refresh_from_db()
+        assert job.status == ChatJobStatus.FAILED
+        assert job.error
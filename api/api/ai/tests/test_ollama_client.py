@@ -0,0 +1,112 @@
+"""Ollama client tests."""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api.ai.clients.ollama_client import (
+    OllamaBusyError,
+    OllamaClient,
+    OllamaConnectionError,
+)
+from api.utils import http
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0
+    payloads = []
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        Handler.payloads.append(payload)
+        with Handler.lock:
+            Handler.running += 1
+            Handler.peak = max(Handler.peak, Handler.running)
+        time.sleep(Handler.delay)
+        with Handler.lock:
+            Handler.running -= 1
+
+        if payload["stream"]:
+            chunks = [{"response": token, "done": False} for token in ["Ho", "la"]]
+            chunks.append({"response": "", "done": True})
+            body = b"".join(json.dumps(c).encode() + b"\n" for c in chunks)
+        else:
+            body = json.dumps({"response": "Hola", "done": True}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client(settings, monkeypatch):
+    settings.OLLAMA_MAX_CONCURRENCY = 1
+    settings.OLLAMA_QUEUE_TIMEOUT = 5
+    settings.OLLAMA_KEEP_ALIVE = "30m"
+    monkeypatch.setattr(http, "_session", None)
+    monkeypatch.setattr(OllamaClient, "_slots", {})
+    Handler.delay, Handler.payloads, Handler.peak = 0, [], 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield OllamaClient(base_url=f"http://127.0.0.1:{httpd.server_port}", timeout=5)
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestOllamaClient:
+    def test_complete_pins_the_model(self, client):
+        assert client.complete("Di hola", temperature=0) == "Hola"
+
+        payload = Handler.payloads[0]
+        assert payload["stream"] is False
+        assert payload["keep_alive"] == "30m"
+        assert payload["options"] == {"temperature": 0}
+
+    def test_stream(self, client):
+        assert list(client.stream("Di hola")) == ["Ho", "la"]
+        assert Handler.payloads[0]["stream"] is True
+
+    def test_generations_are_queued(self, client):
+        Handler.delay = 0.2
+
+        with ThreadPoolExecutor(3) as executor:
+            results = list(executor.map(client.complete, ["a", "b", "c"]))
+
+        assert results == ["Hola"] * 3
+        assert Handler.peak == 1
+        stats = OllamaClient.queue_stats()[client.base_url]
+        assert stats["acquired"] == 3
+        assert stats["in_flight"] == 0
+        assert stats["queue_time_max_ms"] >= 300
+
+    def test_stream_holds_the_slot(self, client, settings):
+        settings.OLLAMA_QUEUE_TIMEOUT = 0.05
+        stream = client.stream("a")
+        next(stream)
+
+        with pytest.raises(OllamaBusyError):
+            client.complete("b")
+
+        stream.close()
+        assert client.complete("b") == "Hola"
+        assert OllamaClient.queue_stats()[client.base_url]["rejected"] == 1
+
+    def test_unreachable_server(self, client):
+        unreachable = OllamaClient(base_url="http://127.0.0.1:9", timeout=1)
+
+        with pytest.raises(OllamaConnectionError):
+            unreachable.complete("a")
+        assert unreachable.health_check()["status"] == "error"
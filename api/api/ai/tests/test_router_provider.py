@@ -0,0 +1,142 @@
+"""Provider router tests."""
+
+import time
+
+import pytest
+
+from api.ai.providers import AIProviderUnavailableError, RouterProvider
+
+
+class FakeProvider:
+    default_model = "fake"
+
+    def __init__(self, answer="ok", delay=0, fail=False):
+        self.answer = answer
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def complete(self, prompt, *, system="", **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("down")
+        return self.answer
+
+    def stream(self, prompt, *, system="", **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("down")
+        for token in self.answer.split():
+            yield token
+
+
+@pytest.fixture(autouse=True)
+def router_settings(settings):
+    settings.AI_ROUTER_WINDOW = 20
+    settings.AI_ROUTER_FAILURE_THRESHOLD = 2
+    settings.AI_ROUTER_MAX_ERROR_RATE = 0.5
+    settings.AI_ROUTER_COOLDOWN = 30
+    settings.AI_ROUTER_HEDGE_DELAY = 0
+    settings.AI_ROUTER_SLOW_P95 = 0
+    return settings
+
+
+class TestRouterProvider:
+    def test_prefers_the_cheapest(self):
+        cheap, expensive = FakeProvider("cheap"), FakeProvider("expensive")
+        router = RouterProvider({"cheap": cheap, "expensive": expensive})
+
+        assert router.complete("q") == "cheap"
+        assert list(router.stream("q")) == ["cheap"]
+        assert expensive.calls == 0
+        assert router.stats()["cheap"]["requests"] == 2
+
+    def test_fails_over_and_opens_the_circuit(self):
+        cheap, expensive = FakeProvider(fail=True), FakeProvider("expensive")
+        router = RouterProvider({"cheap": cheap, "expensive": expensive})
+
+        for _ in range(3):
+            assert router.complete("q") == "expensive"
+
+        # the circuit opened after two failures
+        assert cheap.calls == 2
+        stats = router.stats()["cheap"]
+        assert stats["state"] == "open"
+        assert stats["error_rate"] == 1.0
+
+    def test_half_open_trial(self, router_settings):
+        router_settings.AI_ROUTER_COOLDOWN = 0.05
+        cheap = FakeProvider(fail=True)
+        router = RouterProvider({"cheap": cheap, "expensive": FakeProvider("b")})
+        router.complete("q")
+        router.complete("q")
+        assert router.candidates() == ["expensive"]
+
+        time.sleep(0.1)
+        cheap.fail = False
+
+        assert router.candidates() == ["cheap", "expensive"]
+        assert router.complete("q") == "ok"
+        assert router.stats()["cheap"]["state"] == "closed"
+
+    def test_every_provider_fails(self):
+        router = RouterProvider({"a": FakeProvider(fail=True)})
+
+        with pytest.raises(AIProviderUnavailableError, match="a: down"):
+            router.complete("q")
+
+    def test_hedges_slow_requests(self, router_settings):
+        router_settings.AI_ROUTER_HEDGE_DELAY = 0.05
+        stalled, backup = FakeProvider("slow", delay=0.5), FakeProvider("fast")
+        router = RouterProvider({"stalled": stalled, "backup": backup})
+
+        start = time.monotonic()
+        assert list(router.stream("q")) == ["fast"]
+        assert time.monotonic() - start < 0.4
+        assert stalled.calls == backup.calls == 1
+
+    def test_slow_providers_go_last(self, router_settings):
+        router_settings.AI_ROUTER_SLOW_P95 = 0.05
+        slow = FakeProvider("slow", delay=0.1)
+        router = RouterProvider({"slow": slow, "fast": FakeProvider("fast")})
+
+        assert router.complete("q") == "slow"
+        assert router.complete("q") == "fast"
+        assert router.stats()["slow"]["p95_ms"] >= 100
+
+    def test_fast_providers_by_cost(self, router_settings):
+        router_settings.AI_ROUTER_SLOW_P95 = 0.05
+        slow = FakeProvider("slow", delay=0.1)
+        router = RouterProvider(
+            {"slow": slow, "cheap": FakeProvider(), "expensive": FakeProvider()}
+        )
+        router.complete("q")
+
+        assert router.candidates() == ["cheap", "expensive", "slow"]
+
+    def test_router_cannot_route_to_itself(self, router_settings):
+        router_settings.AI_ROUTER_PROVIDERS = ["groq", "router"]
+
+        with pytest.raises(AIProviderUnavailableError):
+            RouterProvider()
+
+    def test_closing_the_stream_cancels_the_provider(self):
+        produced = []
+
+        class Endless:
+            def stream(self, prompt, *, system="", **kwargs):
+                while True:
+                    produced.append(1)
+                    yield "token"
+                    time.sleep(0.01)
+
+        stream = RouterProvider({"endless": Endless()}).stream("q")
+        assert next(stream) == "token"
+        stream.close()
+
+        time.sleep(0.05)
+        count = len(produced)
+        time.sleep(0.05)
+        assert len(produced) == count
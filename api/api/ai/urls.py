@@ -5,10 +5,11 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 # Views
-from api.ai.views import AiViewset
+from api.ai.views import AiViewset, ChatJobViewSet
 
 router = DefaultRouter()
 
+router.register(r"ai/jobs", ChatJobViewSet, basename="ai-jobs")
 router.register(r"ai", AiViewset, basename="ai")
 
 urlpatterns = [
@@ -1,31 +1,23 @@
 """
-AI ViewSet — synchronous by design.
+AI ViewSets — asynchronous chat.
 api/api/ai/views.py
 
-DECISION (2026-08-21): this was originally scaffolded as async
-(Celery + Events polling), but that job-status system was never
-finished (no status/payload fields on Event, no EventService
-mark_complete/mark_failed, no detail route, no AI event type).
-
-Rather than build that out under time pressure, we've formally
-committed to a synchronous response for now. This is a considered
-tradeoff, not a stopgap: revisit if/when request volume or LLM latency
-makes blocking a gunicorn worker per chat request a real problem.
-
-The Celery worker (remarkable-endurance) currently has nothing
-dispatched to it as a result — see production readiness doc for the
-cost/keep-idle decision.
+A chat request only stores a ChatJob and dispatches the ai.run_chat
+Celery task, so no gunicorn worker waits on the LLM. The answer is
+streamed to the user's WebSocket group (ai_chat_token, then ai_chat when
+the job finishes) and GET /ai/jobs/<id>/ returns the job for clients
+that poll instead.
 """
 
 from __future__ import annotations
 
-from rest_framework import permissions, status, viewsets
+from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from api.ai.exceptions import UnrelatedTopicException
-from api.ai.serializers import ChatSerializer
-from api.ai.services import ChatAssistant
+from api.ai.models import ChatJob
+from api.ai.serializers import ChatJobSerializer, ChatSerializer
+from api.ai.services import ChatJobService
 
 
 class AiViewset(viewsets.ViewSet):
@@ -42,14 +34,17 @@ class AiViewset(viewsets.ViewSet):
 
         msg: str = serializer.validated_data["msg"]
         table = serializer.validated_data["table"]
-        context = f"table_id = {table.path}\n" f"bigquery table_schema = {table.schema}"
-
-        try:
-            result = ChatAssistant.chat(msg, context)
-        except UnrelatedTopicException as exc:
-            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
+        job = ChatJobService.create(request.user, msg, table)
         return Response(
-            {"status": "complete", "explanation": result.explanation, "query": result.query},
-            status=status.HTTP_200_OK,
+            {"job": job.id, "status": job.status},
+            status=status.HTTP_202_ACCEPTED,
         )
+
+
+class ChatJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    serializer_class = ChatJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ChatJob.objects.filter(user=self.request.user)
@@ -1 +1,2 @@
 from .decode_url import decode_url
+from .provider_cache import provider_cache
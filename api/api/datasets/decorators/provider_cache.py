@@ -0,0 +1,24 @@
+from functools import wraps
+
+from django.conf import settings
+
+from api.datasets.utils.provider_cache import cache_key, get_or_set, normalize_url
+
+
+def provider_cache(func):
+    """
+    Caches the result of a provider metadata call (list_files,
+    get_file_metadata) by provider, method and normalized url for
+    PROVIDER_CACHE_TIMEOUT seconds.
+    """
+
+    @wraps(func)
+    def wrapper(cls, url: str, *args, **kwargs):
+        key = cache_key(cls.__name__, func.__name__, normalize_url(url), args, kwargs)
+        return get_or_set(
+            key,
+            lambda: func(cls, url, *args, **kwargs),
+            settings.PROVIDER_CACHE_TIMEOUT,
+        )
+
+    return wrapper
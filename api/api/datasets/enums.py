@@ -13,6 +13,13 @@ class FileType(models.TextChoices):
     JSON = "json", "JSON"
     JSONL = "jsonl", "JSONL"
     TXT = "txt", "TXT"
+    PARQUET = "parquet", "PARQUET"
+    AVRO = "avro", "AVRO"
+
+
+class Compression(models.TextChoices):
+    GZIP = "gzip", "GZIP"
+    ZSTD = "zstd", "ZSTD"
 
 
 class TransformationOption(Enum):
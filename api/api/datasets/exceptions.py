@@ -56,6 +56,26 @@ class InvalidFileException(GenericAPIException):
     default_code = "invalid_file"
 
 
+class DecompressionLimitException(GenericAPIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _(
+        "The decompressed file is too large or its compression ratio is suspicious."
+    )
+    default_code = "decompression_limit_exceeded"
+
+
+class SchemaViolationException(GenericAPIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _("The file does not match the schema.")
+    default_code = "schema_violation"
+
+
+class DownloadFailedException(GenericAPIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _("The file could not be downloaded from the url")
+    default_code = "download_failed"
+
+
 class UploadFailedException(GenericAPIException):
     status_code = status.HTTP_400_BAD_REQUEST
     default_detail = _("Upload failed")
@@ -104,3 +124,9 @@ class CloudStorageOperationException(GenericAPIException):
     status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
     default_detail = _("An error occurred while executing a cloud storage operation.")
     default_code = "cloud_storage_operation_failed"
+
+
+class NotebookStagingException(GenericAPIException):
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    default_detail = _("Tables cannot be staged to the notebook.")
+    default_code = "notebook_staging_failed"
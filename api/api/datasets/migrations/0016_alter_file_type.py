@@ -0,0 +1,28 @@
+# Generated by Django 5.2.16 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("datasets", "0015_table_description"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="file",
+            name="type",
+            field=models.CharField(
+                choices=[
+                    ("csv", "CSV"),
+                    ("json", "JSON"),
+                    ("jsonl", "JSONL"),
+                    ("txt", "TXT"),
+                    ("parquet", "PARQUET"),
+                    ("avro", "AVRO"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
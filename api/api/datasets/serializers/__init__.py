@@ -4,5 +4,10 @@ from .file import (
     FilePreviewSerializer,
     SearchQuerySerializer,
 )
-from .table import TableSerializer, TableTransformSerializer, TableSchemaSerializer
+from .table import (
+    TableSerializer,
+    TableTransformSerializer,
+    TableSchemaSerializer,
+    TableStageSerializer,
+)
 from .chart import ChartSerializer
@@ -1,8 +1,8 @@
+import codecs
 import json
 from typing import List
 
 import magic
-import pandas as pd
 
 from rest_framework import serializers
 from django.conf import settings
@@ -11,14 +11,41 @@ from googleapiclient.errors import HttpError
 
 from api.datasets.services.upload_providers import return_url_provider
 from api.datasets.models import File
-from api.datasets.enums import FileType, UploadType
+from api.datasets.enums import Compression, FileType, UploadType
 from api.datasets.utils import (
+    ColumnProfile,
     is_valid_column_name,
-    create_dataframe_from_csv,
-    create_dataframe_from_json,
+    profile_csv,
+    profile_json,
     validate_csv_column_names,
 )
-from api.datasets.exceptions import InvalidFileException, UrlFileNotExistException
+from api.datasets.utils.compression import (
+    CHUNK_SIZE,
+    COMPRESSED_MIME_TYPES,
+    open_decompressed,
+    split_compression,
+)
+from api.datasets.utils.json import JsonSchemaField
+from api.datasets.utils.parquet import read_parquet_schema
+from api.datasets.exceptions import (
+    InvalidFileException,
+    SchemaViolationException,
+    UrlFileNotExistException,
+)
+
+TEXT_MIME_TYPES = ["text/csv", "application/json", "text/plain"]
+COLUMNAR_MIME_TYPES = {
+    "parquet": [
+        "application/vnd.apache.parquet",
+        "application/x-parquet",
+        "application/octet-stream",
+    ],
+    "avro": ["application/avro", "avro/binary", "application/octet-stream"],
+}
+AVRO_MAGIC = b"Obj\x01"
+# File types that can be uploaded from a url, Parquet and Avro files are
+# only accepted as uploaded files
+URL_FILE_TYPES = [FileType.CSV, FileType.JSON, FileType.JSONL, FileType.TXT]
 
 
 def validate_size(value: int):
@@ -33,14 +60,16 @@ def validate_size(value: int):
         raise serializers.ValidationError(dict(detail=_("The file size is too large")))
 
 
-def validate_mimes(value: str):
+def validate_mimes(value: str, extension: str = None, compression: str = None):
     """
     Validates that the mimetype corresponds to the allowed mimetypes.
     raises a Validation error otherwise
 
     this functions mustn't be use outside serializers or serializer fields
     """
-    valid_mime_types = ["text/csv", "application/json", "text/plain"]
+    valid_mime_types = COLUMNAR_MIME_TYPES.get(extension, TEXT_MIME_TYPES)
+    if compression:
+        valid_mime_types = valid_mime_types + COMPRESSED_MIME_TYPES[compression]
     if value not in valid_mime_types:
         raise serializers.ValidationError(
             {"detail": _("The filetype does not match with the extension")}
@@ -54,99 +83,175 @@ def validate_extension(value: str):
 
     this functions mustn't be use outside serializers or serializer fields
     """
-    valid_extensions = ["csv", "txt", "json", "jsonl"]
+    valid_extensions = ["csv", "txt", "json", "jsonl", "parquet", "avro"]
     if value not in valid_extensions:
         raise serializers.ValidationError(
-            {"detail": _("Only CSV, TXT, and JSON files are allowed.")}
+            {"detail": _("Only CSV, TXT, JSON, Parquet and Avro files are allowed.")}
         )
 
 
-def _columns_validate(df: pd.DataFrame, schema: List = None):
-    if schema:
-        if len(schema) != len(df.columns):
-            raise serializers.ValidationError(
-                {
-                    "detail": _(
-                        "The number of columns in the schema does not match the number of columns in the CSV file."
-                    )
-                }
+def _url_file_type_error() -> serializers.ValidationError:
+    return serializers.ValidationError(
+        {
+            "detail": _(
+                "Only CSV, TXT, and JSON files can be uploaded from a url, upload Parquet and Avro files directly."
             )
+        }
+    )
 
-        for idx, item in enumerate(schema):
-            column_name = item["column_name"]
-            expected_type = item["data_type"]
-            mode = item.get("mode", "NULLABLE")
 
-            actual_column_name = df.columns[idx]
+def _column_count_error() -> serializers.ValidationError:
+    return serializers.ValidationError(
+        {
+            "detail": _(
+                "The number of columns in the schema does not match the number of columns in the CSV file."
+            )
+        }
+    )
 
-            if mode == "REQUIRED" and df[actual_column_name].isnull().any():
-                suffix_message = _(
-                    "You must indicate in the schema that the column can accept null values."
-                )
-                raise serializers.ValidationError(
-                    {
-                        "detail": _("Column is required but contains null values:")
-                        + column_name
-                        + f". {suffix_message}"
-                    }
-                )
-            if mode != "REPEATED":
-                df_temp = df.dropna(subset=[actual_column_name])
-                actual_type = str(df_temp[actual_column_name].dtype)
 
-                base_message = _("Column should be of type")
-                suffix_message = _(
-                    "You must ensure that all rows are of this data type or modify the schema."
-                )
-                if expected_type == "INT64" and actual_type not in ["int64"]:
-                    raise serializers.ValidationError(
-                        {
-                            "detail": f"{base_message} {expected_type}: {column_name}. {suffix_message}"
-                        }
-                    )
-                elif expected_type == "FLOAT64" and actual_type not in ["float64"]:
-                    raise serializers.ValidationError(
-                        {
-                            "detail": f"{base_message} {expected_type}: {column_name}. {suffix_message}"
-                        }
-                    )
-                elif expected_type == "BOOLEAN" and actual_type not in ["bool"]:
-                    raise serializers.ValidationError(
-                        {
-                            "detail": f"{base_message} {expected_type}: {column_name}. {suffix_message}"
-                        }
-                    )
-                elif expected_type == "DATETIME":
-                    if (
-                        not pd.to_datetime(df[actual_column_name], errors="coerce")
-                        .notnull()
-                        .all()
-                    ):
-                        raise serializers.ValidationError(
-                            {
-                                "detail": f"{base_message} {expected_type}: {column_name}. {suffix_message}"
-                            }
-                        )
-                if expected_type == "ARRAY" and actual_type not in ["object"]:
-                    raise serializers.ValidationError(
-                        {
-                            "detail": f"{base_message} {expected_type}: {column_name}. {suffix_message}"
-                        }
-                    )
+def _required_column_message(column_name: str) -> str:
+    suffix_message = _(
+        "You must indicate in the schema that the column can accept null values."
+    )
+    return (
+        _("Column is required but contains null values:")
+        + column_name
+        + f". {suffix_message}"
+    )
+
 
+def _column_type_message(expected_type: str, column_name: str) -> str:
+    base_message = _("Column should be of type")
+    suffix_message = _(
+        "You must ensure that all rows are of this data type or modify the schema."
+    )
+    return f"{base_message} {expected_type}: {column_name}. {suffix_message}"
+
+
+def _column_names_validate(columns: List[str]):
+    suffix_message = _(
+        "Column names must start with a letter and can only contain alphanumeric characters. Modify the column names in the source file or in the schema."
+    )
+    invalid_columns = [col for col in columns if not is_valid_column_name(col)]
+    if invalid_columns:
+        raise serializers.ValidationError(
+            {
+                "detail": _("Invalid column names in the file:")
+                + ", ".join(invalid_columns[:20])
+                + f". {suffix_message}"
+            }
+        )
+
+
+# Value classes accepted for each checked schema type, nulls aside
+JSON_SCHEMA_CLASSES = {
+    "INT64": {"INT64"},
+    "FLOAT64": {"INT64", "FLOAT64"},
+    "BOOLEAN": {"BOOLEAN"},
+    "DATETIME": {"DATE", "DATETIME", "TIMESTAMP"},
+}
+
+
+def _json_violations(field: JsonSchemaField, rows: int, schema_field: dict) -> list:
+    """
+    Every way a streamed JSON field breaks its schema field, in the format
+    of ColumnProfile.violations. Items aren't numbered, so rows is empty.
+    """
+    column_name = schema_field["column_name"]
+    expected_type = schema_field["data_type"]
+    mode = schema_field.get("mode", "NULLABLE")
+
+    violations = []
+    nulls = rows - field.scalars - field.lists
+    if mode == "REQUIRED" and nulls:
+        violations.append(
+            {
+                "column": column_name,
+                "data_type": expected_type,
+                "error": "required",
+                "count": nulls,
+                "rows": [],
+            }
+        )
+
+    if expected_type == "ARRAY":
+        invalid = field.scalars
+    elif mode == "REPEATED" or expected_type not in JSON_SCHEMA_CLASSES:
+        invalid = 0
     else:
-        suffix_message = _(
-            "Column names must start with a letter and can only contain alphanumeric characters. Modify the column names in the source file or in the schema."
+        allowed = JSON_SCHEMA_CLASSES[expected_type]
+        invalid = field.lists + sum(
+            count
+            for value_class, count in field.classes.items()
+            if value_class not in allowed
         )
-        invalid_columns = [col for col in df.columns if not is_valid_column_name(col)]
-        if invalid_columns:
-            raise serializers.ValidationError(
-                {
-                    "detail": _("Invalid column names in the file:")
-                    + ", ".join(invalid_columns[:20])
-                    + f". {suffix_message}"
-                }
-            )
+    if invalid:
+        violations.append(
+            {
+                "column": column_name,
+                "data_type": expected_type,
+                "error": "type",
+                "count": invalid,
+                "rows": [],
+            }
+        )
+    return violations
+
+
+def _json_columns_validate(
+    fields: List[JsonSchemaField], rows: int, schema: List = None
+):
+    """
+    Checks the fields of a streamed JSON (see profile_json) against the
+    schema, reporting every violation like _csv_columns_validate.
+    """
+    if not schema:
+        _column_names_validate([field.name for field in fields])
+        return
+
+    if len(schema) != len(fields):
+        raise _column_count_error()
+
+    _raise_violations(
+        [
+            violation
+            for item, field in zip(schema, fields)
+            for violation in _json_violations(field, rows, item)
+        ]
+    )
+
+
+def _raise_violations(violations: List[dict]):
+    if violations:
+        first = violations[0]
+        if first["error"] == "required":
+            detail = _required_column_message(first["column"])
+        else:
+            detail = _column_type_message(first["data_type"], first["column"])
+        raise SchemaViolationException(detail=detail, error=violations)
+
+
+def _csv_columns_validate(columns: List[ColumnProfile], schema: List = None):
+    """
+    Checks the profile of a streamed CSV against the schema. Instead of
+    stopping at the first mismatched column every violation is reported,
+    with its count and first offending row numbers, in the exception error.
+    """
+    if not schema:
+        _column_names_validate([column.name for column in columns])
+        return
+
+    if len(schema) != len(columns):
+        raise _column_count_error()
+
+    _raise_violations(
+        [
+            violation
+            for item, column in zip(schema, columns)
+            for violation in column.violations(item)
+        ]
+    )
 
 
 class SearchQuerySerializer(serializers.Serializer):
@@ -198,14 +303,17 @@ class ProviderUrlField(serializers.URLField):
                 files = provider.service.list_files(url)
 
                 extension = ""
+                compression = None
                 for i in files:
-                    name = i.get("name", "").split(".")[-1]
+                    name, file_compression = split_compression(i.get("name", ""))
+                    name = name.split(".")[-1]
                     validate_extension(name)
 
                     if extension == "":
                         extension = name
+                        compression = file_compression
 
-                    if extension != name:
+                    if extension != name or compression != file_compression:
                         raise serializers.ValidationError(
                             dict(
                                 detail=_(
@@ -233,22 +341,23 @@ class ProviderUrlField(serializers.URLField):
                                 )
                             )
                         )
-                validate_mimes(mimetype)
+                validate_mimes(mimetype, compression=compression)
 
             else:
 
                 metadata = provider.service.get_file_metadata(url)
+                name, compression = split_compression(metadata.get("name", ""))
                 size = int(metadata.get("size", 0))
                 validate_size(size)
-                validate_mimes(metadata.get("mimeType", ""))
+                validate_mimes(metadata.get("mimeType", ""), compression=compression)
 
-                extension = metadata.get("name", "").split(".")[-1]
-                if extension not in FileType.values:
-                    raise serializers.ValidationError(
-                        {"detail": _("Only CSV, TXT, and JSON files are allowed.")}
-                    )
+                extension = name.split(".")[-1]
+
+            if extension not in URL_FILE_TYPES:
+                raise _url_file_type_error()
 
             self.extension = extension
+            self.compression = compression
             return value
         except HttpError:
             raise UrlFileNotExistException()
@@ -257,7 +366,7 @@ class ProviderUrlField(serializers.URLField):
 class UrlPreviewSerializer(serializers.Serializer):
     url = ProviderUrlField(allow_blank=False)
     file_type = serializers.ChoiceField(
-        choices=[(tag.value, tag.label) for tag in FileType]
+        choices=[(tag.value, tag.label) for tag in URL_FILE_TYPES]
     )
 
 
@@ -266,16 +375,20 @@ class CSVSerializer(serializers.Serializer):
     schema = serializers.ListField(required=False)
     autodetect = serializers.BooleanField(required=False)
     skip_leading_rows = serializers.IntegerField(min_value=0, required=False)
+    compression = serializers.ChoiceField(
+        choices=Compression.choices, required=False, allow_null=True
+    )
 
     def validate(self, attrs):
         attrs = super().validate(attrs)
 
-        file = attrs.get("file")
+        file = open_decompressed(attrs.get("file"), attrs.get("compression"))
         schema = attrs.get("schema", [])
 
-        df, csv_params = create_dataframe_from_csv(file)
+        columns, csv_params = profile_csv(file, schema=schema)
 
-        _columns_validate(df, schema)
+        _csv_columns_validate(columns, schema)
+        attrs["csv_params"] = csv_params
         return attrs
 
 
@@ -283,15 +396,18 @@ class JSONSerializer(serializers.Serializer):
     file = serializers.FileField()
     schema = serializers.ListField(required=False)
     autodetect = serializers.BooleanField(required=False)
+    compression = serializers.ChoiceField(
+        choices=Compression.choices, required=False, allow_null=True
+    )
 
     def validate(self, attrs):
         attrs = super().validate(attrs)
 
-        file = attrs.get("file")
+        file = open_decompressed(attrs.get("file"), attrs.get("compression"))
         schema = attrs.get("schema", [])
 
-        df = create_dataframe_from_json(file)
-        _columns_validate(df, schema)
+        fields, rows = profile_json(file)
+        _json_columns_validate(fields, rows, schema)
         return attrs
 
 
@@ -299,6 +415,45 @@ class TXTSerializer(serializers.Serializer):
     file = serializers.FileField()
 
 
+class PARQUETSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    schema = serializers.ListField(required=False)
+    autodetect = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+
+        file = attrs.get("file")
+        schema = attrs.get("schema", [])
+
+        parquet_schema = read_parquet_schema(file)
+        if schema and len(schema) != len(parquet_schema.names):
+            raise serializers.ValidationError(
+                {
+                    "detail": _(
+                        "The number of columns in the schema does not match the number of columns in the file."
+                    )
+                }
+            )
+        return attrs
+
+
+class AVROSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    schema = serializers.ListField(required=False)
+    autodetect = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+
+        file = attrs.get("file")
+        header = file.read(len(AVRO_MAGIC))
+        file.seek(0)
+        if header != AVRO_MAGIC:
+            raise InvalidFileException()
+        return attrs
+
+
 class FileUploadSerializer(serializers.Serializer):
     file = serializers.FileField(required=False)
     public = serializers.BooleanField()
@@ -313,12 +468,24 @@ class FileUploadSerializer(serializers.Serializer):
     description = serializers.CharField(max_length=200)
 
     def validate_file(self, value):
+        name, compression = split_compression(value.name.lower())
+        extension = name.split(".")[-1]
+        if extension in COLUMNAR_MIME_TYPES:
+            return value
+
+        # Only the tail is kept in memory, the last line is all that matters
+        stream = open_decompressed(value, compression)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        tail = ""
         try:
-            content = value.read().decode("utf-8").splitlines()
+            while chunk := stream.read(CHUNK_SIZE):
+                tail = (tail + decoder.decode(chunk))[-CHUNK_SIZE:]
+            tail += decoder.decode(b"", final=True)
         except UnicodeDecodeError as exp:
             raise InvalidFileException(error=str(exp))
 
-        if content[-1].strip() == "":
+        content = tail.splitlines()
+        if content and content[-1].strip() == "":
             raise serializers.ValidationError(
                 {"detail": _("You must remove the blank rows at the end of the file.")}
             )
@@ -362,7 +529,11 @@ class FileUploadSerializer(serializers.Serializer):
         upload_type = attrs.get("upload_type")
         extension = ""
 
-        if not attrs.get("autodetect") and not attrs.get("schema"):
+        if (
+            not attrs.get("autodetect")
+            and not attrs.get("schema")
+            and file_type not in COLUMNAR_MIME_TYPES
+        ):
             raise serializers.ValidationError(
                 {
                     "detail": _(
@@ -390,17 +561,27 @@ class FileUploadSerializer(serializers.Serializer):
                 {"detail": _("Url was not found for upload_type url")}
             )
 
+        compression = None
         if upload_type == UploadType.FILE:
             file = attrs["file"]
+            validate_size(file.size)
 
-            extension = attrs["file"].name.lower().split(".")[-1]
+            name, compression = split_compression(attrs["file"].name.lower())
+            extension = name.split(".")[-1]
             validate_extension(extension)
             attrs["extension"] = FileType(extension)
 
+            if compression and extension in COLUMNAR_MIME_TYPES:
+                raise serializers.ValidationError(
+                    {"detail": _("Parquet and Avro files can't be compressed.")}
+                )
+
             mime = magic.Magic(mime=True)
-            mime_type = mime.from_buffer(file.read(4096))
+            mime_type = mime.from_buffer(
+                open_decompressed(file, compression).read(4096)
+            )
             file.seek(0)
-            validate_mimes(mime_type)
+            validate_mimes(mime_type, extension)
 
             serializer_class_name = f"{file_type.upper()}Serializer"
             serializer_class = globals().get(serializer_class_name)
@@ -410,11 +591,19 @@ class FileUploadSerializer(serializers.Serializer):
                     file=attrs["file"],
                     schema=attrs.get("schema", []),
                     autodetect=attrs.get("autodetect", False),
+                    compression=compression,
                 )
-                serializer_class(data=data).is_valid(raise_exception=True)
+                serializer = serializer_class(data=data)
+                serializer.is_valid(raise_exception=True)
+                # the CSV parameters detected while validating are reused
+                if "csv_params" in serializer.validated_data:
+                    attrs["csv_params"] = serializer.validated_data["csv_params"]
 
         elif upload_type == UploadType.URL:
+            if file_type not in URL_FILE_TYPES:
+                raise _url_file_type_error()
             extension = self.fields.get("url").extension
+            compression = self.fields.get("url").compression
 
         if attrs.get("skip_leading_rows") is None and extension == "csv":
             raise serializers.ValidationError(
@@ -422,6 +611,7 @@ class FileUploadSerializer(serializers.Serializer):
             )
 
         attrs["extension"] = extension
+        attrs["compression"] = compression
         return attrs
 
 
@@ -143,3 +143,9 @@ class TableSchemaSerializer(serializers.Serializer):
                 field=value
             )
         )
+
+
+class TableStageSerializer(serializers.Serializer):
+    tables = serializers.PrimaryKeyRelatedField(
+        many=True, queryset=Table.objects.filter(mounted=True), allow_empty=False
+    )
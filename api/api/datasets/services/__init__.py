@@ -4,3 +4,4 @@ from .big_query_service import BigQueryService
 from .file_service import FileServiceFactory, StructuredFileService
 from .transformation_service import apply_transformations
 from .chart_service import ChartService, chart_select
+from .notebook_staging_service import NotebookStagingService
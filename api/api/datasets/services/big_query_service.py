@@ -34,6 +34,8 @@ class BigQueryService:
             "csv": bigquery.SourceFormat.CSV,
             "json": bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
             "jsonl": bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            "parquet": bigquery.SourceFormat.PARQUET,
+            "avro": bigquery.SourceFormat.AVRO,
         }
         return formats.get(extension.lower(), bigquery.SourceFormat.CSV)
 
@@ -126,6 +128,39 @@ class BigQueryService:
             message = exp.message.split("\n")[0]
             raise QueryFailedException(detail=message, error=str(exp))
 
+    @staticmethod
+    def load_job_config(
+        extension: str,
+        autodetect: bool,
+        skip_leading_rows: int,
+        schema: List,
+        format_params: Dict = None,
+    ) -> bigquery.LoadJobConfig:
+        job_config = bigquery.LoadJobConfig(
+            source_format=BigQueryService.get_source_format(extension),
+            autodetect=autodetect,
+        )
+
+        if extension == "avro":
+            job_config.use_avro_logical_types = True
+        if extension == "parquet":
+            # lists are written as list<item>, without list inference they'd
+            # be loaded as RECORDs wrapping the values instead of REPEATED
+            parquet_options = bigquery.ParquetOptions()
+            parquet_options.enable_list_inference = True
+            job_config.parquet_options = parquet_options
+
+        if format_params:
+            job_config.field_delimiter = format_params.get("delimiter", ",")
+            job_config.quote_character = format_params.get("quotechar", ",")
+
+        if skip_leading_rows:
+            job_config.skip_leading_rows = skip_leading_rows
+        if schema:
+            bigquery_schema = BigQueryService.convert_schema_to_bigquery(schema)
+            job_config.schema = bigquery_schema
+        return job_config
+
     def mount_table_from_gcs(
         self,
         table: Table,
@@ -139,23 +174,10 @@ class BigQueryService:
             table_ref = self.get_table_reference(
                 dataset=table.dataset_name, table_name=table.name
             )
-            extension = table.file.type
-
-            job_config = bigquery.LoadJobConfig(
-                source_format=BigQueryService.get_source_format(extension),
-                autodetect=autodetect,
+            job_config = BigQueryService.load_job_config(
+                table.file.type, autodetect, skip_leading_rows, schema, format_params
             )
 
-            if format_params:
-                job_config.field_delimiter = format_params.get("delimiter", ",")
-                job_config.quote_character = format_params.get("quotechar", ",")
-
-            if skip_leading_rows:
-                job_config.skip_leading_rows = skip_leading_rows
-            if schema:
-                bigquery_schema = BigQueryService.convert_schema_to_bigquery(schema)
-                job_config.schema = bigquery_schema
-
             gcs_uri = table.file.storage_url
             load_job = owner_client.load_table_from_uri(
                 gcs_uri, table_ref, job_config=job_config
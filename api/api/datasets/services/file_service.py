@@ -3,8 +3,12 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils.translation import gettext_lazy as _
 
 from api.users.models import User
+from api.datasets.enums import Compression, FileType
+from api.datasets.exceptions import InvalidFileException
 from api.datasets.models import File, Table
 from api.datasets.utils import (
     csv_parameters_detect,
@@ -12,6 +16,13 @@ from api.datasets.utils import (
     prepare_json_data_format,
     normalize_column_name,
 )
+from api.datasets.utils.compression import (
+    compression_suffix,
+    open_decompressed,
+    split_compression,
+    transcode_to_gzip,
+)
+from api.datasets.utils.parquet import csv_to_parquet, json_to_parquet
 from api.utils.basics import generate_random_string
 from .big_query_service import BigQueryService
 from .google_cloud_storage_service import GCSService, JSONGCSService
@@ -29,6 +40,8 @@ class FileServiceFactory:
             class_ = CSVFileService
         elif extension.lower() in ["json", "jsonl"]:
             class_ = JSONFileService
+        elif extension.lower() in ["parquet", "avro"]:
+            class_ = ColumnarFileService
 
         if not return_instance:
             return class_
@@ -44,10 +57,13 @@ class FileService(ABC):
         self.public = kwargs["public"]
         self.user = user
         self.description = kwargs["description"]
-        file, extension = os.path.splitext(kwargs["file"].name)
+        self.compression = kwargs.get("compression")
+        name = split_compression(kwargs["file"].name)[0]
+        file, extension = os.path.splitext(name)
         bigquery_valid_filename = normalize_column_name(file)
+        suffix = compression_suffix(self.compression)
         self.filename = (
-            f"{generate_random_string(10)}_{bigquery_valid_filename}{extension}"
+            f"{generate_random_string(10)}_{bigquery_valid_filename}{extension}{suffix}"
         )
 
     def create_file_object(self, file_url: str):
@@ -72,6 +88,9 @@ class StructuredFileService(FileService):
         super().__init__(user, **kwargs)
         self.autodetect = kwargs.get("autodetect", False)
         self.schema = kwargs.get("schema")
+        self.parquet_conversion = kwargs.get(
+            "parquet_conversion", settings.DATASETS_PARQUET_CONVERSION
+        )
 
     def create_table_obj(self, file_obj: File) -> Table:
         dataset_name = settings.BQ_DATASET_ID
@@ -89,6 +108,58 @@ class StructuredFileService(FileService):
         table.save()
         return table
 
+    def use_parquet(self) -> bool:
+        """
+        The columnar stage needs a confirmed schema, with autodetect
+        BigQuery is left to infer the types from the raw file.
+        """
+        return bool(self.parquet_conversion and self.schema)
+
+    def convert_to_parquet(self, converter, **kwargs) -> None:
+        """
+        Streams the validated file into Parquet with the confirmed schema and
+        replaces the file to upload with the converted one.
+        """
+        name = split_compression(self.filename)[0]
+        filename = f"{os.path.splitext(name)[0]}.parquet"
+        parquet_file = TemporaryUploadedFile(
+            name=filename,
+            content_type="application/vnd.apache.parquet",
+            size=0,
+            charset=None,
+        )
+        source = open_decompressed(self.file, self.compression)
+        converter(source, parquet_file, schema=self.schema, **kwargs)
+        parquet_file.size = parquet_file.tell()
+        parquet_file.seek(0)
+
+        self.file = parquet_file
+        self.filename = filename
+        self.extension = FileType.PARQUET
+        self.compression = None
+
+    def transcode_compressed_file(self) -> None:
+        """
+        BigQuery only loads gzip compressed CSV and JSON files from Cloud
+        Storage, other codecs are recompressed before the upload.
+        """
+        if self.compression in [None, Compression.GZIP]:
+            return
+
+        self.file = transcode_to_gzip(self.file, self.compression)
+        self.filename = f"{split_compression(self.filename)[0]}.gz"
+        self.compression = Compression.GZIP
+
+    def mount_table(self, file_obj: File, **kwargs) -> None:
+        table_obj = self.create_table_obj(file_obj)
+        big_query_service = BigQueryService(user=self.user)
+        big_query_service.mount_table_from_gcs(
+            table=table_obj,
+            autodetect=self.autodetect,
+            schema=self.schema,
+            **kwargs,
+        )
+
     @staticmethod
     @abstractmethod
     def preview(data: str, skip_leading_rows: int) -> List: ...
@@ -107,25 +178,36 @@ class CSVFileService(StructuredFileService):
     def __init__(self, user: User, **kwargs):
         super().__init__(user, **kwargs)
         self.skip_leading_rows = kwargs.get("skip_leading_rows", 1)
+        self.csv_params = kwargs.get("csv_params")
 
     @staticmethod
     def preview(data: str, skip_leading_rows: int) -> List:
         return prepare_csv_data_format(data=data, skip_leading_rows=skip_leading_rows)
 
     def process_file(self):
+        format_params = self.csv_params
+        if format_params is None:
+            sample = open_decompressed(self.file, self.compression).read(4096)
+            self.file.seek(0)
+            format_params = csv_parameters_detect(sample.decode("utf-8"))
+
+        if self.use_parquet():
+            self.convert_to_parquet(
+                csv_to_parquet,
+                csv_params=format_params,
+                skip_leading_rows=self.skip_leading_rows,
+            )
+            file_url = GCSService.upload_file(self.file, self.filename)
+            file_obj = self.create_file_object(file_url)
+            self.mount_table(file_obj, skip_leading_rows=0)
+            return file_url
+
+        self.transcode_compressed_file()
         file_url = GCSService.upload_file(self.file, self.filename)
         file_obj = self.create_file_object(file_url)
-        table_obj = self.create_table_obj(file_obj)
-        sample = self.file.read(4096).decode("utf-8")
-        self.file.seek(0)
-        format_params = csv_parameters_detect(sample)
-
-        big_query_service = BigQueryService(user=self.user)
-        big_query_service.mount_table_from_gcs(
-            table=table_obj,
-            autodetect=self.autodetect,
+        self.mount_table(
+            file_obj,
             skip_leading_rows=self.skip_leading_rows,
-            schema=self.schema,
             format_params=format_params,
         )
         return file_url
@@ -138,15 +220,42 @@ class JSONFileService(StructuredFileService):
         return prepare_json_data_format(data=data)
 
     def process_file(self):
-        upload_service = JSONGCSService()
-        file_url = upload_service.upload_file(self.file, self.filename)
+        if self.use_parquet():
+            # compressed arrays are rewritten gzip compressed
+            self.compression = JSONGCSService.convert_to_newline_delimited_json(
+                self.file, self.compression
+            )
+            name = split_compression(self.filename)[0]
+            self.filename = f"{name}{compression_suffix(self.compression)}"
+            self.file.seek(0)
+            self.convert_to_parquet(json_to_parquet)
+            file_url = GCSService.upload_file(self.file, self.filename)
+        else:
+            self.transcode_compressed_file()
+            upload_service = JSONGCSService()
+            file_url = upload_service.upload_file(
+                self.file, self.filename, self.compression
+            )
+
         file_obj = self.create_file_object(file_url)
-        table_obj = self.create_table_obj(file_obj)
-        big_query_service = BigQueryService(user=self.user)
-        big_query_service.mount_table_from_gcs(
-            table=table_obj,
-            autodetect=self.autodetect,
-            skip_leading_rows=0,
-            schema=self.schema,
+        self.mount_table(file_obj, skip_leading_rows=0)
+        return file_url
+
+
+class ColumnarFileService(StructuredFileService):
+    """
+    Parquet and Avro files are self-describing, they are uploaded as they
+    are and BigQuery reads the schema from the file itself.
+    """
+
+    @staticmethod
+    def preview(data: str, skip_leading_rows: int) -> List:
+        raise InvalidFileException(
+            detail=_("Preview is not available for Parquet or Avro files.")
         )
+
+    def process_file(self):
+        file_url = GCSService.upload_file(self.file, self.filename)
+        file_obj = self.create_file_object(file_url)
+        self.mount_table(file_obj, skip_leading_rows=0)
         return file_url
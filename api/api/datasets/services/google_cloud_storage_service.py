@@ -1,13 +1,18 @@
+import gzip
 import json
-from io import StringIO
+import os
+import tempfile
 
 from google.cloud import storage
 from django.conf import settings
 
+from api.datasets.enums import Compression
 from api.datasets.exceptions import (
     UploadFailedException,
     CloudStorageOperationException,
 )
+from api.datasets.utils.compression import CHUNK_SIZE, open_decompressed
+from api.datasets.utils.json import iter_json_items
 
 
 class GCSService:
@@ -47,46 +52,73 @@ class GCSService:
 
 
 class JSONGCSService(GCSService):
+    # NDJSON is recognized from its first line, bounded to this size
+    PREFIX_SIZE = 1024 * 1024
 
-    @staticmethod
-    def is_newline_delimited_json(content: str) -> bool:
+    @classmethod
+    def is_newline_delimited_json(cls, stream) -> bool:
+        line = b""
         try:
-            lines = content.splitlines()
-            if len(lines) <= 1:
-                return False
-            for line in lines:
-                line = line.strip()
-                if line:
-                    json.loads(line)
+            while not line.strip():
+                line = stream.readline(cls.PREFIX_SIZE)
+                if not line:
+                    return False
+        finally:
+            stream.seek(0)
+
+        if line.lstrip().startswith(b"["):
+            return False
+        try:
+            json.loads(line)
             return True
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, UnicodeDecodeError):
             return False
 
     @classmethod
-    def convert_to_newline_delimited_json(cls, file) -> None:
-        content = file.read().decode("utf-8")
-        if cls.is_newline_delimited_json(content):
-            return
-        data = json.loads(content)
-        output = StringIO()
-        if isinstance(data, list) and all(isinstance(item, dict) for item in data):
-            for item in data:
-                output.write(json.dumps(item) + "\n")
-
-        elif isinstance(data, dict):
-            output.write(json.dumps(data))
-
-        else:
-            return None
-
+    def convert_to_newline_delimited_json(
+        cls, file, compression: str = None
+    ) -> str | None:
+        """
+        Rewrites a JSON array, or a pretty printed object, as newline
+        delimited JSON. Items are streamed one at a time into a spooled
+        temporary file, so memory use doesn't depend on the file size.
+
+        Returns:
+            str | None: Compression of the file content afterwards, gzip when
+            compressed content was rewritten.
+        """
+        stream = open_decompressed(file, compression)
+        if cls.is_newline_delimited_json(stream):
+            file.seek(0)
+            return compression
+
+        output = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        # converted content is written back gzip compressed, that's the
+        # only codec BigQuery loads from Cloud Storage
+        writer = gzip.GzipFile(fileobj=output, mode="wb") if compression else output
+
+        chunks = iter(lambda: stream.read(CHUNK_SIZE), b"")
+        for item in iter_json_items(chunks):
+            if not isinstance(item, dict):
+                # left as is, the load reports the invalid rows
+                output.close()
+                file.seek(0)
+                return compression
+            writer.write(json.dumps(item).encode("utf-8") + b"\n")
+
+        if compression:
+            writer.close()
+        output.seek(0, os.SEEK_END)
+        file.size = output.tell()
         output.seek(0)
         file.file = output
-        file.size = len(output.getvalue())
-        file.name = file.name
+        return Compression.GZIP if compression else None
 
     @classmethod
-    def upload_file(cls, file, filename: str) -> str:
-        cls.convert_to_newline_delimited_json(file)
+    def upload_file(cls, file, filename: str, compression: str = None) -> str:
+        cls.convert_to_newline_delimited_json(file, compression)
         file.seek(0)
         return super(JSONGCSService, cls).upload_file(file, filename)
 
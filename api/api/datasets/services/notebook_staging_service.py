@@ -0,0 +1,187 @@
+import json
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from google.cloud import bigquery, storage
+
+from api.datasets.exceptions import NotebookStagingException
+from api.datasets.models import Table
+from api.users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class NotebookStagingService:
+    """
+    Copies tables into the notebook folder of a user as Parquet files, so
+    notebooks read local columnar files instead of scanning BigQuery again.
+
+    Each table is exported by a BigQuery extract job, sharded by BigQuery,
+    under <user_id>/staged/<dataset>/<table>/<version>/ of the notebook
+    bucket. <user_id>/staged/manifest.json lists the staged tables with
+    their version, schema and files, and a table whose version didn't change
+    since it was staged isn't exported again.
+
+    Staging runs of the same user may overlap, so the manifest is only
+    written over the generation it was read from, and merged again with the
+    latest one when another run wrote it in between.
+    """
+
+    FOLDER = "staged"
+    MANIFEST = "manifest.json"
+    MANIFEST_RETRIES = 5
+
+    def __init__(self, user: User) -> None:
+        self.user = user
+        self.bigquery = bigquery.Client()
+        self.storage = storage.Client()
+        self.bucket = self.storage.bucket(settings.GCS_NOTEBOOK_BUCKET)
+        self.prefix = f"{user.id}/{self.FOLDER}"
+
+    @staticmethod
+    def table_version(bq_table: bigquery.Table) -> str:
+        # modified moves on every write to the table
+        return str(int(bq_table.modified.timestamp() * 1000))
+
+    def read_manifest(self) -> tuple[dict, int]:
+        """
+        Returns:
+            tuple[dict, int]: The manifest and its generation, 0 when there
+                is no manifest yet.
+        """
+        blob = self.bucket.blob(f"{self.prefix}/{self.MANIFEST}")
+        try:
+            return json.loads(blob.download_as_bytes()), blob.generation
+        except NotFound:
+            return {"tables": {}}, 0
+
+    def write_manifest(self, manifest: dict, generation: int) -> None:
+        """
+        Raises:
+            PreconditionFailed: The manifest isn't at generation anymore.
+        """
+        manifest["updated_at"] = timezone.now().isoformat()
+        blob = self.bucket.blob(f"{self.prefix}/{self.MANIFEST}")
+        blob.upload_from_string(
+            json.dumps(manifest, indent=2),
+            content_type="application/json",
+            if_generation_match=generation,
+        )
+
+    def merge_manifest(self, staged: dict) -> dict:
+        """
+        Adds the staged entries to the latest manifest, keeping the newest
+        version of each table, and removes the files of the replaced ones.
+
+        Returns:
+            dict: The manifest.
+
+        Raises:
+            NotebookStagingException: The manifest kept changing.
+        """
+        for _ in range(self.MANIFEST_RETRIES):
+            manifest, generation = self.read_manifest()
+            entries = manifest["tables"]
+            replaced = []
+            for path, entry in staged.items():
+                current = entries.get(path)
+                if current and int(current["version"]) > int(entry["version"]):
+                    # another run staged a newer version meanwhile
+                    replaced.append(entry["prefix"])
+                    continue
+                if current and current["prefix"] != entry["prefix"]:
+                    replaced.append(current["prefix"])
+                entries[path] = entry
+            try:
+                self.write_manifest(manifest, generation)
+            except PreconditionFailed:
+                continue
+            for prefix in replaced:
+                self.delete_files(prefix)
+            return manifest
+        raise NotebookStagingException(error="The manifest kept changing")
+
+    def list_files(self, prefix: str) -> list[dict]:
+        return [
+            {
+                # relative to the notebook data folder
+                "path": blob.name.removeprefix(f"{self.user.id}/"),
+                "uri": f"gs://{self.bucket.name}/{blob.name}",
+                "size": blob.size,
+            }
+            for blob in self.storage.list_blobs(self.bucket, prefix=f"{prefix}/")
+        ]
+
+    def delete_files(self, prefix: str) -> None:
+        for blob in self.storage.list_blobs(self.bucket, prefix=f"{prefix}/"):
+            blob.delete()
+
+    def export(self, table: Table, prefix: str) -> bigquery.ExtractJob:
+        job_config = bigquery.ExtractJobConfig(
+            destination_format=bigquery.DestinationFormat.PARQUET,
+            compression=bigquery.Compression.SNAPPY,
+        )
+        return self.bigquery.extract_table(
+            table.path,
+            f"gs://{self.bucket.name}/{prefix}/part-*.parquet",
+            job_config=job_config,
+        )
+
+    def stage(self, tables: list[Table]) -> dict:
+        """
+        Exports the tables that changed since they were staged and updates
+        the manifest. Extract jobs run concurrently in BigQuery.
+
+        Returns:
+            dict: The manifest.
+
+        Raises:
+            NotebookStagingException: A table couldn't be exported, the
+                other tables are staged anyway.
+        """
+        manifest, _ = self.read_manifest()
+        entries = manifest["tables"]
+
+        jobs = []
+        errors = []
+        for table in tables:
+            try:
+                bq_table = self.bigquery.get_table(table.path)
+                version = self.table_version(bq_table)
+                if entries.get(table.path, {}).get("version") == version:
+                    continue
+                prefix = f"{self.prefix}/{table.dataset_name}/{table.name}/{version}"
+                jobs.append(
+                    (table, bq_table, version, prefix, self.export(table, prefix))
+                )
+            except Exception as exp:
+                errors.append(f"{table.path}: {exp}")
+
+        staged = {}
+        for table, bq_table, version, prefix, job in jobs:
+            try:
+                job.result()
+            except Exception as exp:
+                errors.append(f"{table.path}: {exp}")
+                continue
+
+            staged[table.path] = {
+                "table_id": table.id,
+                "name": table.name,
+                "version": version,
+                "rows": bq_table.num_rows,
+                "schema": [field.to_api_repr() for field in bq_table.schema],
+                "format": "parquet",
+                "prefix": prefix,
+                "files": self.list_files(prefix),
+                "staged_at": timezone.now().isoformat(),
+            }
+
+        if staged:
+            manifest = self.merge_manifest(staged)
+        if errors:
+            logger.warning("Tables not staged: %s", errors)
+            raise NotebookStagingException(error="; ".join(errors))
+        return manifest
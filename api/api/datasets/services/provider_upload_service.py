@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Dict
+import re
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+import requests
 from botocore import UNSIGNED
 from botocore.client import Config
 from django.conf import settings
@@ -15,7 +19,10 @@ from api.datasets.exceptions import (
     UrlFolderNameExtractionException,
     UrlProviderException,
 )
-from api.datasets.decorators import decode_url
+from api.datasets.decorators import decode_url, provider_cache
+from api.datasets.utils.compression import split_compression
+from api.datasets.utils.mime import content_mime_type, guess_mime_type
+from api.utils import http
 
 
 class ProviderService(ABC):
@@ -49,6 +56,24 @@ class GoogleDriveService(ProviderService):
     except Exception as e:
         print("Google credentials from google drive were not loaded")
 
+    PAGE_SIZE = 1000
+    _local = threading.local()
+
+    @classmethod
+    def get_service(cls):
+        """
+        Drive API client, built once and reused: parsing the discovery
+        document is expensive. It's kept per thread because the underlying
+        http transport isn't thread safe.
+        """
+        service = getattr(cls._local, "service", None)
+        if service is None:
+            service = build(
+                "drive", "v3", credentials=cls.credentials, cache_discovery=False
+            )
+            cls._local.service = service
+        return service
+
     @classmethod
     @decode_url
     def is_folder(cls, url: str) -> bool:
@@ -101,24 +126,31 @@ class GoogleDriveService(ProviderService):
         return file_id
 
     @classmethod
+    @provider_cache
     @decode_url
     def list_files(cls, url: str) -> list:
-        """List the files in a public folder"""
+        """List the files in a public folder, following every page"""
 
-        service = build("drive", "v3", credentials=cls.credentials)
+        service = cls.get_service()
 
         folder_name = cls.get_folder_name(url)
-        results = (
-            service.files()
-            .list(
-                q=f"'{folder_name}' in parents and trashed=false",
-                fields="files(id, name, webViewLink, webContentLink, size, mimeType)",
+        files = []
+        page_token = None
+        while True:
+            results = (
+                service.files()
+                .list(
+                    q=f"'{folder_name}' in parents and trashed=false",
+                    fields="nextPageToken, files(id, name, webViewLink, webContentLink, size, mimeType, modifiedTime)",
+                    pageSize=cls.PAGE_SIZE,
+                    pageToken=page_token,
+                )
+                .execute()
             )
-            .execute()
-        )
-        files = results.get("files", [])
-
-        return files
+            files.extend(results.get("files", []))
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return files
 
     @classmethod
     @decode_url
@@ -131,13 +163,16 @@ class GoogleDriveService(ProviderService):
         return f"https://drive.google.com/uc?export=download&id={file_id}"
 
     @classmethod
+    @provider_cache
     @decode_url
     def get_file_metadata(cls, url: str) -> dict:
-        service = build("drive", "v3", credentials=cls.credentials)
+        service = cls.get_service()
         file_id = cls.get_file_id(url)
 
         meta = (
-            service.files().get(fileId=file_id, fields="name, size, mimeType").execute()
+            service.files()
+            .get(fileId=file_id, fields="name, size, mimeType, modifiedTime")
+            .execute()
         )
         return meta
 
@@ -232,15 +267,35 @@ class S3Service(ProviderService):
         return bucket_name
 
     @classmethod
+    def get_content_type(cls, bucket_name: str, object_key: str) -> str:
+        try:
+            res = cls.client.head_object(Bucket=bucket_name, Key=object_key)
+        except Exception:
+            return "application/octet-stream"
+        return res.get("ContentType", "application/octet-stream")
+
+    @classmethod
+    @provider_cache
     @decode_url
     def list_files(cls, url: str) -> list:
+        """
+        Lists every object under the folder prefix, following the
+        pagination. Content types come from the file extensions, objects
+        with unknown extensions are requested with head_object through a
+        bounded thread pool. Downloads and previews check the served
+        Content-Type with the same rule (see content_mime_type), so an
+        object stored as binary/octet-stream is accepted by both.
+        """
         bucket_name = cls.get_bucket_name(url)
         folder_prefix = cls.get_folder_name(url)
 
+        paginator = cls.client.get_paginator("list_objects_v2")
         try:
-            res: Dict = cls.client.list_objects_v2(
-                Bucket=bucket_name, Prefix=folder_prefix
-            )
+            contents = [
+                obj
+                for page in paginator.paginate(Bucket=bucket_name, Prefix=folder_prefix)
+                for obj in page.get("Contents", [])
+            ]
         except Exception as e:
             raise UrlFolderNameExtractionException(
                 _(
@@ -248,29 +303,37 @@ class S3Service(ProviderService):
                 )
             )
 
-        if "Contents" not in res:
+        if not contents:
             raise UrlFolderNameExtractionException(_("No objects found in this folder"))
 
         items = []
-        for i in res["Contents"]:
-            object_key = i.get("Key")
-            head_res = cls.client.head_object(Bucket=bucket_name, Key=object_key)
-            content_type = head_res.get("ContentType", "application/octet-stream")
-
+        ambiguous = {}
+        for i in contents:
             name = i.get("Key").split("/")[-1]
             if name:
-                items.append(
-                    dict(
-                        name=name,
-                        size=i.get("Size"),
-                        mimeType=content_type,
-                        webContentLink=f"{url}{name}",
-                    )
+                item = dict(
+                    name=name,
+                    size=i.get("Size"),
+                    mimeType=guess_mime_type(name),
+                    webContentLink=f"{url}{name}",
+                    version=i.get("ETag"),
+                )
+                if item["mimeType"] is None:
+                    ambiguous[i.get("Key")] = item
+                items.append(item)
+
+        if ambiguous:
+            with ThreadPoolExecutor(settings.S3_HEAD_OBJECT_WORKERS) as executor:
+                content_types = executor.map(
+                    lambda key: cls.get_content_type(bucket_name, key), ambiguous
                 )
+                for item, content_type in zip(ambiguous.values(), content_types):
+                    item["mimeType"] = content_type
 
         return items
 
     @classmethod
+    @provider_cache
     @decode_url
     def get_file_metadata(cls, url: str) -> dict:
         bucket_name = cls.get_bucket_name(url)
@@ -285,10 +348,15 @@ class S3Service(ProviderService):
                 )
             )
 
-        content_type = res.get("ContentType", "application/octet-stream")
+        name = object_key.split("/")[-1]
         size = res.get("ContentLength", 0)
 
-        item = dict(name=object_key.split("/")[-1], size=size, mimeType=content_type)
+        item = dict(
+            name=name,
+            size=size,
+            mimeType=content_mime_type(res.get("ContentType"), name),
+            version=res.get("ETag"),
+        )
 
         return item
 
@@ -375,6 +443,7 @@ class GoogleCloudService(ProviderService):
         return object_key
 
     @classmethod
+    @provider_cache
     @decode_url
     def list_files(cls, url: str) -> list:
         bucket_name = cls.get_bucket_name(url)
@@ -390,12 +459,14 @@ class GoogleCloudService(ProviderService):
                     size=blob.size,
                     mimeType=blob.content_type,
                     webContentLink=blob.media_link,
+                    version=blob.generation,
                 )
                 items.append(item)
 
         return items
 
     @classmethod
+    @provider_cache
     @decode_url
     def get_file_metadata(cls, url: str) -> dict:
         bucket_name = cls.get_bucket_name(url)
@@ -418,6 +489,92 @@ class GoogleCloudService(ProviderService):
                 )
             )
 
-        item = dict(name=res.name, size=res.size, mimeType=res.content_type)
+        item = dict(
+            name=res.name,
+            size=res.size,
+            mimeType=res.content_type,
+            version=res.generation,
+        )
 
         return item
+
+
+class HttpsService(ProviderService):
+    """
+    Files served over plain HTTPS, e.g. open data portals. There are no
+    folders, the metadata comes from the response headers.
+    """
+
+    @classmethod
+    def is_folder(cls, url: str) -> bool:
+        return False
+
+    @classmethod
+    def list_files(cls, url: str) -> list:
+        raise UrlProviderException(_("Folders are not supported for https urls"))
+
+    @staticmethod
+    def get_file_name(response) -> str:
+        disposition = response.headers.get("Content-Disposition", "")
+        match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", disposition)
+        if match:
+            return urllib.parse.unquote(match.group(1))
+
+        path = urllib.parse.urlsplit(response.url).path
+        return urllib.parse.unquote(path.rstrip("/").split("/")[-1])
+
+    @classmethod
+    def probe(cls, url: str):
+        """
+        HEAD request following redirects, servers that refuse HEAD are asked
+        for their first byte instead. Urls come from users, every hop must
+        be a public host (see http.request_public).
+        """
+        try:
+            response = http.request_public("HEAD", url)
+            if response.status_code in [403, 405, 501]:
+                response = http.get_public(
+                    url,
+                    stream=True,
+                    headers={"Range": "bytes=0-0", "Accept-Encoding": "identity"},
+                )
+                response.close()
+        except http.BlockedHostError:
+            raise UrlProviderException(_("The url host is not allowed"))
+        except requests.RequestException:
+            raise UrlFileNotExistException()
+
+        if response.status_code not in [200, 206]:
+            raise UrlFileNotExistException()
+        return response
+
+    @classmethod
+    @provider_cache
+    def get_file_metadata(cls, url: str) -> dict:
+        response = cls.probe(url)
+        headers = response.headers
+
+        if response.status_code == 206:
+            # Content-Range: bytes 0-0/1234
+            total = headers.get("Content-Range", "").rsplit("/", 1)[-1]
+            size = int(total) if total.isdigit() else 0
+            accept_ranges = True
+        else:
+            size = int(headers.get("Content-Length", 0) or 0)
+            accept_ranges = headers.get("Accept-Ranges", "").lower() == "bytes"
+        # byte ranges address the encoded body, not the file
+        if headers.get("Content-Encoding", "identity") != "identity":
+            accept_ranges = False
+
+        name = cls.get_file_name(response)
+        mime_type = content_mime_type(headers.get("Content-Type"), name)
+
+        return dict(
+            name=name,
+            size=size,
+            mimeType=mime_type,
+            version=headers.get("ETag"),
+            acceptRanges=accept_ranges,
+            md5=headers.get("Content-MD5"),
+            webContentLink=response.url,
+        )
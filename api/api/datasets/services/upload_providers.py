@@ -1,11 +1,13 @@
 from abc import ABC
 import requests
 
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.core.files.uploadedfile import TemporaryUploadedFile
 
 from api.datasets.enums import FileType
 from api.datasets.exceptions import (
+    DownloadFailedException,
     UploadFailedException,
     UrlFileNotExistException,
     UrlProviderException,
@@ -13,12 +15,22 @@ from api.datasets.exceptions import (
 from api.datasets.services.provider_upload_service import (
     GoogleCloudService,
     GoogleDriveService,
+    HttpsService,
     S3Service,
     ProviderService,
 )
+from api.datasets.utils.compression import COMPRESSED_MIME_TYPES, split_compression
+from api.datasets.utils.provider_cache import (
+    cache_key,
+    folder_version,
+    get_or_set,
+    normalize_url,
+    resource_version,
+)
 from api.datasets.utils.json import get_content_from_url_json, prepare_json_data_format
 from api.datasets.utils.csv import get_content_from_url_csv, prepare_csv_data_format
 from api.datasets.utils.text import get_content_from_url_text
+from api.utils import http
 
 
 def identify_url_provider(url: str) -> str:
@@ -35,6 +47,9 @@ def identify_url_provider(url: str) -> str:
     if url.find("storage.googleapis.com") >= 0:
         return "google_cloud"
 
+    if url.startswith("https://"):
+        return "https"
+
     raise UrlProviderException(error=_("Provider in url not supported"))
 
 
@@ -48,6 +63,7 @@ def return_url_provider(url: str):
         google_drive=GoogleDriveProvider(),
         s3=S3Provider(),
         google_cloud=GoogleCloudProvider(),
+        https=HttpsProvider(),
     )
 
     provider = identify_url_provider(url)
@@ -72,7 +88,12 @@ class BaseUploadProvider(ABC):
         return file
 
     def process_file(self, url: str, skip_leading_rows: int) -> TemporaryUploadedFile:
-        r = requests.get(url, stream=True)
+        try:
+            r = http.get_public(url, stream=True)
+        except http.BlockedHostError:
+            raise UrlProviderException(error=_("The url host is not allowed"))
+        except requests.RequestException:
+            raise UrlFileNotExistException()
         metadata = self.service.get_file_metadata(url)
 
         file = TemporaryUploadedFile(
@@ -82,12 +103,18 @@ class BaseUploadProvider(ABC):
             charset=None,
         )
 
-        if r.status_code == 200 and metadata.get("mimeType") in [
-            "text/csv",
-            "application/json",
-            "text/plain",
-        ]:
-            for chunk in r.iter_content(chunk_size=8192):
+        mime_types = ["text/csv", "application/json", "text/plain"]
+        compression = split_compression(metadata.get("name", ""))[1]
+        if compression:
+            # compressed files are stored as they are, the raw stream skips
+            # the Content-Encoding decoding done by requests
+            mime_types += COMPRESSED_MIME_TYPES[compression]
+            chunks = r.raw.stream(8192, decode_content=False)
+        else:
+            chunks = r.iter_content(chunk_size=8192)
+
+        if r.status_code == 200 and metadata.get("mimeType") in mime_types:
+            for chunk in chunks:
                 file.write(chunk)
         else:
             raise UrlFileNotExistException()
@@ -104,8 +131,10 @@ class BaseUploadProvider(ABC):
         for i in files:
             size += int(i.get("size", 0))
 
+        # folder contents are joined decompressed
+        name, compression = split_compression(files[0].get("name", ""))
         file = TemporaryUploadedFile(
-            name=files[0].get("name", ""),
+            name=name,
             content_type="application/octet-stream",
             size=size,
             charset=None,
@@ -114,26 +143,66 @@ class BaseUploadProvider(ABC):
         urls = [i.get("webContentLink", "") for i in files]
 
         content = self.get_content_from_url(
-            urls, file_type, max_lines=None, skip_leading_rows=skip_leading_rows
+            urls,
+            file_type,
+            max_lines=None,
+            skip_leading_rows=skip_leading_rows,
+            compression=compression,
         )
 
         file.write(content.encode("utf-8"))
         file.seek(0)
         return file
 
-    def preview(self, url: str, file_type: FileType) -> list | str:
-        if self.service.is_folder(url):
-            preview = self.preview_folder(url, file_type)
-        else:
-            preview = self.preview_file(url, file_type)
-        return preview
-
-    def preview_file(self, url: str, file_type: FileType) -> list | str:
+    def preview(
+        self, url: str, file_type: FileType, compression: str = None
+    ) -> list | str:
+        """
+        Previews are cached by normalized url and the version of the objects
+        they were read from, so an upload of a newer file isn't served an old
+        preview. Urls whose version can't be read aren't cached.
+        """
+        is_folder = self.service.is_folder(url)
+
+        def compute():
+            if is_folder:
+                return self.preview_folder(url, file_type, compression)
+            return self.preview_file(url, file_type, compression)
+
+        version = self.get_version(url, is_folder)
+        if not version:
+            return compute()
+
+        key = cache_key(
+            type(self).__name__,
+            "preview",
+            normalize_url(url),
+            file_type,
+            compression,
+            version,
+        )
+        return get_or_set(key, compute, settings.PROVIDER_PREVIEW_CACHE_TIMEOUT)
+
+    def get_version(self, url: str, is_folder: bool) -> str:
+        """Version of the file or folder contents, empty when unknown."""
+        try:
+            if is_folder:
+                return folder_version(self.service.list_files(url))
+            return resource_version(self.service.get_file_metadata(url))
+        except Exception:
+            # private urls (e.g. S3 presigned) can be read but not inspected
+            return ""
+
+    def preview_file(
+        self, url: str, file_type: FileType, compression: str = None
+    ) -> list | str:
         assert file_type not in FileType.choices, "file_type not supported"
 
         preview = self.get_content_from_url(
             [url],
             file_type,
+            compression=compression,
+            ranged=settings.DATASETS_PREVIEW_RANGE_REQUESTS,
         )
         if file_type == FileType.TXT:
             return preview
@@ -142,12 +211,19 @@ class BaseUploadProvider(ABC):
 
         return bigquery_format
 
-    def preview_folder(self, url: str, file_type: FileType) -> list | str:
+    def preview_folder(
+        self, url: str, file_type: FileType, compression: str = None
+    ) -> list | str:
 
         files = self.service.list_files(url)
         urls = [u.get("webContentLink", "") for u in files]
 
-        preview = self.get_content_from_url(urls, file_type)
+        preview = self.get_content_from_url(
+            urls,
+            file_type,
+            compression=compression,
+            ranged=settings.DATASETS_PREVIEW_RANGE_REQUESTS,
+        )
         if file_type == FileType.TXT:
             return preview
 
@@ -195,9 +271,11 @@ class GoogleDriveProvider(BaseUploadProvider):
         d_url = self.service.convert_url(url)
         return super().process_file(d_url, skip_leading_rows)
 
-    def preview_file(self, url: str, file_type: FileType) -> list:
+    def preview_file(
+        self, url: str, file_type: FileType, compression: str = None
+    ) -> list:
         d_url = self.service.convert_url(url)
-        return super().preview_file(d_url, file_type)
+        return super().preview_file(d_url, file_type, compression)
 
 
 class S3Provider(BaseUploadProvider):
@@ -206,3 +284,48 @@ class S3Provider(BaseUploadProvider):
 
 class GoogleCloudProvider(BaseUploadProvider):
     service = GoogleCloudService
+
+
+class HttpsProvider(BaseUploadProvider):
+    service = HttpsService
+
+    def process_file(self, url: str, skip_leading_rows: int) -> TemporaryUploadedFile:
+        """
+        Large files from servers that accept byte ranges are downloaded with
+        several concurrent range requests, the rest as a single stream.
+        """
+        metadata = self.service.get_file_metadata(url)
+        size = metadata.get("size", 0)
+        if (
+            not metadata.get("acceptRanges")
+            or size < settings.HTTP_PARALLEL_DOWNLOAD_MIN_SIZE
+        ):
+            return super().process_file(url, skip_leading_rows)
+
+        compression = split_compression(metadata.get("name", ""))[1]
+        mime_types = ["text/csv", "application/json", "text/plain"]
+        if compression:
+            mime_types += COMPRESSED_MIME_TYPES[compression]
+        if metadata.get("mimeType") not in mime_types:
+            raise UrlFileNotExistException()
+
+        file = TemporaryUploadedFile(
+            name=metadata.get("name"),
+            content_type="application/octet-stream",
+            size=size,
+            charset=None,
+        )
+        try:
+            http.parallel_download(
+                metadata.get("webContentLink") or url,
+                file.file,
+                size,
+                workers=settings.HTTP_DOWNLOAD_WORKERS,
+                part_size=settings.HTTP_DOWNLOAD_PART_SIZE,
+                etag=metadata.get("version"),
+                md5=metadata.get("md5"),
+            )
+        except http.DownloadError as exp:
+            file.close()
+            raise DownloadFailedException(error=str(exp))
+        return file
@@ -0,0 +1,47 @@
+"""
+Celery tasks for datasets.
+api/api/datasets/tasks.py
+"""
+
+from __future__ import annotations
+
+import logging
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+
+from api.utils.web_socket import send_message
+
+logger = logging.getLogger(__name__)
+
+STAGING_MESSAGE_TYPE = "notebook_staging"
+
+
+@shared_task(name="datasets.stage_to_notebook", ignore_result=True)
+def stage_to_notebook(user_id: int, table_ids: list[int]) -> None:
+    """
+    Stages the tables into the notebook folder of the user and notifies
+    them with the staged tables or the error.
+    """
+    from api.datasets.models import Table
+    from api.datasets.services import NotebookStagingService
+    from api.users.models import User
+
+    user = User.objects.get(pk=user_id)
+    tables = list(Table.objects.filter(pk__in=table_ids))
+    service = NotebookStagingService(user)
+
+    message = {"tables": [table.path for table in tables]}
+    try:
+        manifest = service.stage(tables)
+        message["manifest"] = f"{service.FOLDER}/{service.MANIFEST}"
+        message["staged"] = {
+            path: entry["version"]
+            for path, entry in manifest["tables"].items()
+            if path in message["tables"]
+        }
+    except Exception as exp:
+        logger.exception("Tables %s not staged for user %s", table_ids, user_id)
+        message["error"] = str(getattr(exp, "error", None) or exp)
+
+    async_to_sync(send_message)(f"event-{user_id}", message, STAGING_MESSAGE_TYPE)
@@ -0,0 +1,75 @@
+"""Compressed upload tests."""
+
+import gzip
+
+import pytest
+import zstandard
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from api.datasets.enums import Compression
+from api.datasets.exceptions import DecompressionLimitException, InvalidFileException
+from api.datasets.utils.compression import (
+    iter_decompressed,
+    open_decompressed,
+    split_compression,
+    transcode_to_gzip,
+)
+
+CONTENT = b"id,name\n" + b"".join(b"%d,name %d\n" % (i, i) for i in range(1000))
+
+
+class TestSplitCompression:
+    def test_compressed_name(self):
+        assert split_compression("data.csv.gz") == ("data.csv", Compression.GZIP)
+        assert split_compression("data.JSON.zst") == ("data.JSON", Compression.ZSTD)
+
+    def test_plain_name(self):
+        assert split_compression("data.csv") == ("data.csv", None)
+
+
+class TestOpenDecompressed:
+    def test_gzip(self):
+        file = SimpleUploadedFile("data.csv.gz", gzip.compress(CONTENT))
+
+        assert open_decompressed(file, Compression.GZIP).read() == CONTENT
+
+    def test_zstd_restarts_on_seek(self):
+        file = SimpleUploadedFile(
+            "data.csv.zst", zstandard.ZstdCompressor().compress(CONTENT)
+        )
+        stream = open_decompressed(file, Compression.ZSTD)
+        stream.read(100)
+        stream.seek(0)
+
+        assert stream.read() == CONTENT
+
+    def test_not_compressed_content(self):
+        file = SimpleUploadedFile("data.csv.gz", CONTENT)
+
+        with pytest.raises(InvalidFileException):
+            open_decompressed(file, Compression.GZIP)
+
+    def test_ratio_limit(self, settings):
+        settings.FILE_DECOMPRESSION_RATIO_LIMIT = 2
+        file = SimpleUploadedFile("data.csv.gz", gzip.compress(b"0" * 1_000_000))
+
+        with pytest.raises(DecompressionLimitException):
+            open_decompressed(file, Compression.GZIP).read()
+
+    def test_size_limit(self, settings):
+        settings.FILE_DECOMPRESSED_SIZE_LIMIT = 1000
+        stream = iter_decompressed([gzip.compress(CONTENT)], Compression.GZIP)
+
+        with pytest.raises(DecompressionLimitException):
+            stream.read()
+
+
+class TestTranscodeToGzip:
+    def test_zstd_to_gzip(self):
+        file = SimpleUploadedFile(
+            "data.csv.zst", zstandard.ZstdCompressor().compress(CONTENT)
+        )
+        output = transcode_to_gzip(file, Compression.ZSTD)
+
+        assert output.name == "data.csv.gz"
+        assert gzip.decompress(output.read()) == CONTENT
@@ -0,0 +1,112 @@
+"""Streamed CSV profiling tests."""
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import serializers
+
+from api.datasets.exceptions import InvalidFileException, SchemaViolationException
+from api.datasets.serializers.file import _csv_columns_validate
+from api.datasets.utils import profile_csv
+
+CONTENT = (
+    b"id,price,active,created,name\n"
+    b"1,10.5,true,2024-01-01 10:00:00,a\n"
+    b"2,,false,2024-01-02,b\n"
+    b"3,7,True,not a date,\n"
+)
+
+
+def _profile(content=CONTENT, **kwargs):
+    return profile_csv(SimpleUploadedFile("data.csv", content), **kwargs)
+
+
+class TestProfileCsv:
+    def test_infers_types(self):
+        columns, csv_params = _profile()
+
+        assert [c.name for c in columns] == ["id", "price", "active", "created", "name"]
+        assert [c.infer_type() for c in columns] == [
+            "INT64",
+            "FLOAT64",
+            "BOOLEAN",
+            "STRING",
+            "STRING",
+        ]
+        assert columns[1].nulls == 1
+        assert columns[0].rows == 3
+
+    def test_types_across_blocks(self, settings):
+        settings.DATASETS_CSV_MEMORY_BUDGET = 0
+        rows = b"".join(b"%d\n" % i for i in range(300_000))
+
+        columns, csv_params = _profile(b"id\n" + rows + b"x\n")
+
+        assert columns[0].rows == 300_001
+        assert columns[0].invalid["INT64"] == 1
+
+    def test_checks_declared_types(self):
+        schema = [{"column_name": c, "data_type": "STRING"} for c in "abcde"]
+        schema[3]["data_type"] = "DATETIME"
+        columns, csv_params = _profile(schema=schema)
+
+        assert columns[3].invalid == {"DATETIME": 1}
+        assert columns[3].invalid_rows == {"DATETIME": [4]}
+        assert columns[4].invalid == {}
+
+    def test_invalid_rows(self):
+        with pytest.raises(InvalidFileException):
+            _profile(b"a,b\n1,2\n1,2,3\n")
+
+
+class TestCsvColumnsValidate:
+    def test_valid_schema(self):
+        columns, csv_params = _profile()
+        schema = [
+            {"column_name": "id", "data_type": "INT64", "mode": "REQUIRED"},
+            {"column_name": "price", "data_type": "FLOAT64"},
+            {"column_name": "active", "data_type": "BOOLEAN"},
+            {"column_name": "created", "data_type": "STRING"},
+            {"column_name": "name", "data_type": "STRING"},
+        ]
+
+        _csv_columns_validate(columns, schema)
+
+    def test_reports_every_violation(self):
+        schema = [
+            {"column_name": "id", "data_type": "STRING"},
+            {"column_name": "price", "data_type": "INT64", "mode": "REQUIRED"},
+            {"column_name": "active", "data_type": "BOOLEAN"},
+            {"column_name": "created", "data_type": "DATE"},
+            {"column_name": "name", "data_type": "STRING", "mode": "REQUIRED"},
+        ]
+        columns, csv_params = _profile(schema=schema)
+
+        with pytest.raises(SchemaViolationException) as exc:
+            _csv_columns_validate(columns, schema)
+
+        assert [
+            (v["column"], v["error"], v["count"], v["rows"]) for v in exc.value.error
+        ] == [
+            ("price", "required", 1, [3]),
+            ("price", "type", 1, [2]),
+            ("created", "type", 2, [2, 4]),
+            ("name", "required", 1, [4]),
+        ]
+
+    def test_column_count(self):
+        columns, csv_params = _profile()
+
+        with pytest.raises(serializers.ValidationError):
+            _csv_columns_validate(
+                columns, [{"column_name": "id", "data_type": "INT64"}]
+            )
+
+    def test_first_rows_only(self):
+        schema = [
+            {"column_name": "id", "data_type": "INT64"},
+            {"column_name": "name", "data_type": "STRING"},
+        ]
+        columns, csv_params = _profile(b"id,name\n" + b"x,a\n" * 50, schema=schema)
+
+        assert columns[0].invalid["INT64"] == 50
+        assert columns[0].invalid_rows["INT64"] == list(range(2, 12))
@@ -0,0 +1,412 @@
+"""Shared HTTP session tests."""
+
+import base64
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api.datasets.exceptions import (
+    CsvPreviewFailed,
+    DownloadFailedException,
+    JsonPreviewFailed,
+    TextPreviewFailed,
+    UrlProviderException,
+)
+from api.datasets.services.provider_upload_service import HttpsService
+from api.datasets.services.upload_providers import (
+    HttpsProvider,
+    identify_url_provider,
+)
+from api.datasets.utils.csv import get_content_from_url_csv
+from api.datasets.utils.json import get_content_from_url_json
+from api.datasets.utils.text import get_content_from_url_text
+from api.utils import http
+
+BIG = b"".join(b"line %d\n" % i for i in range(100_000))
+BIG_MD5 = base64.b64encode(hashlib.md5(BIG).digest()).decode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = 0
+    drops = 0
+    lock = threading.Lock()
+    etag = '"v1"'
+    ranges = []
+
+    def redirect(self, host, path):
+        self.send_response(302)
+        self.send_header("Location", f"http://{host}:{self.server.server_port}/{path}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        if self.path.startswith("/to/"):
+            # /to/<host>/<path>
+            host, path = self.path.split("/", 3)[2:]
+            return self.redirect(host, path)
+        if self.path not in ["/data.csv", "/switch/data.csv"]:
+            self.send_response(405)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.send_header("Content-Length", str(len(BIG)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", Handler.etag)
+        self.send_header("Content-MD5", BIG_MD5)
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.startswith("/to/"):
+            host, path = self.path.split("/", 3)[2:]
+            return self.redirect(host, path)
+        if self.path == "/switch/data.csv":
+            # answers HEAD with the file and GET with a redirect
+            return self.redirect("internal.test", "data.csv")
+
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if self.path == "/empty" and match:
+            # a valid range answer without the bytes
+            Handler.ranges.append((int(match[1]), int(match[2])))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {match[1]}-{match[2]}/{len(BIG)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path in ["/big", "/data.csv", "/export?id=7"] and match:
+            if self.headers.get("If-Match", Handler.etag) != Handler.etag:
+                self.send_response(412)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            start, end = int(match[1]), min(int(match[2]), len(BIG) - 1)
+            Handler.ranges.append((start, end))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(BIG)}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Content-Disposition", 'attachment; filename="rows.csv"')
+            self.end_headers()
+            with Handler.lock:
+                drop = Handler.drops > 0 and start > 0
+                Handler.drops -= drop
+            if drop:
+                # the connection drops halfway through the part
+                self.wfile.write(BIG[start : (start + end) // 2])
+                self.close_connection = True
+                return
+            self.wfile.write(BIG[start : end + 1])
+            return
+
+        content_type = None
+        if self.path.startswith("/csv/"):
+            # /csv/<columns>/<seconds to wait>
+            columns, delay = self.path.split("/")[2:]
+            time.sleep(float(delay))
+            status = 200
+            body = ",".join(columns).encode() + b"\n" + b"1,2\n" * 3
+        elif self.path in ["/big", "/no-ranges"]:
+            status, body = 200, BIG
+        elif self.path == "/flaky" and Handler.failures:
+            Handler.failures -= 1
+            status, body = 503, b""
+        elif self.path == "/missing":
+            status, body = 404, b""
+        elif self.path.startswith("/s3/"):
+            # S3 objects uploaded without a content type
+            status, body = 200, b'[{"a": 1}, {"a": 2}]'
+            content_type = "binary/octet-stream"
+        else:
+            status, body = 200, b"a\nb\nc\n"
+
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(settings, monkeypatch):
+    settings.HTTP_BACKOFF_FACTOR = 0
+    settings.HTTPS_PROVIDER_ALLOW_PRIVATE_HOSTS = True
+    monkeypatch.setattr(http, "_session", None)
+    monkeypatch.setattr(http, "_pinned_sessions", {})
+    Handler.ranges = []
+    Handler.drops = 0
+    Handler.etag = '"v1"'
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestSharedSession:
+    def test_reuses_connections(self, server):
+        for _ in range(3):
+            assert get_content_from_url_text([f"{server}/data.txt"]) == b"a\nb\nc"
+
+        stats = http.connection_stats()[server]
+        assert stats["requests"] == 3
+        assert stats["connections"] == 1
+
+    def test_retries_idempotent_requests(self, server):
+        Handler.failures = 2
+
+        assert http.get(f"{server}/flaky").status_code == 200
+        assert Handler.failures == 0
+
+    def test_default_timeout(self, server, settings, monkeypatch):
+        settings.HTTP_CONNECT_TIMEOUT = 1
+        settings.HTTP_READ_TIMEOUT = 2
+        calls = []
+        session = http.get_session()
+        send = session.request
+        monkeypatch.setattr(
+            session,
+            "request",
+            lambda *args, **kwargs: calls.append(kwargs) or send(*args, **kwargs),
+        )
+
+        http.get(f"{server}/data.txt")
+
+        assert calls[0]["timeout"] == (1, 2)
+
+    def test_generic_content_type_uses_the_extension(self, server):
+        content = get_content_from_url_json([f"{server}/s3/data.json"])
+        assert json.loads(content) == [{"a": 1}, {"a": 2}]
+
+        with pytest.raises(JsonPreviewFailed):
+            get_content_from_url_json([f"{server}/s3/data.csv"])
+
+    def test_failed_fetch(self, server):
+        with pytest.raises(TextPreviewFailed):
+            get_content_from_url_text([f"{server}/missing"])
+
+
+class TestRangeResponse:
+    def test_preview_reads_the_head(self, server, settings):
+        settings.HTTP_RANGE_FIRST_SIZE = 1024
+
+        content = get_content_from_url_text([f"{server}/big"], ranged=True)
+
+        assert content.split(b"\n")[-1] == b"line 19"
+        assert Handler.ranges == [(0, 1023)]
+
+    def test_grows_geometrically(self, server, settings):
+        settings.HTTP_RANGE_FIRST_SIZE = 100
+
+        content = get_content_from_url_text(
+            [f"{server}/big"], max_lines=200, ranged=True
+        )
+
+        assert content.split(b"\n")[-1] == b"line 199"
+        # 200 lines take 1690 bytes
+        assert Handler.ranges == [
+            (0, 99),
+            (100, 199),
+            (200, 399),
+            (400, 799),
+            (800, 1599),
+            (1600, 3199),
+        ]
+        assert (
+            b"".join(http.stream(f"{server}/big", ranged=True).iter_content(65536))
+            == BIG
+        )
+
+    def test_server_without_ranges(self, server):
+        content = get_content_from_url_text([f"{server}/no-ranges"], ranged=True)
+
+        assert content.split(b"\n")[-1] == b"line 19"
+
+
+class TestFetchAll:
+    def test_folder_preview_is_concurrent(self, server):
+        urls = [f"{server}/csv/ab/0.3" for _ in range(4)]
+
+        start = time.monotonic()
+        content = get_content_from_url_csv(urls)
+
+        assert time.monotonic() - start < 0.9
+        assert content == "a,b\r\n" + "1,2\r\n" * 12
+
+    def test_header_mismatch_fails_fast(self, server, settings):
+        settings.DATASETS_PREVIEW_WORKERS = 2
+        urls = [f"{server}/csv/ab/0", f"{server}/csv/ac/0"]
+        urls += [f"{server}/csv/ab/1" for _ in range(4)]
+
+        start = time.monotonic()
+        with pytest.raises(CsvPreviewFailed):
+            get_content_from_url_csv(urls)
+
+        assert time.monotonic() - start < 0.9
+
+    def test_failed_part_stops_the_others(self, monkeypatch, tmp_path):
+        running = []
+
+        def download_part(url, fd, start, end, headers, retries, cancel):
+            if start == 0:
+                time.sleep(0.05)
+                raise http.DownloadError("Part failed")
+            running.append(start)
+            cancel.wait(5)
+            time.sleep(0.05)
+            running.remove(start)
+
+        monkeypatch.setattr(http, "download_part", download_part)
+        with open(tmp_path / "file", "wb+") as file:
+            with pytest.raises(http.DownloadError):
+                http.parallel_download("url", file, 400, workers=4, part_size=100)
+            # nothing writes to the file once the error propagates
+            assert running == []
+
+
+@pytest.fixture
+def clear_cache(settings):
+    from django.core.cache import caches
+
+    caches[settings.PROVIDER_CACHE_ALIAS].clear()
+
+
+@pytest.fixture
+def dns(server, settings, monkeypatch):
+    """
+    files.test is public and internal.test private, both served by the test
+    server. rebind.test answers with a public address only the first time.
+    """
+    settings.HTTPS_PROVIDER_ALLOW_PRIVATE_HOSTS = False
+    resolve = socket.getaddrinfo
+    answers = {
+        "files.test": ["127.0.0.1"],
+        "internal.test": ["127.0.0.2"],
+        "rebind.test": ["127.0.0.1", "127.0.0.3"],
+    }
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host not in answers:
+            return resolve(host, port, *args, **kwargs)
+        address = answers[host][0]
+        if len(answers[host]) > 1:
+            answers[host].pop(0)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(http, "is_public", lambda address: address == "127.0.0.1")
+    return server.rsplit(":", 1)[-1]
+
+
+@pytest.mark.usefixtures("clear_cache")
+class TestPublicHosts:
+    def test_connection_is_pinned(self, dns):
+        url = f"http://rebind.test:{dns}/data.txt"
+
+        assert http.get_public(url).content == b"a\nb\nc\n"
+        assert socket.getaddrinfo("rebind.test", 80)[0][4][0] == "127.0.0.3"
+
+    def test_every_redirect_is_checked(self, dns):
+        assert http.get_public(f"http://files.test:{dns}/to/files.test/data.txt").ok
+
+        with pytest.raises(http.BlockedHostError):
+            http.get_public(f"http://files.test:{dns}/to/internal.test/data.txt")
+        with pytest.raises(UrlProviderException):
+            HttpsService.get_file_metadata(
+                f"http://files.test:{dns}/to/internal.test/data.csv"
+            )
+
+    def test_downloads_and_previews_are_checked(self, dns):
+        url = f"http://files.test:{dns}/switch/data.csv"
+        assert HttpsService.get_file_metadata(url)["size"] == len(BIG)
+
+        with pytest.raises(TextPreviewFailed):
+            get_content_from_url_text([url])
+        with pytest.raises(UrlProviderException):
+            HttpsProvider().process_file(url, 1)
+
+
+@pytest.mark.usefixtures("clear_cache")
+class TestHttpsProvider:
+    def test_identifies_generic_https(self):
+        assert identify_url_provider("https://datos.gob.cl/rows.csv") == "https"
+
+    def test_metadata_from_head(self, server):
+        metadata = HttpsService.get_file_metadata(f"{server}/data.csv")
+
+        assert metadata["name"] == "data.csv"
+        assert metadata["size"] == len(BIG)
+        assert metadata["mimeType"] == "text/csv"
+        assert metadata["acceptRanges"] is True
+
+    def test_metadata_without_head(self, server):
+        metadata = HttpsService.get_file_metadata(f"{server}/export?id=7")
+
+        assert metadata["name"] == "rows.csv"
+        assert metadata["size"] == len(BIG)
+        assert metadata["mimeType"] == "text/csv"
+
+    def test_private_hosts(self, server, settings):
+        settings.HTTPS_PROVIDER_ALLOW_PRIVATE_HOSTS = False
+
+        with pytest.raises(UrlProviderException):
+            HttpsService.get_file_metadata(f"{server}/data.csv")
+
+    def test_parallel_download_resumes_parts(self, server, settings):
+        settings.HTTP_PARALLEL_DOWNLOAD_MIN_SIZE = 0
+        settings.HTTP_DOWNLOAD_PART_SIZE = 100_000
+        Handler.drops = 2
+
+        file = HttpsProvider().process_file(f"{server}/data.csv", 1)
+
+        assert file.read() == BIG
+        # 11 parts, two of them requested again
+        assert len(Handler.ranges) == 13
+
+    def test_empty_range_answer_fails(self, server, tmp_path):
+        with open(tmp_path / "part", "wb") as file:
+            with pytest.raises(http.DownloadError):
+                http.download_part(
+                    f"{server}/empty", file.fileno(), 0, 99, {}, 2, threading.Event()
+                )
+
+        assert len(Handler.ranges) == 3
+
+    def test_retries_reset_after_progress(self, server, tmp_path, monkeypatch):
+        monkeypatch.setattr(http, "DOWNLOAD_CHUNK_SIZE", 1024)
+        # every attempt drops halfway, more times than retries
+        Handler.drops = 3
+        with open(tmp_path / "part", "w+b") as file:
+            http.download_part(
+                f"{server}/data.csv",
+                file.fileno(),
+                1000,
+                200_000,
+                {},
+                1,
+                threading.Event(),
+            )
+            # parts are written at their offsets
+            file.seek(1000)
+            assert file.read() == BIG[1000:200_001]
+
+    def test_file_changed_during_download(self, server, settings):
+        settings.HTTP_PARALLEL_DOWNLOAD_MIN_SIZE = 0
+        HttpsService.get_file_metadata(f"{server}/data.csv")
+        Handler.etag = '"v2"'
+
+        with pytest.raises(DownloadFailedException):
+            HttpsProvider().process_file(f"{server}/data.csv", 1)
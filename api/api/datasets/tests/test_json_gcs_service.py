@@ -0,0 +1,103 @@
+"""JSON normalization tests."""
+
+import gzip
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import zstandard
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from api.datasets.enums import Compression
+from api.datasets.services import file_service
+from api.datasets.services.file_service import JSONFileService
+from api.datasets.services.google_cloud_storage_service import JSONGCSService
+
+ITEMS = [{"id": 1, "tags": ["a", "b"]}, {"id": 2, "tags": []}]
+
+
+class TestConvertToNewlineDelimitedJson:
+    def test_array(self):
+        file = SimpleUploadedFile("data.json", json.dumps(ITEMS, indent=2).encode())
+
+        JSONGCSService.convert_to_newline_delimited_json(file)
+
+        assert [json.loads(line) for line in file.read().splitlines()] == ITEMS
+        assert file.size == len(b"\n".join(json.dumps(i).encode() for i in ITEMS)) + 1
+
+    def test_pretty_printed_object(self):
+        file = SimpleUploadedFile("data.json", json.dumps(ITEMS[0], indent=2).encode())
+
+        JSONGCSService.convert_to_newline_delimited_json(file)
+
+        assert file.read() == json.dumps(ITEMS[0]).encode() + b"\n"
+
+    def test_newline_delimited_is_kept(self):
+        content = b"\n".join(json.dumps(i).encode() for i in ITEMS)
+        file = SimpleUploadedFile("data.json", content)
+        original = file.file
+
+        JSONGCSService.convert_to_newline_delimited_json(file)
+
+        assert file.file is original
+        assert file.read() == content
+
+    def test_gzip(self):
+        file = SimpleUploadedFile(
+            "data.json.gz", gzip.compress(json.dumps(ITEMS).encode())
+        )
+
+        JSONGCSService.convert_to_newline_delimited_json(file, Compression.GZIP)
+
+        lines = gzip.decompress(file.read()).splitlines()
+        assert [json.loads(line) for line in lines] == ITEMS
+
+    def test_zstd_is_rewritten_as_gzip(self):
+        file = SimpleUploadedFile(
+            "data.json.zst",
+            zstandard.ZstdCompressor().compress(json.dumps(ITEMS).encode()),
+        )
+
+        compression = JSONGCSService.convert_to_newline_delimited_json(
+            file, Compression.ZSTD
+        )
+
+        assert compression == Compression.GZIP
+        lines = gzip.decompress(file.read()).splitlines()
+        assert [json.loads(line) for line in lines] == ITEMS
+
+
+class TestJsonFileService:
+    def test_zstd_array_to_parquet(self, monkeypatch):
+        uploaded = {}
+
+        def upload_file(file, filename):
+            uploaded[filename] = file.read()
+            return f"gs://bucket/{filename}"
+
+        monkeypatch.setattr(file_service.GCSService, "upload_file", upload_file)
+        monkeypatch.setattr(JSONFileService, "create_file_object", lambda *a: None)
+        monkeypatch.setattr(JSONFileService, "mount_table", lambda *a, **k: None)
+        service = JSONFileService(
+            None,
+            file=SimpleUploadedFile(
+                "data.json.zst",
+                zstandard.ZstdCompressor().compress(json.dumps(ITEMS).encode()),
+            ),
+            extension="json",
+            public=True,
+            description="",
+            compression=Compression.ZSTD,
+            schema=[
+                {"column_name": "id", "data_type": "INT64", "mode": "REQUIRED"},
+                {"column_name": "tags", "data_type": "STRING", "mode": "REPEATED"},
+            ],
+            parquet_conversion=True,
+        )
+
+        service.process_file()
+
+        [(filename, content)] = uploaded.items()
+        assert filename.endswith("_data.parquet")
+        table = pq.read_table(pa.BufferReader(content))
+        assert table.to_pylist() == ITEMS
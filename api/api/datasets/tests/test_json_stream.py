@@ -0,0 +1,147 @@
+"""Incremental JSON parsing tests."""
+
+import json
+from itertools import islice
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import serializers
+
+from api.datasets.exceptions import InvalidFileException, SchemaViolationException
+from api.datasets.serializers.file import _json_columns_validate
+from api.datasets.utils.json import iter_json_items, profile_json
+
+ITEMS = [
+    {"name": "Peñalolén {braces}", "value": 1},
+    {"name": 'quote " and ] bracket', "value": 2.5},
+    {"name": "東京", "value": 12345},
+]
+
+
+def _chunks(content: bytes, size: int):
+    return [content[i : i + size] for i in range(0, len(content), size)]
+
+
+class TestIterJsonItems:
+    @pytest.mark.parametrize("size", [1, 3, 7, 1024])
+    def test_array(self, size):
+        content = json.dumps(ITEMS, ensure_ascii=False).encode("utf-8")
+
+        assert list(iter_json_items(_chunks(content, size))) == ITEMS
+
+    @pytest.mark.parametrize("size", [1, 5, 1024])
+    def test_newline_delimited(self, size):
+        content = "\n".join(json.dumps(i, ensure_ascii=False) for i in ITEMS)
+
+        assert list(iter_json_items(_chunks(content.encode("utf-8"), size))) == ITEMS
+
+    def test_numbers_across_chunks(self):
+        assert list(iter_json_items([b"[12", b"34, 5", b"6]"])) == [1234, 56]
+
+    def test_stops_early(self):
+        def chunks():
+            yield b'[{"a": 1}, {"a": 2},'
+            raise AssertionError("read past the requested items")
+
+        assert list(islice(iter_json_items(chunks()), 2)) == [{"a": 1}, {"a": 2}]
+
+    def test_invalid(self):
+        with pytest.raises(InvalidFileException):
+            list(iter_json_items([b'[{"a": 1}, {"a": }]']))
+
+    @pytest.mark.parametrize(
+        "value", [True, None, -float("inf"), '\u00e9 \\ "', [1.5e-10, {"a": False}]]
+    )
+    def test_tokens_across_chunks(self, value):
+        content = json.dumps([value, value]).encode("utf-8")
+
+        assert list(iter_json_items(_chunks(content, 1))) == [value, value]
+
+    def test_invalid_before_end_of_chunk(self):
+        def chunks():
+            yield b'[{"a": 1}, {"a": }, ' + b" " * 100
+            raise AssertionError("read past the invalid item")
+
+        with pytest.raises(InvalidFileException):
+            list(iter_json_items(chunks()))
+
+
+class TestJsonColumnsValidate:
+    ROWS = [
+        {"id": 1, "price": 2.5, "active": True, "created": "2024-01-02"},
+        {"id": 2, "price": 3, "active": False, "tags": ["a"]},
+    ]
+
+    def _profile(self, rows=None):
+        content = json.dumps(rows or self.ROWS).encode("utf-8")
+        file = SimpleUploadedFile("data.json", content)
+        fields, count = profile_json(file)
+        assert file.tell() == 0
+        return fields, count
+
+    def test_valid_schema(self):
+        fields, rows = self._profile()
+        schema = [
+            {"column_name": "id", "data_type": "INT64", "mode": "REQUIRED"},
+            {"column_name": "price", "data_type": "FLOAT64"},
+            {"column_name": "active", "data_type": "BOOLEAN"},
+            {"column_name": "created", "data_type": "DATETIME"},
+            {"column_name": "tags", "data_type": "STRING", "mode": "REPEATED"},
+        ]
+
+        _json_columns_validate(fields, rows, schema)
+
+    @pytest.mark.parametrize(
+        "column, data_type, mode",
+        [
+            ("price", "INT64", "NULLABLE"),
+            ("id", "BOOLEAN", "NULLABLE"),
+            ("created", "STRING", "REQUIRED"),
+            ("tags", "INT64", "NULLABLE"),
+        ],
+    )
+    def test_violation(self, column, data_type, mode):
+        fields, rows = self._profile()
+        schema = [
+            {"column_name": field.name, "data_type": "STRING"} for field in fields
+        ]
+        idx = [field.name for field in fields].index(column)
+        schema[idx] = {"column_name": column, "data_type": data_type, "mode": mode}
+
+        with pytest.raises(SchemaViolationException) as exc:
+            _json_columns_validate(fields, rows, schema)
+
+        assert [violation["column"] for violation in exc.value.error] == [column]
+
+    def test_every_violation(self):
+        fields, rows = self._profile()
+        schema = [
+            {"column_name": "id", "data_type": "INT64", "mode": "REQUIRED"},
+            {"column_name": "price", "data_type": "INT64"},
+            {"column_name": "active", "data_type": "BOOLEAN"},
+            {"column_name": "created", "data_type": "DATETIME", "mode": "REQUIRED"},
+            {"column_name": "tags", "data_type": "ARRAY"},
+        ]
+
+        with pytest.raises(SchemaViolationException) as exc:
+            _json_columns_validate(fields, rows, schema)
+
+        assert [
+            (violation["column"], violation["error"], violation["count"])
+            for violation in exc.value.error
+        ] == [("price", "type", 1), ("created", "required", 1)]
+        assert "INT64: price" in str(exc.value.detail)
+
+    def test_column_count(self):
+        fields, rows = self._profile()
+
+        with pytest.raises(serializers.ValidationError):
+            _json_columns_validate(
+                fields, rows, [{"column_name": "id", "data_type": "INT64"}]
+            )
+
+    def test_invalid_column_names(self):
+        fields, rows = self._profile([{"1 bad": 1}])
+
+        with pytest.raises(serializers.ValidationError):
+            _json_columns_validate(fields, rows)
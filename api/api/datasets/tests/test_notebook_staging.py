@@ -0,0 +1,209 @@
+"""Notebook staging tests."""
+
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from google.cloud import bigquery
+
+from api.datasets.exceptions import NotebookStagingException
+from api.datasets.services import NotebookStagingService
+from api.datasets.services import notebook_staging_service
+
+
+class FakeBlob:
+    def __init__(self, storage, name):
+        self.store, self.name = storage.store, name
+        self.generations = storage.generations
+        self.generation = None
+
+    @property
+    def size(self):
+        return len(self.store[self.name])
+
+    def download_as_bytes(self):
+        if self.name not in self.store:
+            raise NotFound(self.name)
+        self.generation = self.generations[self.name]
+        return self.store[self.name]
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        generation = self.generations.get(self.name, 0)
+        if if_generation_match is not None and if_generation_match != generation:
+            raise PreconditionFailed(self.name)
+        self.store[self.name] = data.encode()
+        self.generations[self.name] = generation + 1
+
+    def delete(self):
+        del self.store[self.name]
+
+
+class FakeStorage:
+    def __init__(self):
+        self.store = {}
+        self.generations = {}
+
+    def bucket(self, name):
+        return SimpleNamespace(
+            name=name, blob=lambda blob_name: FakeBlob(self, blob_name)
+        )
+
+    def list_blobs(self, bucket, prefix):
+        return [FakeBlob(self, n) for n in sorted(self.store) if n.startswith(prefix)]
+
+
+class FakeBigQuery:
+    def __init__(self, storage):
+        self.storage = storage
+        self.modified = {}
+        self.extracts = []
+        self.failing = set()
+
+    def get_table(self, path):
+        return SimpleNamespace(
+            modified=self.modified[path],
+            num_rows=3,
+            schema=[bigquery.SchemaField("id", "INT64")],
+        )
+
+    def extract_table(self, source, destination, job_config):
+        self.extracts.append(source)
+        assert job_config.destination_format == "PARQUET"
+
+        def result():
+            if source in self.failing:
+                raise RuntimeError("extract failed")
+            # gs://bucket/<prefix>/part-*.parquet, two shards
+            name = destination.split("/", 3)[3]
+            for shard in range(2):
+                self.storage.store[name.replace("*", f"{shard:012d}")] = b"PAR1"
+
+        return SimpleNamespace(result=result)
+
+
+def _table(id, name):
+    return SimpleNamespace(
+        id=id, name=name, dataset_name="ds", path=f"project.ds.{name}"
+    )
+
+
+@pytest.fixture
+def clients(monkeypatch, settings):
+    settings.GCS_NOTEBOOK_BUCKET = "notebooks"
+    storage = FakeStorage()
+    bq = FakeBigQuery(storage)
+    monkeypatch.setattr(notebook_staging_service.storage, "Client", lambda: storage)
+    monkeypatch.setattr(notebook_staging_service.bigquery, "Client", lambda: bq)
+    return bq, storage
+
+
+def _version(day):
+    return datetime(2026, 1, day, tzinfo=timezone.utc)
+
+
+class TestStage:
+    def test_exports_sharded_parquet(self, clients):
+        bq, storage = clients
+        bq.modified = {"project.ds.a": _version(1), "project.ds.b": _version(1)}
+        service = NotebookStagingService(SimpleNamespace(id=7))
+
+        manifest = service.stage([_table(1, "a"), _table(2, "b")])
+
+        entry = manifest["tables"]["project.ds.a"]
+        assert entry["format"] == "parquet"
+        assert entry["rows"] == 3
+        assert entry["schema"][0]["name"] == "id"
+        assert [f["path"] for f in entry["files"]] == [
+            f"staged/ds/a/{entry['version']}/part-000000000000.parquet",
+            f"staged/ds/a/{entry['version']}/part-000000000001.parquet",
+        ]
+        stored = json.loads(storage.store["7/staged/manifest.json"])
+        assert set(stored["tables"]) == {"project.ds.a", "project.ds.b"}
+
+    def test_unchanged_tables_are_skipped(self, clients):
+        bq, storage = clients
+        bq.modified = {"project.ds.a": _version(1), "project.ds.b": _version(1)}
+        service = NotebookStagingService(SimpleNamespace(id=7))
+        service.stage([_table(1, "a"), _table(2, "b")])
+
+        bq.modified["project.ds.b"] = _version(2)
+        service.stage([_table(1, "a"), _table(2, "b")])
+
+        assert bq.extracts == ["project.ds.a", "project.ds.b", "project.ds.b"]
+        # the previous version of b is removed
+        versions = {name.split("/")[4] for name in storage.store if "/ds/b/" in name}
+        assert versions == {
+            NotebookStagingService.table_version(SimpleNamespace(modified=_version(2)))
+        }
+
+    def test_failures_are_isolated(self, clients):
+        bq, storage = clients
+        bq.modified = {"project.ds.a": _version(1), "project.ds.b": _version(1)}
+        bq.failing = {"project.ds.a"}
+        service = NotebookStagingService(SimpleNamespace(id=7))
+
+        with pytest.raises(NotebookStagingException):
+            service.stage([_table(1, "a"), _table(2, "b")])
+
+        assert list(service.read_manifest()[0]["tables"]) == ["project.ds.b"]
+
+    def test_overlapping_runs_are_merged(self, clients):
+        bq, storage = clients
+        bq.modified = {"project.ds.a": _version(1), "project.ds.b": _version(1)}
+        service = NotebookStagingService(SimpleNamespace(id=7))
+        other = NotebookStagingService(SimpleNamespace(id=7))
+        read_manifest = service.read_manifest
+
+        def racing_read_manifest():
+            # the other run writes between this read and the write after it
+            result = read_manifest()
+            if len(bq.extracts) == 1:
+                other.stage([_table(2, "b")])
+            return result
+
+        service.read_manifest = racing_read_manifest
+        service.stage([_table(1, "a")])
+
+        stored = json.loads(storage.store["7/staged/manifest.json"])
+        assert set(stored["tables"]) == {"project.ds.a", "project.ds.b"}
+        assert storage.generations["7/staged/manifest.json"] == 2
+
+    def test_newer_versions_are_kept(self, clients):
+        bq, storage = clients
+        bq.modified = {"project.ds.a": _version(1)}
+        service = NotebookStagingService(SimpleNamespace(id=7))
+        other = NotebookStagingService(SimpleNamespace(id=7))
+        export = service.export
+
+        def racing_export(table, prefix):
+            # the other run stages a newer version while this one exports
+            job = export(table, prefix)
+            bq.modified["project.ds.a"] = _version(2)
+            other.stage([table])
+            return job
+
+        service.export = racing_export
+        manifest = service.stage([_table(1, "a")])
+
+        newer = NotebookStagingService.table_version(
+            SimpleNamespace(modified=_version(2))
+        )
+        assert manifest["tables"]["project.ds.a"]["version"] == newer
+        # the files of the older version are removed
+        versions = {name.split("/")[4] for name in storage.store if "/ds/a/" in name}
+        assert versions == {newer}
+
+    def test_manifest_kept_changing(self, clients, monkeypatch):
+        bq, storage = clients
+        bq.modified = {"project.ds.a": _version(1)}
+        service = NotebookStagingService(SimpleNamespace(id=7))
+
+        def write_manifest(manifest, generation):
+            raise PreconditionFailed("manifest.json")
+
+        monkeypatch.setattr(service, "write_manifest", write_manifest)
+
+        with pytest.raises(NotebookStagingException):
+            service.stage([_table(1, "a")])
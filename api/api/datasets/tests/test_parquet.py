@@ -0,0 +1,156 @@
+"""Parquet conversion tests."""
+
+import datetime
+
+import pyarrow.parquet as pq
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+
+from api.datasets.services.big_query_service import BigQueryService
+from api.datasets.utils import csv_parameters_detect
+from api.datasets.utils.parquet import (
+    bigquery_schema_to_arrow,
+    csv_to_parquet,
+    json_to_parquet,
+)
+
+SCHEMA = [
+    {"column_name": "id", "data_type": "INT64", "mode": "REQUIRED"},
+    {"column_name": "name", "data_type": "STRING", "mode": "NULLABLE"},
+    {"column_name": "created", "data_type": "DATETIME", "mode": "NULLABLE"},
+]
+
+
+def _output():
+    return TemporaryUploadedFile(
+        name="out.parquet",
+        content_type="application/vnd.apache.parquet",
+        size=0,
+        charset=None,
+    )
+
+
+class TestBigQuerySchemaToArrow:
+    def test_nested_and_repeated_fields(self):
+        schema = bigquery_schema_to_arrow(
+            [
+                {
+                    "column_name": "address",
+                    "data_type": "RECORD",
+                    "mode": "NULLABLE",
+                    "fields": [{"column_name": "city", "data_type": "STRING"}],
+                },
+                {"column_name": "tags", "data_type": "STRING", "mode": "REPEATED"},
+            ]
+        )
+
+        assert str(schema.field("address").type) == "struct<city: string>"
+        assert str(schema.field("tags").type) == "list<item: string>"
+
+
+class TestCsvToParquet:
+    def test_writes_typed_columns(self):
+        data = b"id;name;created\n1;Ana;2024-01-01 10:00:00\n2;;\n"
+        file = SimpleUploadedFile("data.csv", data)
+        output = _output()
+
+        rows = csv_to_parquet(
+            file, output, SCHEMA, csv_parameters_detect(data.decode())
+        )
+
+        output.seek(0)
+        table = pq.read_table(output)
+        assert rows == 2
+        assert str(table.schema.field("id").type) == "int64"
+        assert str(table.schema.field("created").type) == "timestamp[us]"
+        assert table.column("name").to_pylist() == ["Ana", None]
+        assert file.tell() == 0
+
+    def test_temporal_and_boolean_columns(self):
+        schema = [
+            {"column_name": "day", "data_type": "DATE"},
+            {"column_name": "at", "data_type": "TIME"},
+            {"column_name": "ts", "data_type": "TIMESTAMP"},
+            {"column_name": "ok", "data_type": "BOOLEAN"},
+        ]
+        data = (
+            b"day,at,ts,ok\n"
+            b"2024-01-31,10:30:00,2024-01-31 10:30:00,yes\n"
+            b"2024-02-01,23:59:59.5,2024-02-01T05:00:00-05:00,N\n"
+            b"2024-02-02,,2024-02-02 10:00:00 UTC,t\n"
+        )
+        output = _output()
+
+        csv_to_parquet(
+            SimpleUploadedFile("data.csv", data),
+            output,
+            schema,
+            csv_parameters_detect(data.decode()),
+        )
+
+        output.seek(0)
+        table = pq.read_table(output)
+        assert table.column("day").to_pylist()[0] == datetime.date(2024, 1, 31)
+        assert table.column("at").to_pylist() == [
+            datetime.time(10, 30),
+            datetime.time(23, 59, 59, 500000),
+            None,
+        ]
+        assert [ts.hour for ts in table.column("ts").to_pylist()] == [10, 10, 10]
+        assert str(table.schema.field("ts").type) == "timestamp[us, tz=UTC]"
+        assert table.column("ok").to_pylist() == [True, False, True]
+
+
+class TestJsonToParquet:
+    def test_ignores_unexpected_fields(self):
+        data = (
+            b'{"id": 1, "name": "Ana", "created": "2024-01-01T10:00:00", "x": 1}\n'
+            b'{"id": 2, "name": null}\n'
+        )
+        output = _output()
+
+        rows = json_to_parquet(SimpleUploadedFile("data.json", data), output, SCHEMA)
+
+        output.seek(0)
+        table = pq.read_table(output)
+        assert rows == 2
+        assert table.column_names == ["id", "name", "created"]
+        assert table.column("created").null_count == 1
+
+    def test_repeated_and_nested_columns(self):
+        schema = [
+            {"column_name": "days", "data_type": "DATE", "mode": "REPEATED"},
+            {
+                "column_name": "shift",
+                "data_type": "RECORD",
+                "fields": [{"column_name": "start", "data_type": "TIME"}],
+            },
+        ]
+        data = (
+            b'{"days": ["2024-01-01", "2024-01-02"], "shift": {"start": "08:00:00"}}\n'
+            b'{"days": [], "shift": null}\n'
+        )
+        output = _output()
+
+        json_to_parquet(SimpleUploadedFile("data.json", data), output, schema)
+
+        output.seek(0)
+        table = pq.read_table(output)
+        assert table.column("days").to_pylist() == [
+            [datetime.date(2024, 1, 1), datetime.date(2024, 1, 2)],
+            [],
+        ]
+        assert table.column("shift").to_pylist() == [
+            {"start": datetime.time(8)},
+            None,
+        ]
+
+
+class TestParquetLoad:
+    def test_repeated_columns_are_lists(self):
+        schema = [{"column_name": "tags", "data_type": "STRING", "mode": "REPEATED"}]
+
+        config = BigQueryService.load_job_config("parquet", False, 0, schema)
+
+        assert config.source_format == "PARQUET"
+        assert config.parquet_options.enable_list_inference is True
+        assert config.schema[0].mode == "REPEATED"
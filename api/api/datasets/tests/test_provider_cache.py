@@ -0,0 +1,110 @@
+"""Provider metadata and preview cache tests."""
+
+import pytest
+from django.core.cache import caches
+
+from api.datasets.decorators import provider_cache
+from api.datasets.enums import FileType
+from api.datasets.services.upload_providers import BaseUploadProvider
+from api.datasets.utils.provider_cache import folder_version, normalize_url
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    caches[settings.PROVIDER_CACHE_ALIAS].clear()
+    yield
+    caches[settings.PROVIDER_CACHE_ALIAS].clear()
+
+
+class FakeService:
+    calls = 0
+    version = "1"
+
+    @classmethod
+    def is_folder(cls, url: str) -> bool:
+        return url.endswith("/")
+
+    @classmethod
+    @provider_cache
+    def get_file_metadata(cls, url: str) -> dict:
+        cls.calls += 1
+        return {"name": "data.csv", "size": 10, "version": cls.version}
+
+    @classmethod
+    @provider_cache
+    def list_files(cls, url: str) -> list:
+        cls.calls += 1
+        return [{"name": "a.csv", "size": 1, "version": cls.version}]
+
+
+class FakeProvider(BaseUploadProvider):
+    service = FakeService
+    previews = 0
+
+    def preview_file(self, url, file_type, compression=None):
+        FakeProvider.previews += 1
+        return [{"column_name": "id", "data_type": "INT64"}]
+
+
+@pytest.fixture
+def provider():
+    FakeService.calls = 0
+    FakeService.version = "1"
+    FakeProvider.previews = 0
+    return FakeProvider()
+
+
+class TestNormalizeUrl:
+    def test_equivalent_urls(self):
+        assert normalize_url(
+            "HTTPS://Bucket.S3.amazonaws.com/a%20b.csv?b=2&a=1#top"
+        ) == normalize_url("https://bucket.s3.amazonaws.com/a b.csv?a=1&b=2")
+
+    def test_drops_signatures(self):
+        url = "https://b.s3.amazonaws.com/k.csv?X-Amz-Signature=abc&X-Amz-Date=1"
+
+        assert normalize_url(url) == "https://b.s3.amazonaws.com/k.csv"
+
+
+class TestProviderCache:
+    def test_metadata_is_cached(self, provider):
+        FakeService.get_file_metadata("https://host/data.csv?x=1")
+        FakeService.get_file_metadata("https://HOST/data.csv?x=1#f")
+
+        assert FakeService.calls == 1
+
+    def test_large_values_are_not_cached(self, provider, settings):
+        settings.PROVIDER_CACHE_MAX_ENTRY_SIZE = 10
+        FakeService.get_file_metadata("https://host/data.csv")
+        FakeService.get_file_metadata("https://host/data.csv")
+
+        assert FakeService.calls == 2
+
+    def test_folder_version_ignores_order(self):
+        files = [{"name": "a", "version": "1"}, {"name": "b", "version": "2"}]
+
+        assert folder_version(files) == folder_version(files[::-1])
+
+
+class TestPreviewCache:
+    def test_preview_is_cached(self, provider):
+        provider.preview("https://host/data.csv", FileType.CSV)
+        provider.preview("https://host/data.csv", FileType.CSV)
+
+        assert FakeProvider.previews == 1
+
+    def test_new_version_misses(self, provider, settings):
+        # metadata expires right away, previews don't
+        settings.PROVIDER_CACHE_TIMEOUT = 0
+        provider.preview("https://host/data.csv", FileType.CSV)
+        FakeService.version = "2"
+        provider.preview("https://host/data.csv", FileType.CSV)
+
+        assert FakeProvider.previews == 2
+
+    def test_unknown_version_is_not_cached(self, provider):
+        FakeService.version = None
+        provider.preview("https://host/data.csv", FileType.CSV)
+        provider.preview("https://host/data.csv", FileType.CSV)
+
+        assert FakeProvider.previews == 2
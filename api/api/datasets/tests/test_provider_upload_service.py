@@ -0,0 +1,121 @@
+"""Provider listing tests."""
+
+import pytest
+from django.core.cache import caches
+
+from api.datasets.services.provider_upload_service import (
+    GoogleDriveService,
+    S3Service,
+)
+from api.datasets.utils.mime import content_mime_type, guess_mime_type
+
+URL = "https://bucket.s3.amazonaws.com/folder/"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    caches[settings.PROVIDER_CACHE_ALIAS].clear()
+
+
+class FakeS3Client:
+    def __init__(self, pages):
+        self.pages = pages
+        self.heads = []
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        return iter(self.pages)
+
+    def head_object(self, Bucket, Key):
+        self.heads.append(Key)
+        return {"ContentType": "text/csv"}
+
+
+class TestGuessMimeType:
+    def test_known_extensions(self):
+        assert guess_mime_type("data.csv") == "text/csv"
+        assert guess_mime_type("data.JSONL") == "application/json"
+        assert guess_mime_type("data.csv.gz") == "application/gzip"
+
+    def test_ambiguous(self):
+        assert guess_mime_type("data") is None
+        assert guess_mime_type("data.xlsx") is None
+
+
+class TestContentMimeType:
+    def test_generic_types_use_the_extension(self):
+        assert content_mime_type("binary/octet-stream", "data.json") == (
+            "application/json"
+        )
+        assert content_mime_type(None, "data.csv.gz") == "application/gzip"
+        assert content_mime_type("binary/octet-stream", "data") == (
+            "binary/octet-stream"
+        )
+
+    def test_specific_types_are_kept(self):
+        assert content_mime_type("text/csv; charset=utf-8", "data.json") == "text/csv"
+
+
+class TestS3ListFiles:
+    def test_follows_pages(self, monkeypatch):
+        pages = [
+            {"Contents": [{"Key": f"folder/{i}.csv", "Size": 1} for i in range(1000)]},
+            {"Contents": [{"Key": "folder/last", "Size": 2}]},
+        ]
+        client = FakeS3Client(pages)
+        monkeypatch.setattr(S3Service, "client", client)
+
+        files = S3Service.list_files(URL)
+
+        assert len(files) == 1001
+        assert files[0]["mimeType"] == "text/csv"
+        assert files[-1] == dict(
+            name="last",
+            size=2,
+            mimeType="text/csv",
+            webContentLink=f"{URL}last",
+            version=None,
+        )
+        assert client.heads == ["folder/last"]
+
+
+class FakeDriveRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeDriveService:
+    def __init__(self, pages):
+        self.pages = pages
+        self.tokens = []
+
+    def files(self):
+        return self
+
+    def list(self, pageToken=None, **kwargs):
+        self.tokens.append(pageToken)
+        return FakeDriveRequest(self.pages[len(self.tokens) - 1])
+
+
+class TestGoogleDriveService:
+    URL = "https://drive.google.com/drive/folders/folder_id"
+
+    def test_list_files_follows_pages(self, monkeypatch):
+        service = FakeDriveService(
+            [
+                {"files": [{"id": "1"}], "nextPageToken": "next"},
+                {"files": [{"id": "2"}]},
+            ]
+        )
+        monkeypatch.setattr(
+            GoogleDriveService._local, "service", service, raising=False
+        )
+
+        assert GoogleDriveService.list_files(self.URL) == [{"id": "1"}, {"id": "2"}]
+        assert service.tokens == [None, "next"]
@@ -0,0 +1,132 @@
+"""Schema inference tests."""
+
+import pandas as pd
+import pytest
+
+from api.datasets.utils import prepare_csv_data_format, prepare_json_data_format
+from api.datasets.utils.bigquery import infer_bigquery_type, sample_positions
+from api.datasets.utils.json import infer_json_schema, iter_json_items
+
+
+class TestSamplePositions:
+    def test_short_column(self):
+        assert sample_positions(5, 10) == [0, 1, 2, 3, 4]
+
+    def test_head_middle_tail(self):
+        positions = sample_positions(1000, 9)
+
+        assert positions == [0, 1, 2, 498, 499, 500, 997, 998, 999]
+
+
+class TestInferBigqueryType:
+    @pytest.mark.parametrize(
+        "values, expected",
+        [
+            (["10:00:00", "23:59:59", None], ("TIME", "NULLABLE", 1.0)),
+            (["2024-01-01", "2024-01-02 10:00"], ("DATETIME", "NULLABLE", 1.0)),
+            (["2024-01-01T10:00:00Z", "2024-01-01"], ("TIMESTAMP", "NULLABLE", 1.0)),
+            ([{"a": 1}, None], ("RECORD", "NULLABLE", 1.0)),
+            ([[1, 2], [3.5]], ("FLOAT64", "REPEATED", 1.0)),
+            ([["a"], []], ("STRING", "REPEATED", 1.0)),
+            ([True, None, False], ("BOOLEAN", "NULLABLE", 1.0)),
+            (["a", "b", 1, "c"], ("STRING", "NULLABLE", 0.75)),
+            ([None, None], ("STRING", "NULLABLE", 0.0)),
+        ],
+    )
+    def test_object_columns(self, values, expected):
+        assert infer_bigquery_type(pd.Series(values, dtype=object)) == expected
+
+    def test_typed_columns(self):
+        assert infer_bigquery_type(pd.Series([1, 2])) == ("INT64", "NULLABLE", 1.0)
+        assert infer_bigquery_type(pd.Series([1, None])) == (
+            "FLOAT64",
+            "NULLABLE",
+            1.0,
+        )
+
+    def test_outliers_keep_the_type(self):
+        values = pd.Series(list(range(499)) + ["n/a"], dtype=object)
+
+        assert infer_bigquery_type(values) == ("INT64", "NULLABLE", 0.998)
+
+    def test_too_many_outliers(self, settings):
+        settings.DATASETS_SCHEMA_TYPE_THRESHOLD = 0.999
+        values = pd.Series(list(range(499)) + ["n/a"], dtype=object)
+
+        assert infer_bigquery_type(values) == ("STRING", "NULLABLE", 0.002)
+
+    @pytest.mark.parametrize("single", [7, "ab"])
+    def test_lists_mixed_with_values(self, single):
+        values = pd.Series([[1, 2]] * 995 + [single] * 5, dtype=object)
+
+        assert infer_bigquery_type(values) == ("STRING", "NULLABLE", 0.0)
+
+    def test_samples_tail(self, settings):
+        settings.DATASETS_SCHEMA_SAMPLE_SIZE = 30
+        values = pd.Series(["2024-01-01"] * 1000 + ["later"], dtype=object)
+
+        assert infer_bigquery_type(values)[0] == "STRING"
+
+
+class TestPrepareDataFormat:
+    def test_csv(self):
+        schema = prepare_csv_data_format("id,day\n1,2024-01-01\n", 1)
+
+        assert [(c["column_name"], c["data_type"]) for c in schema] == [
+            ("id", "INT64"),
+            ("day", "DATE"),
+        ]
+
+    def test_json_repeated_record(self):
+        schema = prepare_json_data_format('[{"items": [{"sku": "a", "qty": 1}]}]')
+
+        assert schema[0]["data_type"] == "RECORD"
+        assert schema[0]["mode"] == "REPEATED"
+        assert [f["column_name"] for f in schema[0]["fields"]] == ["sku", "qty"]
+
+
+class TestInferJsonSchema:
+    def test_nested_paths_are_merged(self):
+        items = [
+            {"id": 1, "user": {"name": "a"}, "tags": ["x"]},
+            {"id": 2.5, "user": {"name": "b", "age": 3}, "tags": None},
+            {
+                "user": None,
+                "events": [{"at": "2024-01-01"}, {"at": "2024-01-02 10:00"}],
+            },
+        ]
+
+        schema = infer_json_schema(items)
+
+        assert [(c["column_name"], c["data_type"], c["mode"]) for c in schema] == [
+            ("id", "FLOAT64", "NULLABLE"),
+            ("user", "RECORD", "NULLABLE"),
+            ("tags", "STRING", "REPEATED"),
+            ("events", "RECORD", "REPEATED"),
+        ]
+        assert [f["column_name"] for f in schema[1]["fields"]] == ["name", "age"]
+        assert schema[3]["fields"][0]["data_type"] == "DATETIME"
+        assert schema[0]["example_values"] == [1, 2.5, ""]
+        assert schema[3]["example_values"] == ["", "", items[2]["events"]]
+
+    def test_lists_mixed_with_values(self):
+        schema = infer_json_schema([{"a": [1]}, {"a": 2}], include_examples=False)
+
+        assert schema == [
+            {
+                "column_name": "a",
+                "data_type": "STRING",
+                "mode": "NULLABLE",
+                "confidence": 0.0,
+            }
+        ]
+
+    def test_streamed_items(self):
+        content = b'{"a": 1}\n{"a": 2, "b": true}\n'
+
+        schema = infer_json_schema(iter_json_items([content]))
+
+        assert [(c["column_name"], c["data_type"]) for c in schema] == [
+            ("a", "INT64"),
+            ("b", "BOOLEAN"),
+        ]
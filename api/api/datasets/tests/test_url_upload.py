@@ -0,0 +1,60 @@
+"""Url upload validation tests."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from api.datasets.serializers import file as file_serializers
+from api.datasets.serializers.file import FileUploadSerializer
+
+
+def _provider(monkeypatch, name, mime_type):
+    service = SimpleNamespace(
+        is_folder=lambda url: False,
+        get_file_metadata=lambda url: dict(name=name, size=10, mimeType=mime_type),
+    )
+    monkeypatch.setattr(
+        file_serializers,
+        "return_url_provider",
+        lambda url: SimpleNamespace(service=service),
+    )
+
+
+def _serializer(file_type):
+    return FileUploadSerializer(
+        data=dict(
+            public=True,
+            autodetect=True,
+            file_type=file_type,
+            url="https://example.com/data",
+            upload_type="url",
+            description="data",
+        )
+    )
+
+
+class TestUrlFileTypes:
+    def test_text_files(self, monkeypatch):
+        _provider(monkeypatch, "data.json", "application/json")
+
+        serializer = _serializer("json")
+
+        assert serializer.is_valid(), serializer.errors
+        assert serializer.validated_data["extension"] == "json"
+
+    @pytest.mark.parametrize("file_type", ["parquet", "avro"])
+    def test_columnar_file_types_are_rejected(self, monkeypatch, file_type):
+        _provider(monkeypatch, "data.json", "application/json")
+
+        serializer = _serializer(file_type)
+
+        assert not serializer.is_valid()
+        assert "from a url" in str(serializer.errors)
+
+    def test_columnar_files_are_rejected(self, monkeypatch):
+        _provider(monkeypatch, "data.parquet", "text/plain")
+
+        serializer = _serializer("json")
+
+        assert not serializer.is_valid()
+        assert "from a url" in str(serializer.errors)
@@ -9,6 +9,8 @@ from .json import (
     prepare_json_data_format,
     create_dataframe_from_json,
     get_content_from_url_json,
+    profile_json,
 )
+from .csv_profile import ColumnProfile, profile_csv
 from .bigquery import is_valid_column_name, normalize_column_name
 from .text import get_content_from_url_text
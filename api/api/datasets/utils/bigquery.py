@@ -1,7 +1,10 @@
 import re
 import unicodedata
 import datetime
+from collections import Counter
+
 import pandas as pd
+from django.conf import settings
 
 
 def is_valid_column_name(column_name):
@@ -50,171 +53,205 @@ def normalize_column_name(column_name):
     return normalized_name[:128]
 
 
-def get_bigquery_datatype(column: pd.Series, pandas_type: str) -> tuple[str, str]:
-    """
-    Maps pandas data types to BigQuery data types.
-
-    This function converts a pandas data type into its corresponding BigQuery data type.
-    If the pandas type is 'object', it further determines if the column contains time or
-    datetime values. The mapping is based on predefined rules and type detection.
-
-    Args:
-        column (pd.Series): The pandas Series representing the column data.
-        pandas_type (str): The data type of the pandas column as a string.
-
-    Returns:
-        str: The corresponding BigQuery data type.
-    """
-    type_mapping = {
-        "int64": "INT64",
-        "float64": "FLOAT64",
-        "object": "STRING",
-        "string": "STRING",
-        "bool": "BOOLEAN",
-        "datetime64[ns]": "DATETIME",
-        "datetime64": "DATETIME",
-        "timedelta[ns]": "TIME",
-        "timedelta": "TIME",
-    }
-
-    if pandas_type == "object":
-        dtype, mode = detect_object_type(column)
-        if dtype:
-            return dtype, mode
-    return type_mapping.get(pandas_type.lower(), "STRING"), "NULLABLE"
-
-
-def detect_datetime(series):
+# Textual formats BigQuery loads for each temporal type, checked in order
+TEMPORAL_PATTERNS = {
+    "TIME": re.compile(r"^([01]?\d|2[0-3]):[0-5]\d:[0-5]\d(\.\d{1,6})?$"),
+    "DATE": re.compile(r"^\d{4}-\d{2}-\d{2}$"),
+    "DATETIME": re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?$"),
+    "TIMESTAMP": re.compile(
+        r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?"
+        r"\s?(Z|UTC|[+-]\d{2}(:?\d{2})?)$"
+    ),
+}
+
+PYTHON_TO_BIGQUERY_TYPES = {
+    bool: "BOOLEAN",
+    int: "INT64",
+    float: "FLOAT64",
+    str: "STRING",
+    dict: "RECORD",
+    list: "ARRAY",
+    datetime.datetime: "DATETIME",
+    pd.Timestamp: "DATETIME",
+    datetime.date: "DATE",
+    datetime.time: "TIME",
+}
+
+# Types that can hold the values of each class, narrowest first
+TYPE_WIDENING = {
+    "BOOLEAN": ["BOOLEAN"],
+    "INT64": ["INT64", "FLOAT64"],
+    "FLOAT64": ["FLOAT64"],
+    "DATE": ["DATE", "DATETIME", "TIMESTAMP"],
+    "DATETIME": ["DATETIME", "TIMESTAMP"],
+    "TIMESTAMP": ["TIMESTAMP"],
+    "TIME": ["TIME"],
+    "RECORD": ["RECORD"],
+    "ARRAY": ["ARRAY"],
+    "STRING": ["STRING"],
+}
+TYPE_ORDER = list(TYPE_WIDENING)
+
+
+def sample_positions(length: int, size: int) -> list[int]:
     """
-    Attempts to detect if a series contains datetime or date values.
+    Stratified sample of row positions: the head, the middle and the tail
+    of the column, so types that only show up after the first rows count.
 
     Args:
-        series (pd.Series): Pandas Series to check.
+        length (int): Number of rows.
+        size (int): Maximum number of positions.
 
     Returns:
-        tuple(str, str): Data type, mode
+        list[int]: Sorted row positions.
     """
-    mode = "NULLABLE"
-    try:
-        series = pd.to_datetime(series, errors="coerce")
-
-        if series.notna().all():
-            return "DATETIME", mode
-    except Exception:
-        return None, None
-
-    return None, None
+    if length <= size:
+        return list(range(length))
+
+    head = size // 3
+    tail = size // 3
+    middle = size - head - tail
+    middle_start = (length - middle) // 2
+    return [
+        *range(head),
+        *range(middle_start, middle_start + middle),
+        *range(length - tail, length),
+    ]
 
 
-def detect_time(series):
+def classify_values(values: pd.Series) -> pd.Series:
     """
-    Attempts to detect if a series contains time values.
+    Classifies each non-null value once into the BigQuery type it looks
+    like: Python objects by their type, strings with precompiled patterns.
 
     Args:
-        series (pd.Series): Pandas Series to check.
+        values (pd.Series): Non-null values.
 
     Returns:
-        tuple(str, str): Data type, mode
+        pd.Series: BigQuery type of each value.
     """
-    mode = "NULLABLE"
-    try:
-        series = pd.to_datetime(series, format="%H:%M:%S", errors="coerce").dt.time
-
-        if not series.isna().all():
-            if series.notna().all():
-                return "TIME", mode
-    except Exception:
-        return None, None
-
-    return None, None
-
-
-def detect_element_type_in_array_bigquery(series):
+    values = values.reset_index(drop=True)
+    classes = values.map(lambda value: PYTHON_TO_BIGQUERY_TYPES.get(type(value)))
+
+    # subclasses such as numpy scalars miss the exact type lookup
+    unknown = classes.isna()
+    if unknown.any():
+        classes[unknown] = values[unknown].map(_classify_object)
+
+    strings = classes == "STRING"
+    if strings.any():
+        texts = values[strings].str.strip()
+        pending = pd.Series(True, index=texts.index)
+        for data_type, pattern in TEMPORAL_PATTERNS.items():
+            matches = pending & texts.str.match(pattern)
+            classes[matches[matches].index] = data_type
+            pending &= ~matches
+
+    return classes
+
+
+def classify_value(value) -> str:
+    """Classifies a single non-null value, like classify_values does."""
+    data_type = PYTHON_TO_BIGQUERY_TYPES.get(type(value)) or _classify_object(value)
+    if data_type == "STRING":
+        text = value.strip()
+        for temporal_type, pattern in TEMPORAL_PATTERNS.items():
+            if pattern.match(text):
+                return temporal_type
+    return data_type
+
+
+def _classify_object(value) -> str:
+    for python_type, data_type in PYTHON_TO_BIGQUERY_TYPES.items():
+        if isinstance(value, python_type):
+            return data_type
+    if pd.api.types.is_bool(value):
+        return "BOOLEAN"
+    if pd.api.types.is_integer(value):
+        return "INT64"
+    if pd.api.types.is_float(value):
+        return "FLOAT64"
+    return "STRING"
+
+
+def narrowest_type(classes: Counter) -> tuple[str, float]:
     """
-    Detects the BigQuery-compatible data type of elements within lists in a Pandas series.
-
-    Args:
-        series (pd.Series): Pandas Series to check.
+    Picks the type that fits the most values, the narrowest one on ties.
+    A type that doesn't fit every value is only kept when it fits at least
+    DATASETS_SCHEMA_TYPE_THRESHOLD of them, otherwise it's STRING.
 
     Returns:
-        tuple(str, str): Data type, mode
+        tuple(str, float): Data type and confidence, the share of values
+        that natively fit the picked type.
     """
-    mode = "REPEATED"
-    python_to_bigquery_type = {
-        int: "INT64",
-        float: "FLOAT64",
-        str: "STRING",
-        bool: "BOOLEAN",
-        datetime.datetime: "DATETIME",
-        datetime.date: "DATE",
-        datetime.time: "TIME",
-        pd.Timestamp: "DATETIME",
+    total = sum(classes.values())
+    if not total:
+        return "STRING", 0.0
+
+    fitting = {
+        data_type: sum(
+            count
+            for value_class, count in classes.items()
+            if data_type in TYPE_WIDENING[value_class]
+        )
+        for data_type in TYPE_ORDER
     }
-
-    non_empty_lists = [value for value in series if isinstance(value, list) and value]
-
-    if not non_empty_lists:
-        return None, None
-
-    first_element_type = type(non_empty_lists[0][0])
-
-    if all(isinstance(item, int) for value in non_empty_lists for item in value):
-        return "INT64", mode
-    elif all(
-        isinstance(item, (int, float)) for value in non_empty_lists for item in value
-    ):
-        return "FLOAT64", mode
-    elif all(
-        isinstance(item, first_element_type)
-        for value in non_empty_lists
-        for item in value
-    ):
-        return python_to_bigquery_type.get(first_element_type, "STRING"), mode
-
-    return None, None
-
-
-def detect_struct(series: pd.Series):
-    """
-    Detects if a pandas Series contains dictionary-like entries, suggesting a STRUCT type.
-
-    Args:
-        series (pd.Series): The pandas Series to be analyzed.
-
-    Returns:
-         tuple(str, str): Data type, mode
-    """
-    mode = "NULLABLE"
-    if all(isinstance(item, dict) for item in series.dropna()):
-        return "RECORD", mode
-
-    return None, None
+    best = max(TYPE_ORDER, key=lambda data_type: fitting[data_type])
+    confidence = fitting[best] / total
+    if best != "STRING" and confidence < settings.DATASETS_SCHEMA_TYPE_THRESHOLD:
+        best, confidence = "STRING", fitting["STRING"] / total
+    return best, round(confidence, 3)
 
 
-def detect_object_type(series: pd.Series) -> tuple[str, str]:
+def infer_bigquery_type(column: pd.Series) -> tuple[str, str, float]:
     """
-    Determines the type of data in a pandas Series when the dtype is 'object'.
+    Infers the BigQuery type of a pandas column in a single pass over a
+    stratified sample of its rows.
 
-    This function attempts to identify whether the series contains time values,
-    datetime values, or list values. The detection is performed in order of
-    precedence: TIME, DATETIME, and ARRAY.
+    Typed columns map directly from their dtype, object columns classify
+    each sampled value once and keep the narrowest type that fits all of
+    them. Lists become REPEATED columns of the type of their elements.
 
     Args:
-        series (pd.Series): The pandas Series to be analyzed.
+        column (pd.Series): The pandas Series representing the column data.
 
     Returns:
-        tuple(str, str): Data type, mode.
+        tuple(str, str, float): Data type, mode and confidence.
     """
-    detection_functions = [
-        detect_time,
-        detect_datetime,
-        detect_element_type_in_array_bigquery,
-        detect_struct,
-    ]
-
-    for detect in detection_functions:
-        detected_type, mode = detect(series)
-        if detected_type:
-            return detected_type, mode
-
-    return None, None
+    mode = "NULLABLE"
+    if column.isna().all():
+        return "STRING", mode, 0.0
+
+    dtype = column.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BOOLEAN", mode, 1.0
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INT64", mode, 1.0
+    if pd.api.types.is_float_dtype(dtype):
+        return "FLOAT64", mode, 1.0
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return "TIMESTAMP", mode, 1.0
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return "DATETIME", mode, 1.0
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return "TIME", mode, 1.0
+
+    size = settings.DATASETS_SCHEMA_SAMPLE_SIZE
+    sample = column.iloc[sample_positions(len(column), size)].dropna()
+    classes = classify_values(sample)
+    data_type, confidence = narrowest_type(Counter(classes))
+
+    if data_type == "ARRAY":
+        if (classes != "ARRAY").any():
+            # lists mixed with single values can't be loaded as they are,
+            # like JsonSchemaField.to_bigquery does
+            return "STRING", mode, 0.0
+        elements = [item for value in sample for item in value][:size]
+        element_classes = classify_values(pd.Series(elements, dtype=object).dropna())
+        data_type, confidence = narrowest_type(Counter(element_classes))
+        if data_type == "ARRAY":
+            # BigQuery doesn't support arrays of arrays
+            data_type = "STRING"
+        mode = "REPEATED"
+
+    return data_type, mode, confidence
@@ -0,0 +1,251 @@
+import gzip
+import io
+import os
+import zlib
+from typing import Iterator
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils.translation import gettext_lazy as _
+
+from api.datasets.enums import Compression
+from api.datasets.exceptions import (
+    DecompressionLimitException,
+    InvalidFileException,
+)
+
+COMPRESSION_EXTENSIONS = {"gz": Compression.GZIP, "zst": Compression.ZSTD}
+COMPRESSION_MAGIC = {
+    Compression.GZIP: b"\x1f\x8b",
+    Compression.ZSTD: b"\x28\xb5\x2f\xfd",
+}
+COMPRESSED_MIME_TYPES = {
+    Compression.GZIP: [
+        "application/gzip",
+        "application/x-gzip",
+        "application/octet-stream",
+    ],
+    Compression.ZSTD: [
+        "application/zstd",
+        "application/x-zstd",
+        "application/octet-stream",
+    ],
+}
+CHUNK_SIZE = 64 * 1024
+
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error)
+if zstandard is not None:
+    DECOMPRESSION_ERRORS += (zstandard.ZstdError,)
+
+
+def split_compression(filename: str) -> tuple[str, str | None]:
+    """
+    Splits the compression suffix from a file name.
+
+    Args:
+        filename (str): File name, e.g. data.csv.gz
+
+    Returns:
+        tuple(str, str | None): Name without the compression suffix and the
+        compression codec, e.g. ("data.csv", "gzip").
+    """
+    name, suffix = os.path.splitext(filename)
+    compression = COMPRESSION_EXTENSIONS.get(suffix.lower().lstrip("."))
+    if compression is None:
+        return filename, None
+    return name, compression
+
+
+def compression_suffix(compression: str | None) -> str:
+    for suffix, codec in COMPRESSION_EXTENSIONS.items():
+        if codec == compression:
+            return f".{suffix}"
+    return ""
+
+
+def _decompressor(file, compression: str):
+    if compression == Compression.GZIP:
+        return gzip.GzipFile(fileobj=file, mode="rb")
+
+    if compression == Compression.ZSTD:
+        if zstandard is None:
+            raise InvalidFileException(
+                detail=_("Zstandard compressed files are not supported.")
+            )
+        return zstandard.ZstdDecompressor().stream_reader(file, closefd=False)
+
+    raise InvalidFileException(detail=_("Compression format not supported."))
+
+
+class DecompressedFile(io.RawIOBase):
+    """
+    Read-only stream over the decompressed content of a file.
+
+    The decompressed size is bounded by FILE_DECOMPRESSED_SIZE_LIMIT and by
+    FILE_DECOMPRESSION_RATIO_LIMIT times the compressed size, so a small
+    malicious archive cannot expand into the worker memory or disk. Seeking
+    is only supported back to the start, which restarts the decompression.
+    """
+
+    def __init__(self, file, compression: str, compressed_size: int | None = None):
+        super().__init__()
+        self.file = file
+        self.compression = compression
+        self.name = split_compression(getattr(file, "name", "") or "")[0]
+
+        limit = settings.FILE_DECOMPRESSED_SIZE_LIMIT
+        size = compressed_size or getattr(file, "size", None)
+        if size:
+            limit = min(limit, size * settings.FILE_DECOMPRESSION_RATIO_LIMIT)
+        self.limit = limit
+        self._open()
+
+    def _open(self):
+        if self.file.seekable():
+            self.file.seek(0)
+        self._stream = _decompressor(self.file, self.compression)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self.file.seekable()
+
+    def readinto(self, buffer) -> int:
+        try:
+            data = self._stream.read(len(buffer))
+        except DECOMPRESSION_ERRORS as exp:
+            raise InvalidFileException(error=str(exp))
+
+        self._position += len(data)
+        if self._position > self.limit:
+            raise DecompressionLimitException()
+
+        buffer[: len(data)] = data
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR and offset == 0:
+            return self._position
+        if whence == io.SEEK_SET and offset == 0:
+            self._open()
+            return 0
+        raise io.UnsupportedOperation("Decompressed files can only seek to start")
+
+
+def open_decompressed(file, compression: str | None, compressed_size: int = None):
+    """
+    Returns a buffered binary stream with the decompressed content of the file,
+    or the file itself when it is not compressed.
+
+    Content that doesn't start with the codec magic bytes is rejected, a
+    plain file named .gz is as wrong as a corrupted one. Downloads keep the
+    stored bytes (Content-Encoding isn't decoded), so they are still
+    compressed here.
+    """
+    if not compression:
+        return file
+
+    if file.seekable():
+        magic = file.read(len(COMPRESSION_MAGIC[compression]))
+        file.seek(0)
+        if magic != COMPRESSION_MAGIC[compression]:
+            raise InvalidFileException(
+                detail=_("The file content is not compressed as its extension says.")
+            )
+
+    return io.BufferedReader(
+        DecompressedFile(file, compression, compressed_size), buffer_size=CHUNK_SIZE
+    )
+
+
+class IterStream(io.RawIOBase):
+    """Read-only file-like object over an iterator of bytes chunks."""
+
+    def __init__(self, iterator: Iterator[bytes]):
+        super().__init__()
+        self._iterator = iterator
+        self._leftover = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            chunk = self._leftover or next(self._iterator)
+        except StopIteration:
+            return 0
+        size = len(buffer)
+        output, self._leftover = chunk[:size], chunk[size:]
+        buffer[: len(output)] = output
+        return len(output)
+
+
+def iter_decompressed(chunks: Iterator[bytes], compression: str | None):
+    """
+    Decompresses an iterator of bytes chunks (e.g. a streamed HTTP response)
+    returning a buffered binary stream.
+    """
+    stream = io.BufferedReader(IterStream(iter(chunks)), buffer_size=CHUNK_SIZE)
+    if not compression:
+        return stream
+
+    magic = COMPRESSION_MAGIC[compression]
+    if stream.peek(len(magic))[: len(magic)] != magic:
+        return stream
+    return io.BufferedReader(
+        DecompressedFile(stream, compression), buffer_size=CHUNK_SIZE
+    )
+
+
+def transcode_to_gzip(file, compression: str) -> TemporaryUploadedFile:
+    """
+    Recompresses a file as gzip, the only compression BigQuery can load
+    directly from Cloud Storage for CSV and JSON files.
+    """
+    name = split_compression(file.name)[0]
+    output = TemporaryUploadedFile(
+        name=f"{name}.gz", content_type="application/gzip", size=0, charset=None
+    )
+    source = open_decompressed(file, compression)
+    with gzip.GzipFile(fileobj=output, mode="wb") as gz:
+        while chunk := source.read(CHUNK_SIZE):
+            gz.write(chunk)
+
+    output.size = output.tell()
+    output.seek(0)
+    file.seek(0)
+    return output
+
+
+def iter_response_lines(response, compression: str | None = None):
+    """Iterates the lines of a streamed requests response, decompressing them."""
+    if not compression:
+        return response.iter_lines()
+
+    stream = iter_decompressed(
+        response.iter_content(chunk_size=CHUNK_SIZE), compression
+    )
+    return (line.rstrip(b"\r\n") for line in stream)
+
+
+def iter_response_content(
+    response, compression: str | None = None, chunk_size: int = CHUNK_SIZE
+):
+    """Iterates the content of a streamed requests response, decompressing it."""
+    if not compression:
+        return response.iter_content(chunk_size=chunk_size)
+
+    stream = iter_decompressed(
+        response.iter_content(chunk_size=CHUNK_SIZE), compression
+    )
+    return iter(lambda: stream.read(chunk_size), b"")
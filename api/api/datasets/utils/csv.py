@@ -1,15 +1,18 @@
 import csv
 import math
-from django.core.files.uploadedfile import TemporaryUploadedFile
 import requests
+from django.core.files.uploadedfile import TemporaryUploadedFile
 import pandas as pd
 from io import StringIO
 from typing import Dict, List
 
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
 from .bigquery import is_valid_column_name, normalize_column_name
-from .bigquery import normalize_column_name, get_bigquery_datatype
+from .bigquery import normalize_column_name, infer_bigquery_type
+from .compression import iter_response_lines
+from api.utils import http
 from api.datasets.exceptions import (
     CsvPreviewFailed,
     InvalidCsvColumnException,
@@ -69,8 +72,7 @@ def prepare_csv_data_format(data: str, skip_leading_rows: int) -> List:
     first_example_index = max(skip_leading_rows - 1, 0)
     result = []
     for column in df.columns:
-        pandas_type = str(df[column].dtype)
-        bigquery_type, mode = get_bigquery_datatype(df[column], pandas_type)
+        bigquery_type, mode, confidence = infer_bigquery_type(df[column])
 
         result.append(
             {
@@ -79,6 +81,7 @@ def prepare_csv_data_format(data: str, skip_leading_rows: int) -> List:
                 ),
                 "data_type": bigquery_type,
                 "mode": mode,
+                "confidence": confidence,
                 "example_values": df[column][first_example_index:]
                 .head(5)
                 .fillna("")
@@ -122,11 +125,22 @@ def create_dataframe_from_csv(file, sample: str = None) -> pd.DataFrame:
 
 
 def get_content_from_url_csv(
-    urls: list[str], max_lines: int | None = 20, skip_leading_rows: int = 1, **kwargs
+    urls: list[str],
+    max_lines: int | None = 20,
+    skip_leading_rows: int = 1,
+    compression: str | None = None,
+    ranged: bool = False,
+    **kwargs,
 ) -> str:
     """
     Get's the preview from a csv file url or list of urls
-    validating column names and joining the files contents
+    validating column names and joining the files contents.
+    With ranged each file is read through HTTP Range requests that
+    only fetch as much of it as the preview lines need.
+
+    Files are fetched concurrently (DATASETS_PREVIEW_WORKERS at a time)
+    and their headers compared as they arrive, the first mismatch fails
+    the preview without waiting for the remaining files.
 
     Returns:
         A string containing the first n lines from all given urls
@@ -135,43 +149,41 @@ def get_content_from_url_csv(
 
     assert len(urls) > 0, "It needs to be at least one url in the list"
 
-    content = ""
-    columns = pd.Index([])
-
     ml = None
     url_count = len(urls)
     if max_lines:
         ml = math.ceil(max_lines / url_count)
 
-    for url in urls:
-        r = requests.get(url, stream=True)
+    def fetch(url: str) -> tuple[list[str], pd.Index]:
+        try:
+            r = http.stream(url, ranged)
+        except requests.RequestException:
+            r = None
 
-        if r.status_code != 200:
+        if r is None or r.status_code != 200:
             raise CsvPreviewFailed(
                 detail=_("Invalid url or file/folder doesn't not exist")
             )
 
-        line = 0
-        cols = StringIO()
-        for j in r.iter_lines():
-            if line not in range(skip_leading_rows) or not content:
-                content += j.decode() + "\r\n"
-
-            if line == 0:
-                cols.write(j.decode())
+        lines = []
+        with r:
+            for j in iter_response_lines(r, compression):
+                lines.append(j.decode())
+                if len(lines) == ml:
+                    break
 
-            line += 1
-            if line == ml and max_lines:
-                break
-
-        cols.seek(0)
-        df, csv_params = create_dataframe_from_csv(cols, sample=cols.getvalue())
+        header = lines[0] if lines else ""
+        df, csv_params = create_dataframe_from_csv(StringIO(header), sample=header)
         validate_csv_column_names(df)
+        return lines, df.columns
+
+    columns = []
 
-        if columns.empty:
-            columns = df.columns
+    def validate(result: tuple[list[str], pd.Index]):
+        if not columns:
+            columns.append(result[1])
 
-        if not columns.equals(df.columns):
+        if not columns[0].equals(result[1]):
             raise CsvPreviewFailed(
                 dict(
                     detail=_(
@@ -180,7 +192,18 @@ def get_content_from_url_csv(
                 )
             )
 
-    return content
+    results = http.fetch_all(urls, fetch, settings.DATASETS_PREVIEW_WORKERS, validate)
+
+    content = []
+    for idx, (lines, _columns) in enumerate(results):
+        if idx == 0:
+            # the first file keeps the header row
+            lines = lines[:1] + lines[max(skip_leading_rows, 1) :]
+        else:
+            lines = lines[skip_leading_rows:]
+        content.extend(line + "\r\n" for line in lines)
+
+    return "".join(content)
 
 
 def validate_csv_column_names(df: pd.DataFrame, raise_exception=False) -> list:
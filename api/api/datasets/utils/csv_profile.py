@@ -0,0 +1,253 @@
+import csv
+import io
+from typing import Dict, Iterable, List
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from django.conf import settings
+
+from api.datasets.exceptions import InvalidFileException
+from .bigquery import TEMPORAL_PATTERNS
+from .csv import csv_parameters_detect
+
+
+def _any_of(*data_types: str) -> str:
+    return "|".join(f"({TEMPORAL_PATTERNS[t].pattern})" for t in data_types)
+
+
+# Non-null values are matched against these patterns to find which BigQuery
+# types a column fits, each one accepts the values BigQuery loads for it.
+TYPE_PATTERNS = {
+    "INT64": r"^\s*[+-]?\d+\s*$",
+    "FLOAT64": (
+        r"^\s*[+-]?(\d+\.?\d*([eE][+-]?\d+)?|\.\d+([eE][+-]?\d+)?"
+        r"|[iI]nf(inity)?|INF|[nN]a[nN])\s*$"
+    ),
+    "BOOLEAN": r"(?i)^\s*(true|false|t|f|yes|no|y|n|1|0)\s*$",
+    "TIME": _any_of("TIME"),
+    "DATE": _any_of("DATE"),
+    "DATETIME": _any_of("DATE", "DATETIME"),
+    "TIMESTAMP": _any_of("DATE", "DATETIME", "TIMESTAMP"),
+}
+INFERRED_TYPES = ["INT64", "FLOAT64", "BOOLEAN"]
+
+# Offending row numbers kept for each violation
+MAX_VIOLATION_ROWS = 10
+
+# Raw bytes of a block, its string arrays and the masks computed over them
+# are alive at the same time, plus the block Arrow reads ahead.
+BLOCK_MEMORY_FACTOR = 8
+MIN_BLOCK_SIZE = 1024 * 1024
+
+
+class ColumnProfile:
+    """
+    Summary of a CSV column accumulated block by block: the amount of rows
+    and nulls, and for each checked type how many non-null values don't
+    conform to it, with the first offending row numbers.
+    """
+
+    def __init__(self, name: str, data_types: Iterable[str]):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.null_rows = []
+        self.invalid = {data_type: 0 for data_type in data_types}
+        self.invalid_rows = {data_type: [] for data_type in data_types}
+
+    def update(self, array: pa.Array, first_row: int = 0) -> None:
+        """
+        Args:
+            array (pa.Array): Values of the column in a block.
+            first_row (int): Row number of the first value of the block.
+        """
+        self.rows += len(array)
+        self.nulls += array.null_count
+        if array.null_count:
+            self._keep_rows(self.null_rows, array.is_null(), first_row)
+
+        if array.null_count == len(array):
+            return
+
+        for data_type in self.invalid:
+            matches = pc.match_substring_regex(array, TYPE_PATTERNS[data_type])
+            # nulls are checked by the mode, not by the type
+            mismatches = pc.invert(pc.fill_null(matches, True))
+            count = pc.sum(mismatches).as_py()
+            if count:
+                self.invalid[data_type] += count
+                self._keep_rows(self.invalid_rows[data_type], mismatches, first_row)
+
+    @staticmethod
+    def _keep_rows(rows: List[int], mask: pa.Array, first_row: int) -> None:
+        missing = MAX_VIOLATION_ROWS - len(rows)
+        if missing > 0:
+            positions = pc.indices_nonzero(mask)[:missing]
+            rows.extend(first_row + p for p in positions.to_pylist())
+
+    @property
+    def has_nulls(self) -> bool:
+        return self.nulls > 0
+
+    @property
+    def has_values(self) -> bool:
+        return self.rows > self.nulls
+
+    def conforms(self, data_type: str) -> bool:
+        """Whether every non-null value of the column fits the data type."""
+        return self.invalid.get(data_type, 0) == 0
+
+    def infer_type(self) -> str:
+        """Narrowest BigQuery type that fits every non-null value."""
+        if self.has_values:
+            for data_type in INFERRED_TYPES:
+                if data_type in self.invalid and self.conforms(data_type):
+                    return data_type
+        return "STRING"
+
+    def violations(self, schema_field: Dict) -> List[Dict]:
+        """
+        Every way the column breaks its schema field.
+
+        Returns:
+            (List[Dict]): column, data_type, error, count and the first
+            offending row numbers of each violation.
+        """
+        column_name = schema_field["column_name"]
+        expected_type = schema_field["data_type"]
+        mode = schema_field.get("mode", "NULLABLE")
+
+        violations = []
+        if mode == "REQUIRED" and self.has_nulls:
+            violations.append(
+                {
+                    "column": column_name,
+                    "data_type": expected_type,
+                    "error": "required",
+                    "count": self.nulls,
+                    "rows": self.null_rows,
+                }
+            )
+
+        if mode != "REPEATED" and not self.conforms(expected_type):
+            violations.append(
+                {
+                    "column": column_name,
+                    "data_type": expected_type,
+                    "error": "type",
+                    "count": self.invalid[expected_type],
+                    "rows": self.invalid_rows[expected_type],
+                }
+            )
+
+        if expected_type == "ARRAY" and self.infer_type() != "STRING":
+            violations.append(
+                {
+                    "column": column_name,
+                    "data_type": expected_type,
+                    "error": "type",
+                    "count": self.rows - self.nulls,
+                    "rows": [],
+                }
+            )
+        return violations
+
+
+def read_csv_header(file, csv_params: Dict) -> List[str]:
+    """Reads the first record of a CSV file, it may span several lines."""
+    wrapper = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    try:
+        reader = csv.reader(
+            wrapper,
+            delimiter=csv_params["delimiter"],
+            quotechar=csv_params["quotechar"] or '"',
+            escapechar=csv_params["escapechar"],
+            doublequote=csv_params["doublequote"],
+            skipinitialspace=csv_params["skipinitialspace"],
+        )
+        return next(reader, [])
+    finally:
+        wrapper.detach()
+        file.seek(0)
+
+
+def _checked_types(schema: List, idx: int) -> List[str]:
+    if not schema or len(schema) <= idx:
+        return INFERRED_TYPES
+
+    data_type = schema[idx]["data_type"]
+    if data_type in TYPE_PATTERNS:
+        return [data_type]
+    # ARRAY columns are checked to hold text rather than scalars
+    return INFERRED_TYPES if data_type == "ARRAY" else []
+
+
+def csv_block_size() -> int:
+    return max(
+        settings.DATASETS_CSV_MEMORY_BUDGET // BLOCK_MEMORY_FACTOR, MIN_BLOCK_SIZE
+    )
+
+
+def profile_csv(
+    file, sample: str = None, schema: List = None
+) -> tuple[List[ColumnProfile], Dict]:
+    """
+    Streams a CSV file with the Arrow reader, one block at a time, building
+    the profile of every column in a single vectorized pass per block. The
+    memory used is bounded by DATASETS_CSV_MEMORY_BUDGET no matter the file
+    size. Row numbers count the header as the first row.
+
+    Args:
+        file: Readable binary file with the CSV data.
+        sample (str): A sample string from the file used to detect CSV parameters.
+        schema (List): Declared schema, each column is only checked against
+            its type. Without it columns are checked for type inference.
+
+    Returns:
+        columns (List[ColumnProfile]): Profile of each column, in file order.
+        csv_params (dict): A dictionary containing the detected CSV parameters.
+    """
+    try:
+        if not sample:
+            sample = file.read(4096).decode("utf-8")
+        file.seek(0)
+        csv_params = csv_parameters_detect(sample)
+
+        header = read_csv_header(file, csv_params)
+        # positional names, the header may have duplicated or empty names
+        names = [f"c{i}" for i in range(len(header))]
+        columns = [
+            ColumnProfile(name, _checked_types(schema, i))
+            for i, name in enumerate(header)
+        ]
+
+        reader = pa_csv.open_csv(
+            file,
+            read_options=pa_csv.ReadOptions(
+                skip_rows=1, column_names=names, block_size=csv_block_size()
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=csv_params["delimiter"],
+                quote_char=csv_params["quotechar"] or False,
+                escape_char=csv_params["escapechar"] or False,
+                double_quote=csv_params["doublequote"],
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in names},
+                strings_can_be_null=True,
+            ),
+        )
+        first_row = 2
+        for batch in reader:
+            for column, array in zip(columns, batch.columns):
+                if csv_params["skipinitialspace"]:
+                    array = pc.utf8_ltrim_whitespace(array)
+                column.update(array, first_row)
+            first_row += batch.num_rows
+
+        return columns, csv_params
+    except (pa.ArrowInvalid, UnicodeDecodeError, csv.Error) as exp:
+        raise InvalidFileException(error=str(exp))
+    finally:
+        file.seek(0)
@@ -1,15 +1,160 @@
+import codecs
 import json
-import requests
 import math
+import requests
+from itertools import islice
 
 import pandas as pd
-from io import StringIO
-from typing import List
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List
 
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
 from api.datasets.exceptions import InvalidFileException, JsonPreviewFailed
-from .bigquery import normalize_column_name, get_bigquery_datatype
+from .bigquery import classify_value, narrowest_type, normalize_column_name
+from .compression import CHUNK_SIZE, COMPRESSED_MIME_TYPES, iter_response_content
+from .mime import content_mime_type, url_file_name
+from api.utils import http
+
+EXAMPLE_ROWS = 5
+
+# Characters skipped between items, commas only separate array elements
+JSON_SEPARATORS = {None: " \t\r\n\ufeff", False: " \t\r\n", True: " \t\r\n,"}
+
+# Decoding errors this close to the end of the buffer may be an item that
+# continues in the next chunk, e.g. a -Infinity literal or \uXXXX escape cut
+# short. Unterminated strings are reported where they start instead.
+JSON_TRUNCATED_TAIL = len("-Infinity")
+
+
+class JsonSchemaField:
+    """
+    Types seen for a JSON path, merged value by value. Objects become
+    RECORD fields with their own children, lists make the field REPEATED
+    and nulls are ignored for the type.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.classes = Counter()
+        self.fields = {}
+        self.lists = 0
+        self.scalars = 0
+        self.examples = {}
+
+    def add(self, value) -> None:
+        if value is None:
+            return
+        if isinstance(value, list):
+            self.lists += 1
+            for element in value:
+                if isinstance(element, list):
+                    # BigQuery doesn't support arrays of arrays
+                    self.classes["ARRAY"] += 1
+                elif element is not None:
+                    self._add_element(element)
+        else:
+            self.scalars += 1
+            self._add_element(value)
+
+    def _add_element(self, value) -> None:
+        if isinstance(value, dict):
+            self.classes["RECORD"] += 1
+            add_json_object(self.fields, value)
+        else:
+            self.classes[classify_value(value)] += 1
+
+    def to_bigquery(self, include_examples: bool = False, rows: int = 0) -> Dict:
+        mode = "REPEATED" if self.lists else "NULLABLE"
+        data_type, confidence = narrowest_type(self.classes)
+        if data_type == "ARRAY" or (self.lists and self.scalars):
+            # lists mixed with single values can't be loaded as they are
+            data_type, mode, confidence = "STRING", "NULLABLE", 0.0
+
+        column_data = {
+            "column_name": normalize_column_name(self.name),
+            "data_type": data_type,
+            "mode": mode,
+            "confidence": confidence,
+        }
+        if include_examples:
+            column_data["example_values"] = [
+                self.examples.get(row, "") for row in range(rows)
+            ]
+        if data_type == "RECORD":
+            column_data["fields"] = [
+                field.to_bigquery() for field in self.fields.values()
+            ]
+        return column_data
+
+
+def add_json_object(fields: Dict[str, JsonSchemaField], obj: Dict) -> None:
+    for key, value in obj.items():
+        if key not in fields:
+            fields[key] = JsonSchemaField(key)
+        fields[key].add(value)
+
+
+def infer_json_schema(items: Iterable[Any], include_examples: bool = True) -> List:
+    """
+    Infers the BigQuery schema of JSON objects walking each of them once.
+    Items are consumed one at a time, so it works as a streaming
+    accumulator over iter_json_items.
+
+    Args:
+        items (Iterable[Any]): Parsed JSON objects, other values are skipped.
+        include_examples (bool): If include examples
+
+    Returns:
+        (List): Columns in BigQuery format
+    """
+    fields = {}
+    rows = 0
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+
+        add_json_object(fields, item)
+        if rows < EXAMPLE_ROWS:
+            for key, value in item.items():
+                fields[key].examples[rows] = "" if value is None else value
+        rows += 1
+
+    return [
+        field.to_bigquery(include_examples, min(rows, EXAMPLE_ROWS))
+        for field in fields.values()
+    ]
+
+
+def profile_json(file) -> tuple[List[JsonSchemaField], int]:
+    """
+    Walks a JSON file once through iter_json_items, keeping only the type
+    counts of each top level field, so memory use doesn't depend on the
+    file size.
+
+    Args:
+        file: Binary file, e.g. an upload or its decompressed stream.
+
+    Returns:
+        tuple(List[JsonSchemaField], int): Fields in order of appearance and
+        the amount of objects read, a field seen in fewer values than
+        objects has nulls.
+    """
+    fields = {}
+    rows = 0
+    chunks = iter(lambda: file.read(CHUNK_SIZE), b"")
+    try:
+        for item in iter_json_items(chunks):
+            if isinstance(item, dict):
+                add_json_object(fields, item)
+                rows += 1
+    except UnicodeDecodeError as exp:
+        raise InvalidFileException(error=str(exp))
+    finally:
+        if file.seekable():
+            file.seek(0)
+    return list(fields.values()), rows
 
 
 def prepare_json_data_format(data: str, include_examples: bool = True) -> List:
@@ -27,32 +172,8 @@ def prepare_json_data_format(data: str, include_examples: bool = True) -> List:
         while isinstance(data_obj, str):
             data_obj = json.loads(data_obj)
         data_obj = [data_obj] if isinstance(data_obj, dict) else data_obj
-        data = json.dumps(data_obj)
-
-        json_data = StringIO(data)
-        df = pd.read_json(json_data)
-        result = []
-        for column in df.columns:
-            pandas_type = str(df[column].dtype)
-            bigquery_type, mode = get_bigquery_datatype(df[column], pandas_type)
-
-            column_data = {
-                "column_name": normalize_column_name(column),
-                "data_type": bigquery_type,
-                "mode": mode,
-            }
-            if include_examples:
-                column_data["example_values"] = df[column].head(5).fillna("").tolist()
-
-            if bigquery_type == "RECORD":
-                nested_data = df[column].fillna("").tolist()
-                nested_json = json.dumps(nested_data)
-                column_data["fields"] = prepare_json_data_format(
-                    nested_json, include_examples=False
-                )
 
-            result.append(column_data)
-        return result
+        return infer_json_schema(data_obj, include_examples=include_examples)
     except Exception as exp:
         raise InvalidFileException(error=str(exp))
 
@@ -87,84 +208,157 @@ def create_dataframe_from_json(file) -> pd.DataFrame:
         raise InvalidFileException(error=str(exp))
 
 
+def iter_json_items(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Incrementally parses a stream of JSON bytes, yielding the elements of a
+    top level array or each value of a newline delimited (or concatenated)
+    JSON document as soon as they are complete.
+
+    Args:
+        chunks (Iterable[bytes]): Raw content, e.g. a streamed HTTP response.
+
+    Returns:
+        Iterator[Any]: Parsed items.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+
+    buffer = ""
+    idx = 0
+    is_array = None
+    exhausted = False
+
+    def fill() -> bool:
+        nonlocal buffer, idx, exhausted
+        if exhausted:
+            return False
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer = buffer[idx:] + utf8.decode(b"", final=True)
+        else:
+            buffer = buffer[idx:] + utf8.decode(chunk)
+        idx = 0
+        return True
+
+    while True:
+        while idx < len(buffer) and buffer[idx] in JSON_SEPARATORS[is_array]:
+            idx += 1
+        if idx == len(buffer):
+            if fill():
+                continue
+            return
+
+        char = buffer[idx]
+        if is_array is None:
+            is_array = char == "["
+            idx += is_array
+            continue
+        if is_array and char == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, idx)
+        except json.JSONDecodeError as exp:
+            # the item may continue in the next chunk, anything else is
+            # invalid however much more is read
+            truncated = (
+                exp.msg.startswith("Unterminated string")
+                or exp.pos >= len(buffer) - JSON_TRUNCATED_TAIL
+            )
+            if truncated and fill():
+                continue
+            raise InvalidFileException(error=str(exp))
+
+        # a number at the end of the buffer could still have more digits
+        if end == len(buffer) and not exhausted:
+            fill()
+            continue
+
+        idx = end
+        yield item
+
+
 def get_content_from_url_json(
-    urls: list[str], max_lines: int | None = 20, **kwargs
+    urls: list[str],
+    max_lines: int | None = 20,
+    compression: str | None = None,
+    ranged: bool = False,
+    **kwargs,
 ) -> str:
     """
     Get's the preview from a json file url or list of urls
-    validating column names and joining the file contents
+    validating column names and joining the file contents.
+    Each response is parsed incrementally and closed once the
+    items it contributes to the preview are read, with ranged only the
+    bytes holding those items are requested through HTTP Range requests.
+    Files are fetched concurrently and their columns compared as they
+    arrive, the first mismatch fails the preview right away.
 
     Returns:
-        A string containing the first n lines from all given urls
+        A string containing the first n items from all given urls
     """
 
     assert len(urls) > 0, "It needs to be at least one url in the list"
 
-    ml = 0
+    ml = None
     url_count = len(urls)
     if max_lines:
         ml = math.ceil(max_lines / url_count)
 
-    columns = None
-    items = []
-    item_count = 0
-
-    for url in urls:
-        r = requests.get(url, stream=True)
+    content_types = ["application/octet-stream", "application/json"]
+    if compression:
+        content_types += COMPRESSED_MIME_TYPES[compression]
 
-        if r.status_code != 200 or r.headers.get("Content-Type", "") not in [
-            "application/octet-stream",
-            "application/json",
-        ]:
+    def mismatch() -> JsonPreviewFailed:
+        return JsonPreviewFailed(
+            dict(
+                detail=_(
+                    "The tables need to have the same number of columns and column names"
+                )
+            )
+        )
+
+    def fetch(url: str) -> list[dict]:
+        try:
+            r = http.stream(url, ranged)
+        except requests.RequestException:
+            r = None
+
+        if (
+            r is None
+            or r.status_code != 200
+            or content_mime_type(r.headers.get("Content-Type"), url_file_name(url))
+            not in content_types
+        ):
             raise JsonPreviewFailed(
                 detail=_("Invalid url or file/folder doesn't not exist")
             )
 
-        open_brackets = 0
-        item = ""
-        save = False
-        complete_item = False
-        for chunck in r.iter_content(chunk_size=1024):
-            for c in chunck.decode():
-                if c == "{":
-                    save = True
-                    open_brackets += 1
-                elif c == "}":
-                    open_brackets -= 1
-                    if open_brackets == 0:
-                        complete_item = True
-
-                if save:
-                    item += c
-
-                if complete_item:
-                    if item[0] in [",", "["]:
-                        item = item[1:]
-
-                    load_item = json.loads(item)
-                    items.append(load_item)
-                    item_count += 1
-
-                    item = ""
-                    save = False
-                    complete_item = False
-
-                    if columns == None:
-                        columns = load_item.keys()
-
-                    if columns != load_item.keys():
-                        raise JsonPreviewFailed(
-                            dict(
-                                detail=_(
-                                    "The tables need to have the same number of columns and column names"
-                                )
-                            )
-                        )
-
-                if item_count == ml and max_lines:
-                    break
-
-            if len(items) == max_lines and max_lines:
-                break
-
-    return json.dumps(items)
+        items = []
+        with r:
+            content = iter_response_content(r, compression)
+            for item in islice(iter_json_items(content), ml):
+                if not isinstance(item, dict):
+                    continue
+
+                if items and items[0].keys() != item.keys():
+                    raise mismatch()
+                items.append(item)
+        return items
+
+    columns = []
+
+    def validate(result: list[dict]):
+        if not result:
+            return
+        if not columns:
+            columns.append(result[0].keys())
+        if columns[0] != result[0].keys():
+            raise mismatch()
+
+    results = http.fetch_all(urls, fetch, settings.DATASETS_PREVIEW_WORKERS, validate)
+    items = [item for result in results for item in result]
+
+    return json.dumps(items[:max_lines] if max_lines else items)
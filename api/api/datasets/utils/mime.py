@@ -0,0 +1,50 @@
+import urllib.parse
+
+from .compression import split_compression
+
+# Content types of the extensions accepted for uploads
+EXTENSION_MIME_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "jsonl": "application/json",
+    "txt": "text/plain",
+    "parquet": "application/vnd.apache.parquet",
+    "avro": "application/avro",
+}
+COMPRESSION_MIME_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+# Content types servers use when they don't know better, S3 stores objects
+# uploaded without one as binary/octet-stream
+GENERIC_MIME_TYPES = ["application/octet-stream", "binary/octet-stream", ""]
+
+
+def guess_mime_type(name: str) -> str | None:
+    """
+    Content type of a file from its extension, None when the extension
+    isn't one of the accepted ones.
+    """
+    name, compression = split_compression(name)
+    extension = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    if extension not in EXTENSION_MIME_TYPES:
+        return None
+    if compression:
+        return COMPRESSION_MIME_TYPES[compression]
+    return EXTENSION_MIME_TYPES[extension]
+
+
+def content_mime_type(content_type: str | None, name: str) -> str:
+    """
+    Content type of a file from its Content-Type header, without
+    parameters. Generic types are replaced by the guess from the file
+    extension, when there is one.
+    """
+    mime_type = (content_type or "").split(";")[0].strip().lower()
+    if mime_type in GENERIC_MIME_TYPES:
+        mime_type = guess_mime_type(name) or mime_type
+    return mime_type
+
+
+def url_file_name(url: str) -> str:
+    """Last segment of the url path, e.g. data.json."""
+    path = urllib.parse.urlsplit(url).path
+    return urllib.parse.unquote(path.rsplit("/", 1)[-1])
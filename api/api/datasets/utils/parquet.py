@@ -0,0 +1,255 @@
+from typing import Dict, List
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+from django.conf import settings
+
+from api.datasets.exceptions import InvalidFileException
+
+BIGQUERY_TO_ARROW_TYPES = {
+    "INT64": pa.int64(),
+    "INTEGER": pa.int64(),
+    "FLOAT64": pa.float64(),
+    "FLOAT": pa.float64(),
+    "NUMERIC": pa.decimal128(38, 9),
+    "BOOLEAN": pa.bool_(),
+    "BOOL": pa.bool_(),
+    "STRING": pa.string(),
+    "DATETIME": pa.timestamp("us"),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+    "DATE": pa.date32(),
+    "TIME": pa.time64("us"),
+}
+
+# Boolean spellings accepted by the CSV validator (TYPE_PATTERNS["BOOLEAN"])
+# and by BigQuery, in any case.
+BOOLEAN_VALUES = {
+    True: ["true", "t", "yes", "y", "1"],
+    False: ["false", "f", "no", "n", "0"],
+}
+TIMEZONE_SUFFIX = r"(Z|[+-]\d{2}:?\d{2})$"
+
+
+def bigquery_schema_to_arrow(schema: List) -> pa.Schema:
+    """
+    Converts a schema in the BigQuery format used across the datasets app
+    (column_name, data_type, mode, fields) into a pyarrow schema.
+
+    Args:
+        schema (List): BigQuery schema as returned by the preview endpoints.
+
+    Returns:
+        (pa.Schema): Equivalent arrow schema.
+    """
+    return pa.schema([_bigquery_field_to_arrow(field) for field in schema])
+
+
+def _bigquery_field_to_arrow(field: Dict) -> pa.Field:
+    data_type = field["data_type"].upper()
+    mode = field.get("mode", "NULLABLE")
+
+    if data_type in ["RECORD", "STRUCT"]:
+        arrow_type = pa.struct(
+            [_bigquery_field_to_arrow(f) for f in field.get("fields", [])]
+        )
+    else:
+        arrow_type = BIGQUERY_TO_ARROW_TYPES.get(data_type, pa.string())
+
+    if mode == "REPEATED":
+        arrow_type = pa.list_(arrow_type)
+
+    return pa.field(field["column_name"], arrow_type, nullable=mode != "REQUIRED")
+
+
+def _parse_type(arrow_type: pa.DataType) -> pa.DataType:
+    """
+    Temporal values are read as strings and cast afterwards, arrow readers
+    are stricter than the cast kernels about their textual formats.
+    """
+    if pa.types.is_temporal(arrow_type):
+        return pa.string()
+    if pa.types.is_struct(arrow_type):
+        return pa.struct(
+            [
+                pa.field(f.name, _parse_type(f.type), nullable=f.nullable)
+                for f in arrow_type
+            ]
+        )
+    if pa.types.is_list(arrow_type):
+        return pa.list_(_parse_type(arrow_type.value_type))
+    return arrow_type
+
+
+def _parse_schema(schema: pa.Schema) -> pa.Schema:
+    return pa.schema(
+        [pa.field(f.name, _parse_type(f.type), nullable=True) for f in schema]
+    )
+
+
+def _spellings(values: List[str]) -> List[str]:
+    return [v for value in values for v in {value, value.upper(), value.title()}]
+
+
+def _string_to_time(array: pa.Array, arrow_type: pa.DataType) -> pa.Array:
+    # there's no cast from strings to times, they're read as the time of
+    # the epoch day
+    day = pc.binary_join_element_wise("1970-01-01 ", array, "")
+    return day.cast(pa.timestamp(arrow_type.unit)).cast(arrow_type)
+
+
+def _string_to_timestamp(array: pa.Array, arrow_type: pa.DataType) -> pa.Array:
+    """Values without a UTC offset are UTC, like BigQuery reads them."""
+    if arrow_type.tz is None:
+        return array.cast(arrow_type)
+
+    text = pc.replace_substring_regex(array, r"\s*UTC$", "Z")
+    has_offset = pc.match_substring_regex(text, TIMEZONE_SUFFIX)
+    empty = pa.scalar(None, pa.string())
+    aware = pc.if_else(has_offset, text, empty).cast(arrow_type)
+    naive = pc.if_else(has_offset, empty, text).cast(pa.timestamp(arrow_type.unit))
+    return pc.if_else(has_offset, aware, pc.assume_timezone(naive, arrow_type.tz))
+
+
+def _convert(array: pa.Array, arrow_type: pa.DataType) -> pa.Array:
+    """Casts a column read with _parse_type to its final type."""
+    if array.type == arrow_type:
+        return array
+    if pa.types.is_struct(arrow_type):
+        return pa.StructArray.from_arrays(
+            [_convert(array.field(f.name), f.type) for f in arrow_type],
+            fields=list(arrow_type),
+            mask=array.is_null(),
+        )
+    if pa.types.is_list(arrow_type):
+        return pa.ListArray.from_arrays(
+            array.offsets,
+            _convert(array.values, arrow_type.value_type),
+            type=arrow_type,
+            mask=array.is_null(),
+        )
+    if pa.types.is_string(array.type) and pa.types.is_time(arrow_type):
+        return _string_to_time(array, arrow_type)
+    if pa.types.is_string(array.type) and pa.types.is_timestamp(arrow_type):
+        return _string_to_timestamp(array, arrow_type)
+    return array.cast(arrow_type)
+
+
+def _write_batches(reader, output, schema: pa.Schema, row_group_size: int) -> int:
+    rows = 0
+    writer = pq.ParquetWriter(output, schema, compression="snappy")
+    try:
+        for batch in reader:
+            batch = pa.RecordBatch.from_arrays(
+                [_convert(column, f.type) for column, f in zip(batch.columns, schema)],
+                schema=schema,
+            )
+            writer.write_batch(batch, row_group_size=row_group_size)
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    return rows
+
+
+def csv_to_parquet(
+    file,
+    output,
+    schema: List,
+    csv_params: Dict,
+    skip_leading_rows: int = 1,
+) -> int:
+    """
+    Streams a CSV file into a Parquet file, one row group per block read,
+    using the confirmed schema so the column types are exact.
+
+    Args:
+        file: Readable binary file with the CSV data.
+        output: Writable binary file that receives the Parquet data.
+        schema (List): Confirmed BigQuery schema.
+        csv_params (Dict): Params detected with csv_parameters_detect.
+        skip_leading_rows (int): Header rows.
+
+    Returns:
+        (int): Number of rows written.
+    """
+    arrow_schema = bigquery_schema_to_arrow(schema)
+    parse_schema = _parse_schema(arrow_schema)
+
+    try:
+        reader = pa_csv.open_csv(
+            file,
+            read_options=pa_csv.ReadOptions(
+                skip_rows=skip_leading_rows,
+                column_names=arrow_schema.names,
+                block_size=settings.DATASETS_PARQUET_BLOCK_SIZE,
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=csv_params.get("delimiter", ","),
+                quote_char=csv_params.get("quotechar") or False,
+                escape_char=csv_params.get("escapechar") or False,
+                double_quote=csv_params.get("doublequote", True),
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={f.name: f.type for f in parse_schema},
+                strings_can_be_null=True,
+                true_values=_spellings(BOOLEAN_VALUES[True]),
+                false_values=_spellings(BOOLEAN_VALUES[False]),
+            ),
+        )
+        rows = _write_batches(
+            reader, output, arrow_schema, settings.DATASETS_PARQUET_ROW_GROUP_SIZE
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as exp:
+        raise InvalidFileException(error=str(exp))
+    finally:
+        file.seek(0)
+    return rows
+
+
+def json_to_parquet(file, output, schema: List) -> int:
+    """
+    Streams a newline delimited JSON file into a Parquet file, one row group
+    per block read, using the confirmed schema so the column types are exact.
+
+    Args:
+        file: Readable binary file with the NDJSON data.
+        output: Writable binary file that receives the Parquet data.
+        schema (List): Confirmed BigQuery schema.
+
+    Returns:
+        (int): Number of rows written.
+    """
+    arrow_schema = bigquery_schema_to_arrow(schema)
+
+    try:
+        reader = pa_json.open_json(
+            file,
+            read_options=pa_json.ReadOptions(
+                block_size=settings.DATASETS_PARQUET_BLOCK_SIZE
+            ),
+            parse_options=pa_json.ParseOptions(
+                explicit_schema=_parse_schema(arrow_schema),
+                unexpected_field_behavior="ignore",
+            ),
+        )
+        rows = _write_batches(
+            reader, output, arrow_schema, settings.DATASETS_PARQUET_ROW_GROUP_SIZE
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as exp:
+        raise InvalidFileException(error=str(exp))
+    finally:
+        file.seek(0)
+    return rows
+
+
+def read_parquet_schema(file) -> pa.Schema:
+    """Reads the schema from the footer of a Parquet file."""
+    try:
+        schema = pq.ParquetFile(file).schema_arrow
+    except (pa.ArrowInvalid, OSError) as exp:
+        raise InvalidFileException(error=str(exp))
+    finally:
+        file.seek(0)
+    return schema
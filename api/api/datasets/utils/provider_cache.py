@@ -0,0 +1,72 @@
+import hashlib
+import json
+import urllib.parse
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Query params that change between links to the same object (S3 presigned
+# urls are signed again on every share)
+VOLATILE_QUERY_PREFIXES = ("x-amz-",)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a provider url so every link to the same object shares the
+    cache: lowercase scheme and host, decoded path, no fragment and sorted
+    query params without signatures.
+    """
+    parsed = urllib.parse.urlsplit(url.strip())
+    query = sorted(
+        (key, value)
+        for key, value in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith(VOLATILE_QUERY_PREFIXES)
+    )
+    return urllib.parse.urlunsplit(
+        (
+            parsed.scheme.lower(),
+            parsed.netloc.lower(),
+            urllib.parse.unquote(parsed.path),
+            urllib.parse.urlencode(query),
+            "",
+        )
+    )
+
+
+def cache_key(*parts) -> str:
+    digest = hashlib.sha256(json.dumps(parts, default=str).encode("utf-8"))
+    return f"providers:{digest.hexdigest()}"
+
+
+def resource_version(metadata: dict) -> str:
+    """ETag, generation or modifiedTime reported by the provider."""
+    for field in ["version", "etag", "generation", "modifiedTime", "md5Checksum"]:
+        if metadata.get(field):
+            return str(metadata[field])
+    return ""
+
+
+def folder_version(files: list) -> str:
+    versions = sorted(
+        (f.get("name", ""), resource_version(f), str(f.get("size", ""))) for f in files
+    )
+    return hashlib.sha256(json.dumps(versions).encode("utf-8")).hexdigest()
+
+
+def get_or_set(key: str, compute: Callable[[], Any], timeout: int) -> Any:
+    """
+    Returns the cached value or computes and stores it. Values bigger than
+    PROVIDER_CACHE_MAX_ENTRY_SIZE aren't stored, so a few huge previews
+    can't evict everything else.
+    """
+    cache = caches[settings.PROVIDER_CACHE_ALIAS]
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    value = compute()
+    size = len(json.dumps(value, default=str))
+    if size <= settings.PROVIDER_CACHE_MAX_ENTRY_SIZE:
+        cache.set(key, value, timeout)
+    return value
@@ -4,14 +4,22 @@ import requests
 from django.utils.translation import gettext_lazy as _
 
 from api.datasets.exceptions import TextPreviewFailed
+from api.datasets.utils.compression import iter_response_lines
+from api.utils import http
 
 
 def get_content_from_url_text(
-    urls: list[str], max_lines: int | None = 20, **kwargs
+    urls: list[str],
+    max_lines: int | None = 20,
+    compression: str | None = None,
+    ranged: bool = False,
+    **kwargs,
 ) -> bytes:
     """
     Gets the preview from a json file url or list of urls
-    validating column names and joining the file contents
+    validating column names and joining the file contents.
+    With ranged each file is read through HTTP Range requests that
+    only fetch as much of it as the preview lines need.
 
     Returns:
         A string containing the first n lines from all given urls
@@ -27,19 +35,23 @@ def get_content_from_url_text(
     content = []
     lines = 0
     for url in urls:
-        r = requests.get(url, stream=True)
+        try:
+            r = http.stream(url, ranged)
+        except requests.RequestException:
+            r = None
 
-        if r.status_code != 200:
+        if r is None or r.status_code != 200:
             raise TextPreviewFailed(
                 detail=_("Invalid url or file/folder doesn't not exist")
             )
 
-        for line in r.iter_lines():
-            content.append(line)
-            lines += 1
+        with r:
+            for line in iter_response_lines(r, compression):
+                content.append(line)
+                lines += 1
 
-            if lines == ml:
-                break
+                if lines == ml:
+                    break
 
         if lines == ml:
             break
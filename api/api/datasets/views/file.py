@@ -28,9 +28,19 @@ from api.datasets.serializers import (
     SearchQuerySerializer,
 )
 from api.utils.pagination import StartEndPagination, SearchQueryPagination
-from api.datasets.enums import UploadType
+from api.datasets.enums import FileType, UploadType
+from api.datasets.utils.compression import split_compression
 from api.datasets.serializers.email import PrivateDataAccess
 
+# Validation of the file downloaded for each type FileUploadSerializer
+# accepts from a url (URL_FILE_TYPES)
+URL_UPLOAD_SERIALIZERS = {
+    FileType.CSV: CSVSerializer,
+    FileType.JSON: JSONSerializer,
+    FileType.JSONL: JSONSerializer,
+    FileType.TXT: TXTSerializer,
+}
+
 
 class FileViewSet(mixins.ListModelMixin, GenericViewSet):
     serializer_class = FileSerializer
@@ -88,9 +98,10 @@ class FileViewSet(mixins.ListModelMixin, GenericViewSet):
         serializer.is_valid(raise_exception=True)
         url = serializer.validated_data.get("url", "")
         file_type = serializer.validated_data.get("file_type", "")
+        compression = serializer.fields["url"].compression
 
         provider = return_url_provider(url)
-        preview = provider.preview(url, file_type)
+        preview = provider.preview(url, file_type, compression)
 
         return Response(preview, status=status.HTTP_200_OK)
 
@@ -112,19 +123,26 @@ class FileViewSet(mixins.ListModelMixin, GenericViewSet):
 
             provider = return_url_provider(url)
             f = provider.process(url, skip_leading_rows, file_type)
+            compression = split_compression(f.name)[1]
 
-            serializer_class_name = f"{file_type.upper()}Serializer"
-            serializer_class = globals().get(serializer_class_name)
+            serializer_class = URL_UPLOAD_SERIALIZERS[file_type]
 
             # validates the generated file
-            serializer_class(
+            file_serializer = serializer_class(
                 data=dict(
                     file=f,
                     schema=serializer.validated_data.get("schema", []),
                     autodetect=serializer.validated_data.get("autodetect", False),
+                    compression=compression,
+                )
+            )
+            file_serializer.is_valid(raise_exception=True)
+            if "csv_params" in file_serializer.validated_data:
+                serializer.validated_data["csv_params"] = (
+                    file_serializer.validated_data["csv_params"]
                 )
-            ).is_valid(raise_exception=True)
             serializer.validated_data["file"] = f
+            serializer.validated_data["compression"] = compression
 
         file_service = FileServiceFactory.get_file_service(
             user=request.user, **serializer.validated_data
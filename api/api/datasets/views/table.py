@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
 from api.datasets.serializers import (
@@ -10,10 +11,12 @@ from api.datasets.serializers import (
     TableTransformSerializer,
     ChartSerializer,
     TableSchemaSerializer,
+    TableStageSerializer,
 )
 from api.datasets.services import ChartService, apply_transformations, chart_select
 from api.datasets.models import File, Table
 from api.datasets.permissions import IsTableAllowed
+from api.datasets.tasks import stage_to_notebook
 
 
 class TableViewSet(mixins.ListModelMixin, GenericViewSet):
@@ -127,6 +130,35 @@ class TableViewSet(mixins.ListModelMixin, GenericViewSet):
 
         return Response(data=schema, status=status.HTTP_200_OK)
 
+    @action(
+        detail=False,
+        methods=["post"],
+        name="stage",
+        url_path="stage",
+        permission_classes=[permissions.IsAuthenticated, IsTableAllowed],
+        serializer_class=TableStageSerializer,
+    )
+    def stage(self, request, **kwargs):
+        """
+        Exports the tables as Parquet files into the notebook folder of the
+        user, in the background. The user is notified when they're staged.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        tables = serializer.validated_data["tables"]
+        for table in tables:
+            self.check_object_permissions(request, table)
+
+        table_ids = [table.id for table in tables]
+        transaction.on_commit(
+            lambda: stage_to_notebook.delay(request.user.id, table_ids)
+        )
+        return Response(
+            data={"detail": _("Tables are being staged to the notebook.")},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
 
 class PublicTableListView(mixins.ListModelMixin, GenericViewSet):
     serializer_class = TableSerializer
@@ -4,9 +4,13 @@ from datetime import datetime
 from unittest.mock import patch, MagicMock
 
 from django.conf import settings
+from django.db.models.signals import post_save
+from factory.django import mute_signals
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from api.users.factories import UserFactory
+
 
 class HealthCheckTestCase(APITestCase):
 
@@ -87,6 +91,60 @@ class HealthCheckTestCase(APITestCase):
         self.assertIn("services", data)
         self.assertEqual(set(data["services"].keys()), {"database", "redis", "celery"})
 
+    def test_hosts_are_not_listed(self):
+        pools = {
+            "https://files.example.com:443": {"connections": 1, "requests": 3},
+            "http://10.0.0.5:9000": {"connections": 2, "requests": 2},
+        }
+        queues = {
+            "http://ollama.internal:11434": {
+                "size": 2,
+                "in_flight": 1,
+                "waiting": 0,
+                "acquired": 4,
+                "rejected": 1,
+                "queue_time_avg_ms": 2.0,
+                "queue_time_max_ms": 5.0,
+            }
+        }
+        p1, p2, p3 = self._mock_all()
+        with p1, p2, p3, patch(
+            "api.health.views.connection_stats", return_value=pools
+        ), patch("api.health.views.OllamaClient.queue_stats", return_value=queues):
+            response = self.client.get(self.url)
+
+        self.assertNotIn("example.com", str(response.content))
+        self.assertNotIn("10.0.0.5", str(response.content))
+        self.assertNotIn("ollama.internal", str(response.content))
+        self.assertEqual(response.data["http_pools"]["hosts"], 2)
+        self.assertEqual(response.data["http_pools"]["requests"], 5)
+        self.assertEqual(response.data["http_pools"]["reuse_ratio"], 0.4)
+        self.assertEqual(response.data["ollama_queue"]["servers"], 1)
+        self.assertEqual(response.data["ollama_queue"]["rejected"], 1)
+
+
+class HealthDetailTestCase(APITestCase):
+
+    def setUp(self):
+        self.url = f"/{settings.API_URI}/health/details/"
+
+    def _user(self, is_staff):
+        with mute_signals(post_save):
+            return UserFactory(is_staff=is_staff)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self._user(is_staff=False))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lists_hosts_to_admins(self):
+        pools = {"https://files.example.com:443": {"connections": 1, "requests": 3}}
+        self.client.force_authenticate(self._user(is_staff=True))
+        with patch("api.health.views.connection_stats", return_value=pools):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["http_pools"], pools)
+
 
 class RedisHealthCheckUnitTestCase(APITestCase):
 
@@ -2,8 +2,9 @@
 
 from django.urls import path
 
-from api.health.views import HealthView
+from api.health.views import HealthDetailView, HealthView
 
 urlpatterns = [
     path("health/", HealthView.as_view(), name="health-check"),
+    path("health/details/", HealthDetailView.as_view(), name="health-details"),
 ]
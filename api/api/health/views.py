@@ -11,8 +11,29 @@ Response schema:
       "database": {"status": "ok"|"error", "latency_ms": float, "error": str|None},
       "redis":    {"status": "ok"|"error", "latency_ms": float, "error": str|None},
       "celery":   {"status": "ok"|"error", "workers": int,      "error": str|None},
+    },
+    "http_pools": {"hosts": int, "connections": int, "requests": int, "reuse_ratio": float},
+    "ai_cache": {"hits": int, "misses": int, "hit_rate": float},
+    "ollama_queue": {"servers": int, "size": int, "in_flight": int, "waiting": int,
+                     "acquired": int, "rejected": int, "queue_time_max_ms": float},
+    "ai_router": {
+      "<provider>": {"state": "closed"|"open"|"half_open", "requests": int, "error_rate": float,
+                     "p50_ms": float|None, "p95_ms": float|None, "consecutive_failures": int},
     }
   }
+
+The public check only reports totals, the pooled hosts (users' HTTPS/S3
+hosts, internal endpoints) and Ollama urls are listed by host at
+health/details/, for admins only:
+  {
+    "http_pools": {
+      "<scheme://host:port>": {"connections": int, "requests": int, "reuse_ratio": float},
+    },
+    "ollama_queue": {
+      "<ollama url>": {"size": int, "in_flight": int, "waiting": int, "acquired": int,
+                       "rejected": int, "queue_time_avg_ms": float, "queue_time_max_ms": float},
+    },
+  }
 """
 
 from __future__ import annotations
@@ -23,11 +44,16 @@ from datetime import datetime, timezone
 import redis
 from django.conf import settings
 from django.db import connections, DatabaseError
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 
+from api.ai import cache as ai_cache
+from api.ai.clients.ollama_client import OllamaClient
+from api.ai.providers import router_stats
+from api.utils.http import connection_stats
+
 VERSION = getattr(settings, "API_VERSION", "1.0.0")
 
 
@@ -84,6 +110,29 @@ def _check_celery() -> dict:
         return {"status": "error", "workers": 0, "error": str(exc)}
 
 
+def _pool_totals(pools: dict) -> dict:
+    connections_opened = sum(p["connections"] for p in pools.values())
+    requests_sent = sum(p["requests"] for p in pools.values())
+    return {
+        "hosts": len(pools),
+        "connections": connections_opened,
+        "requests": requests_sent,
+        "reuse_ratio": (
+            1 - connections_opened / requests_sent if requests_sent else 0.0
+        ),
+    }
+
+
+def _queue_totals(queues: dict) -> dict:
+    totals = {"servers": len(queues)}
+    for key in ["size", "in_flight", "waiting", "acquired", "rejected"]:
+        totals[key] = sum(q[key] for q in queues.values())
+    totals["queue_time_max_ms"] = max(
+        [q["queue_time_max_ms"] for q in queues.values()], default=0
+    )
+    return totals
+
+
 class HealthView(APIView):
     permission_classes = [AllowAny]
 
@@ -100,8 +149,24 @@ class HealthView(APIView):
                 "version": VERSION,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
                 "services": services,
+                "http_pools": _pool_totals(connection_stats()),
+                "ai_cache": ai_cache.stats(),
+                "ollama_queue": _queue_totals(OllamaClient.queue_stats()),
+                "ai_router": router_stats(),
             },
             status=(
                 status.HTTP_200_OK if all_ok else status.HTTP_503_SERVICE_UNAVAILABLE
             ),
         )
+
+
+class HealthDetailView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                "http_pools": connection_stats(),
+                "ollama_queue": OllamaClient.queue_stats(),
+            }
+        )
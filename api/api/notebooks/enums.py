@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class NotebookStatus(models.TextChoices):
+    """States of a Vertex AI Workbench instance (notebooks_v2.State)."""
+
+    STATE_UNSPECIFIED = "STATE_UNSPECIFIED", "STATE_UNSPECIFIED"
+    STARTING = "STARTING", "STARTING"
+    PROVISIONING = "PROVISIONING", "PROVISIONING"
+    ACTIVE = "ACTIVE", "ACTIVE"
+    STOPPING = "STOPPING", "STOPPING"
+    STOPPED = "STOPPED", "STOPPED"
+    DELETED = "DELETED", "DELETED"
+    UPGRADING = "UPGRADING", "UPGRADING"
+    INITIALIZING = "INITIALIZING", "INITIALIZING"
+    SUSPENDING = "SUSPENDING", "SUSPENDING"
+    SUSPENDED = "SUSPENDED", "SUSPENDED"
+
+
+class NotebookAction(models.TextChoices):
+    """Long-running operations tracked by the track_operation task."""
+
+    CREATE = "create", "create"
+    START = "start", "start"
+    STOP = "stop", "stop"
+    DESTROY = "destroy", "destroy"
+    # warm pool: create then stop, reassign then start
+    POOL = "pool", "pool"
+    CLAIM = "claim", "claim"
@@ -48,3 +48,9 @@ class NotebookDestroyFailedException(NotebookOperationException):
 class NotebookInvalidState(NotebookOperationException):
     default_detail = _("Notebook in invalid state.")
     default_code = "notebook_invalid_state"
+
+
+class NotebookOperationInProgressException(GenericAPIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("Another operation is in progress on this notebook.")
+    default_code = "notebook_operation_in_progress"
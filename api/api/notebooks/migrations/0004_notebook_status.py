@@ -0,0 +1,39 @@
+# Generated by Django 5.2.16 on 2026-10-19 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notebooks", "0003_auto_20241114_2324"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notebook",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("STATE_UNSPECIFIED", "STATE_UNSPECIFIED"),
+                    ("STARTING", "STARTING"),
+                    ("PROVISIONING", "PROVISIONING"),
+                    ("ACTIVE", "ACTIVE"),
+                    ("STOPPING", "STOPPING"),
+                    ("STOPPED", "STOPPED"),
+                    ("DELETED", "DELETED"),
+                    ("UPGRADING", "UPGRADING"),
+                    ("INITIALIZING", "INITIALIZING"),
+                    ("SUSPENDING", "SUSPENDING"),
+                    ("SUSPENDED", "SUSPENDED"),
+                ],
+                default="STATE_UNSPECIFIED",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="notebook",
+            name="status_updated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-19 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notebooks", "0004_notebook_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notebook",
+            name="operation",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
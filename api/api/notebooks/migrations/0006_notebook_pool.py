@@ -0,0 +1,23 @@
+# Generated by Django 5.2.16 on 2026-10-19 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notebooks", "0005_notebook_operation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notebook",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="notebook",
+            name="pooled",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notebooks", "0006_notebook_pool"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notebook",
+            name="operation_started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 
+from api.notebooks.enums import NotebookStatus
 from api.users.models import User
 from api.utils.models import BaseModel
 
@@ -10,6 +11,20 @@ class Notebook(BaseModel):
     owner = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="notebooks", null=True
     )
+    # last known instance state, kept up to date by the refresh_statuses task
+    status = models.CharField(
+        max_length=20,
+        choices=NotebookStatus.choices,
+        default=NotebookStatus.STATE_UNSPECIFIED,
+    )
+    status_updated_at = models.DateTimeField(null=True, blank=True)
+    # long-running Vertex operation in progress, cleared by track_operation
+    # or, when that task is lost, by refresh_statuses
+    operation = models.CharField(max_length=255, null=True, blank=True)
+    operation_started_at = models.DateTimeField(null=True, blank=True)
+    # stopped warm pool instance without owner, until a user claims it
+    pooled = models.BooleanField(default=False)
+    claimed_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.name}"
@@ -10,6 +10,14 @@ class NotebookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notebook
         fields = "__all__"
+        read_only_fields = [
+            "status",
+            "status_updated_at",
+            "operation",
+            "operation_started_at",
+            "pooled",
+            "claimed_at",
+        ]
 
     def validate_name(self, value):
         """
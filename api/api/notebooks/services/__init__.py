@@ -1 +1,5 @@
 from .notebook_service import VertexInstanceService
+from .notebook_status_service import NotebookStatusService
+from .notebook_operation_service import NotebookOperationService
+from .notebook_pool_service import NotebookPoolService
+from .notebook_reaper_service import NotebookReaperService
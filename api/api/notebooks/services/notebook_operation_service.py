@@ -0,0 +1,178 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.notebooks.enums import NotebookAction, NotebookStatus
+from api.notebooks.exceptions import NotebookOperationInProgressException
+from api.notebooks.models import Notebook
+from api.notebooks.services.notebook_service import VertexInstanceService
+from api.notebooks.services.notebook_status_service import NotebookStatusService
+from api.notebooks.tasks import track_operation
+from api.users.models import User
+
+
+class NotebookOperationService:
+    """
+    Create, start, stop and destroy without holding the request: the Vertex
+    operation is only sent, its name is kept on the notebook and the
+    track_operation task polls it until it's done, then updates the row and
+    notifies the owner (with the proxy url once the instance serves it).
+    """
+
+    PENDING_STATUS = {
+        NotebookAction.CREATE: NotebookStatus.PROVISIONING,
+        NotebookAction.START: NotebookStatus.STARTING,
+        NotebookAction.STOP: NotebookStatus.STOPPING,
+    }
+
+    @classmethod
+    def create(cls, serializer, user: User) -> Notebook:
+        name = serializer.validated_data["name"]
+        operation = VertexInstanceService.begin_create(instance_id=name, user=user)
+        notebook = serializer.save(
+            name=name,
+            owner=user,
+            operation=operation,
+            operation_started_at=timezone.now(),
+        )
+        NotebookStatusService.set_status(
+            notebook, cls.PENDING_STATUS[NotebookAction.CREATE]
+        )
+        cls.track(notebook, operation, NotebookAction.CREATE)
+        return notebook
+
+    @classmethod
+    def begin(cls, notebook: Notebook, action: str, previous: str = None) -> str | None:
+        """
+        Starts a start, stop or destroy operation on the notebook.
+
+        Args:
+            notebook (Notebook): Notebook of the instance.
+            action (str): NotebookAction.
+            previous (str): Operation this one follows, which may still be
+                set on the notebook.
+
+        Returns:
+            str | None: Name of the operation, None when the instance is
+                already in the requested state.
+
+        Raises:
+            NotebookOperationInProgressException: The previous operation on
+                the notebook didn't finish yet.
+        """
+        begin = {
+            NotebookAction.START: VertexInstanceService.begin_start,
+            NotebookAction.STOP: VertexInstanceService.begin_stop,
+            NotebookAction.DESTROY: VertexInstanceService.begin_destroy,
+        }[action]
+
+        with transaction.atomic():
+            # concurrent requests wait for the lock and then see the operation
+            locked = Notebook.objects.select_for_update().get(pk=notebook.pk)
+            if locked.operation and locked.operation != previous:
+                raise NotebookOperationInProgressException()
+
+            operation = begin(instance_id=notebook.name)
+            if operation is None:
+                return None
+
+            notebook.operation = operation
+            notebook.operation_started_at = timezone.now()
+            NotebookStatusService.set_status(
+                notebook, cls.PENDING_STATUS.get(action, notebook.status)
+            )
+            cls.track(notebook, operation, action)
+        return operation
+
+    @staticmethod
+    def track(notebook: Notebook, operation: str, action: str) -> None:
+        # the task must see the committed row
+        transaction.on_commit(
+            lambda: track_operation.delay(notebook.id, operation, action, time.time())
+        )
+
+    @classmethod
+    def poll(
+        cls, notebook_id: int, operation: str, action: str, started_at: float
+    ) -> bool:
+        """
+        Checks the operation once.
+
+        Returns:
+            bool: Whether tracking is over, False means poll again later.
+        """
+        notebook = Notebook.objects.filter(pk=notebook_id).first()
+        if notebook is None:
+            return True
+
+        timed_out = time.time() - started_at > settings.NOTEBOOK_OPERATION_TIMEOUT
+        result = VertexInstanceService.get_operation(operation)
+        if not result.done:
+            if timed_out:
+                cls.fail(notebook, action, "Operation timed out")
+                return True
+            return False
+
+        if result.HasField("error"):
+            cls.fail(notebook, action, result.error.message)
+            return True
+
+        if action == NotebookAction.DESTROY:
+            notebook.status = NotebookStatus.DELETED
+            NotebookStatusService.notify(notebook)
+            notebook.delete()
+            return True
+
+        if action in [NotebookAction.POOL, NotebookAction.CLAIM]:
+            # second step: stop the new pool instance, start the claimed one
+            action = (
+                NotebookAction.STOP
+                if action == NotebookAction.POOL
+                else NotebookAction.START
+            )
+            if cls.begin(notebook, action, previous=operation) is not None:
+                return True
+            notebook.operation = None
+
+        if action == NotebookAction.STOP:
+            notebook.operation = None
+            NotebookStatusService.set_status(notebook, NotebookStatus.STOPPED)
+            return True
+
+        # created or started, the proxy url shows up a little later
+        url = VertexInstanceService.get_instance(notebook.name).proxy_uri
+        if not url:
+            if timed_out:
+                cls.fail(notebook, action, "proxy_uri not available")
+                return True
+            return False
+
+        notebook.operation = None
+        NotebookStatusService.set_status(notebook, NotebookStatus.ACTIVE, url)
+        return True
+
+    @classmethod
+    def fail(cls, notebook: Notebook, action: str, error: str) -> None:
+        """
+        Notifies the owner with the error. A notebook that failed to be
+        created is removed, so the user can create another one.
+        """
+        if action in [NotebookAction.CREATE, NotebookAction.POOL]:
+            notebook.status = NotebookStatus.DELETED
+            NotebookStatusService.notify(notebook, error=error)
+            notebook.delete()
+            return
+
+        try:
+            status = VertexInstanceService.get_status(notebook.name)
+        except Exception:
+            status = NotebookStatus.STATE_UNSPECIFIED
+        notebook.operation = None
+        notebook.status = status
+        notebook.status_updated_at = timezone.now()
+        notebook.save(
+            update_fields=["status", "status_updated_at", "operation", "modified"]
+        )
+        NotebookStatusService.notify(notebook, error=error)
@@ -0,0 +1,163 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.notebooks.enums import NotebookAction, NotebookStatus
+from api.notebooks.exceptions import (
+    InvalidGoogleAccountException,
+    NotebookNotFoundException,
+    NotebookOperationException,
+)
+from api.notebooks.models import Notebook
+from api.notebooks.services.notebook_operation_service import (
+    NotebookOperationService,
+)
+from api.notebooks.services.notebook_service import VertexInstanceService
+from api.notebooks.services.notebook_status_service import NotebookStatusService
+from api.users.models import User
+from api.utils.basics import generate_random_string
+
+logger = logging.getLogger(__name__)
+
+
+class NotebookPoolService:
+    """
+    Warm pool of stopped instances created ahead of time, so a new notebook
+    only waits for the instance to start instead of being provisioned.
+
+    Pool instances are Notebook rows without owner. The maintain_pool task
+    sizes the pool on the notebooks requested during the last
+    NOTEBOOK_POOL_DEMAND_WINDOW, between NOTEBOOK_POOL_MIN_SIZE and
+    NOTEBOOK_POOL_MAX_SIZE, and destroys instances left unclaimed for
+    NOTEBOOK_POOL_MAX_IDLE. A max size of 0 disables the pool.
+    """
+
+    NAME_PREFIX = "pool"
+
+    @staticmethod
+    def available():
+        return Notebook.objects.filter(
+            pooled=True,
+            owner__isnull=True,
+            status=NotebookStatus.STOPPED,
+            operation__isnull=True,
+        )
+
+    @classmethod
+    def claim(cls, user: User) -> Notebook | None:
+        """
+        Assigns a stopped pool instance to the user and starts it.
+
+        Returns:
+            Notebook | None: Claimed notebook, None when the pool is empty.
+        """
+        if not settings.NOTEBOOK_POOL_MAX_SIZE:
+            return None
+        if not user.gmail:
+            raise InvalidGoogleAccountException()
+
+        with transaction.atomic():
+            notebook = (
+                cls.available()
+                .select_for_update(skip_locked=True)
+                .order_by("created")
+                .first()
+            )
+            if notebook is None:
+                return None
+            try:
+                operation = VertexInstanceService.begin_assign(notebook.name, user)
+            except NotebookOperationException as exp:
+                logger.warning("Pool instance %s not claimed: %s", notebook, exp)
+                return None
+
+            notebook.owner = user
+            notebook.pooled = False
+            notebook.claimed_at = timezone.now()
+            notebook.operation = operation
+            notebook.operation_started_at = notebook.claimed_at
+            notebook.save(
+                update_fields=[
+                    "owner",
+                    "pooled",
+                    "claimed_at",
+                    "operation",
+                    "operation_started_at",
+                    "modified",
+                ]
+            )
+            NotebookStatusService.set_status(notebook, NotebookStatus.STARTING)
+            NotebookOperationService.track(notebook, operation, NotebookAction.CLAIM)
+        return notebook
+
+    @staticmethod
+    def target_size() -> int:
+        """Notebooks requested during the last demand window, within bounds."""
+        since = timezone.now() - timedelta(seconds=settings.NOTEBOOK_POOL_DEMAND_WINDOW)
+        demand = Notebook.objects.filter(
+            Q(claimed_at__gte=since)
+            | Q(pooled=False, claimed_at__isnull=True, created__gte=since)
+        ).count()
+        return max(
+            settings.NOTEBOOK_POOL_MIN_SIZE,
+            min(settings.NOTEBOOK_POOL_MAX_SIZE, demand),
+        )
+
+    @classmethod
+    def provision(cls) -> Notebook:
+        name = f"{cls.NAME_PREFIX}-{generate_random_string(8).lower()}"
+        operation = VertexInstanceService.begin_create(instance_id=name, user=None)
+        notebook = Notebook.objects.create(
+            name=name,
+            pooled=True,
+            operation=operation,
+            operation_started_at=timezone.now(),
+            status=NotebookStatus.PROVISIONING,
+            status_updated_at=timezone.now(),
+        )
+        NotebookOperationService.track(notebook, operation, NotebookAction.POOL)
+        return notebook
+
+    @classmethod
+    def maintain(cls) -> dict:
+        """
+        Reaps idle and surplus pool instances, oldest first, and provisions
+        the missing ones.
+
+        Returns:
+            dict: Target size, instances provisioned and reaped.
+        """
+        if not settings.NOTEBOOK_POOL_MAX_SIZE:
+            return dict(target=0, provisioned=0, reaped=0)
+
+        target = cls.target_size()
+        size = Notebook.objects.filter(pooled=True, owner__isnull=True).count()
+        idle_since = timezone.now() - timedelta(seconds=settings.NOTEBOOK_POOL_MAX_IDLE)
+
+        reaped = 0
+        for notebook in cls.available().order_by("created"):
+            if notebook.created >= idle_since and size - reaped <= target:
+                continue
+            try:
+                NotebookOperationService.begin(notebook, NotebookAction.DESTROY)
+            except NotebookNotFoundException:
+                notebook.delete()
+            except Exception:
+                logger.exception("Pool instance %s couldn't be reaped", notebook)
+                continue
+            reaped += 1
+
+        provisioned = 0
+        for _ in range(target - (size - reaped)):
+            try:
+                cls.provision()
+            except Exception:
+                logger.exception("Pool instance couldn't be provisioned")
+                break
+            provisioned += 1
+
+        return dict(target=target, provisioned=provisioned, reaped=reaped)
@@ -0,0 +1,100 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.notebooks.enums import NotebookStatus
+from api.notebooks.models import Notebook
+from api.notebooks.services.notebook_service import VertexInstanceService
+from api.notebooks.services.notebook_status_service import NotebookStatusService
+
+logger = logging.getLogger(__name__)
+
+
+class NotebookReaperService:
+    """
+    Deletes the instances of notebooks stopped for at least
+    NOTEBOOK_REAPER_MIN_STOPPED seconds, judged by their updateTime in a
+    single list_instances call. Deletions run concurrently, up to
+    NOTEBOOK_REAPER_WORKERS at a time, and a failing instance doesn't stop
+    the others. Warm pool instances are left to NotebookPoolService.
+    """
+
+    @staticmethod
+    def candidates(instances: dict) -> list[Notebook]:
+        stopped_before = timezone.now() - timedelta(
+            seconds=settings.NOTEBOOK_REAPER_MIN_STOPPED
+        )
+        candidates = []
+        for notebook in Notebook.objects.filter(pooled=False, operation__isnull=True):
+            instance = instances.get(notebook.name)
+            if (
+                instance is not None
+                and VertexInstanceService.state_name(instance) == NotebookStatus.STOPPED
+                and instance.update_time <= stopped_before
+            ):
+                candidates.append(notebook)
+        return candidates
+
+    @staticmethod
+    def delete(instance_id: str) -> str | None:
+        """Deletes one instance, returns the error instead of raising it."""
+        try:
+            VertexInstanceService.delete_instance(instance_id)
+        except Exception as exp:
+            return str(exp)
+        return None
+
+    @classmethod
+    def reap(cls, dry_run: bool = None) -> dict:
+        """
+        Args:
+            dry_run (bool): Only select the candidates, defaults to
+                NOTEBOOK_REAPER_DRY_RUN.
+
+        Returns:
+            dict: Metrics of the run: instances listed, candidates, deleted
+                and failed instances and duration.
+        """
+        if dry_run is None:
+            dry_run = settings.NOTEBOOK_REAPER_DRY_RUN
+        start = time.monotonic()
+
+        instances = VertexInstanceService.list_instances()
+        candidates = cls.candidates(instances)
+        metrics = dict(
+            listed=len(instances),
+            candidates=len(candidates),
+            deleted=0,
+            failed=0,
+            dry_run=dry_run,
+        )
+
+        if dry_run:
+            logger.info(
+                "Notebook reaper dry run, would delete: %s",
+                ", ".join(notebook.name for notebook in candidates),
+            )
+        elif candidates:
+            workers = min(settings.NOTEBOOK_REAPER_WORKERS, len(candidates))
+            with ThreadPoolExecutor(workers) as executor:
+                errors = list(
+                    executor.map(cls.delete, [notebook.name for notebook in candidates])
+                )
+
+            for notebook, error in zip(candidates, errors):
+                if error:
+                    metrics["failed"] += 1
+                    logger.warning("Notebook %s not deleted: %s", notebook, error)
+                    continue
+                notebook.status = NotebookStatus.DELETED
+                NotebookStatusService.notify(notebook)
+                notebook.delete()
+                metrics["deleted"] += 1
+
+        metrics["duration_ms"] = round((time.monotonic() - start) * 1000, 2)
+        logger.info("Notebook reaper run: %s", metrics)
+        return metrics
@@ -1,8 +1,9 @@
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from google.api_core.retry import Retry
 from google.api_core.exceptions import NotFound
 from google.cloud import notebooks_v2
+from google.longrunning import operations_pb2
+from google.protobuf import field_mask_pb2
 from google.cloud.notebooks_v2 import (
     Instance,
     GceSetup,
@@ -13,6 +14,7 @@ from google.cloud.notebooks_v2 import (
     CreateInstanceRequest,
     StartInstanceRequest,
     StopInstanceRequest,
+    UpdateInstanceRequest,
 )
 
 from api.users.models import User
@@ -33,19 +35,76 @@ class VertexInstanceService:
     IDLE_SHUTDOWN_TIMEOUT = "600"
     OPERATION_DEADLINE_IN_SECONDS = 300
     instances_base_path = f"projects/{PROJECT_ID}/locations/{LOCATION}/instances/"
+    _client = None
+
+    @classmethod
+    def get_client(cls) -> notebooks_v2.NotebookServiceClient:
+        """
+        Notebooks API client, created once per process: building it loads
+        credentials and opens a gRPC channel, both safe to share.
+        """
+        if cls._client is None:
+            cls._client = notebooks_v2.NotebookServiceClient()
+        return cls._client
+
+    @staticmethod
+    def state_name(instance: Instance) -> str:
+        return notebooks_v2.State(instance.state).name
+
+    @classmethod
+    def list_instances(cls) -> dict[str, Instance]:
+        """
+        Every instance of the project location, through a single paged
+        list_instances call.
+
+        Returns:
+            dict: Instances by instance id.
+        """
+        parent = f"projects/{cls.PROJECT_ID}/locations/{cls.LOCATION}"
+        instances = cls.get_client().list_instances(parent=parent)
+        return {instance.name.split("/")[-1]: instance for instance in instances}
 
     @classmethod
     def get_instance(cls, instance_id: str) -> Instance:
-        client = notebooks_v2.NotebookServiceClient()
+        client = cls.get_client()
         instance_path = f"{cls.instances_base_path}{instance_id}"
         notebook_instance = client.get_instance(name=instance_path)
         return notebook_instance
 
     @classmethod
-    def create_instance(cls, instance_id: str, user: User) -> str:
-        if not user.gmail:
+    def get_operation(cls, name: str) -> operations_pb2.Operation:
+        """Current state of a long-running operation started by begin_*."""
+        return cls.get_client().get_operation(
+            operations_pb2.GetOperationRequest(name=name)
+        )
+
+    @classmethod
+    def metadata(cls, bucket: str) -> dict:
+        return {
+            "proxy-mode": "service_account",
+            "idle-shutdown": "true",
+            "idle-shutdown-timeout": cls.IDLE_SHUTDOWN_TIMEOUT,
+            "gcs-data-bucket": bucket,
+        }
+
+    @classmethod
+    def create_request(
+        cls, instance_id: str, user: User = None
+    ) -> CreateInstanceRequest:
+        """
+        Request creating the instance of the user, or a warm pool instance
+        running as NOTEBOOK_POOL_SERVICE_ACCOUNT when user is None.
+        """
+        if user is None:
+            owners = []
+            service_account = settings.NOTEBOOK_POOL_SERVICE_ACCOUNT
+            bucket = f"{settings.GCS_NOTEBOOK_BUCKET}/pool"
+        elif not user.gmail:
             raise InvalidGoogleAccountException()
-        client = notebooks_v2.NotebookServiceClient()
+        else:
+            owners = [user.gmail]
+            service_account = user.service_account.email
+            bucket = f"{settings.GCS_NOTEBOOK_BUCKET}/{user.id}"
         parent = f"projects/{cls.PROJECT_ID}/locations/{cls.LOCATION}"
 
         gce_setup = GceSetup(
@@ -55,96 +114,91 @@ class VertexInstanceService:
             #     type = AcceleratorConfig.AcceleratorType.NVIDIA_TESLA_T4,
             #     core_count = 1
             # )],
-            service_accounts=[ServiceAccount(email=user.service_account.email)],
+            service_accounts=[ServiceAccount(email=service_account)],
             boot_disk=BootDisk(disk_size_gb=150),
             data_disks=[DataDisk(disk_size_gb=50)],
-            metadata={
-                "proxy-mode": "service_account",
-                "idle-shutdown": "true",
-                "idle-shutdown-timeout": cls.IDLE_SHUTDOWN_TIMEOUT,
-                "gcs-data-bucket": f"{settings.GCS_NOTEBOOK_BUCKET}/{user.id}",
-            },
+            metadata=cls.metadata(bucket),
         )
 
         instance = Instance(
-            name=instance_id, instance_owners=[user.gmail], gce_setup=gce_setup
+            name=instance_id, instance_owners=owners, gce_setup=gce_setup
         )
 
-        request = CreateInstanceRequest(
+        return CreateInstanceRequest(
             parent=parent,
             instance_id=instance_id,
             instance=instance,
         )
 
-        operation = client.create_instance(request=request)
-        operation.result()
-
-        retry_policy = Retry(
-            predicate=lambda e: isinstance(e, ValueError), deadline=300
-        )
-        instance_url = retry_policy(lambda: cls.check_proxy_uri(instance_id))()
-        return instance_url
-
-    @classmethod
-    def check_proxy_uri(cls, instance_id: str) -> str:
-        notebook_instance = cls.get_instance(instance_id)
-        if notebook_instance.proxy_uri:
-            return notebook_instance.proxy_uri
-        else:
-            raise ValueError("proxy_uri not available")
-
     @classmethod
     def get_status(cls, instance_id: str) -> str:
         try:
             notebook_instance = cls.get_instance(instance_id)
-            return str(notebook_instance.state).split(".")[1]
+            return cls.state_name(notebook_instance)
         except Exception as exp:
             raise NotebookInvalidState(error=str(exp))
 
     @classmethod
-    def start_instance(cls, instance_id: str) -> str:
+    def delete_instance(cls, instance_id: str) -> None:
+        """
+        Deletes the instance and waits for it, an instance that doesn't
+        exist anymore counts as deleted.
+        """
         try:
-            notebook_instance = cls.get_instance(instance_id)
-            if notebook_instance.state == notebooks_v2.State.STOPPED:
-                request = StartInstanceRequest(name=notebook_instance.name)
-                client = notebooks_v2.NotebookServiceClient()
-                operation = client.start_instance(request=request)
-                operation.result()
-
-            retry_policy = Retry(
-                predicate=lambda e: isinstance(e, ValueError), deadline=300
+            operation = cls.get_client().delete_instance(
+                name=f"{cls.instances_base_path}{instance_id}"
             )
-            instance_url = retry_policy(lambda: cls.check_proxy_uri(instance_id))()
-            return instance_url
+            operation.result(timeout=cls.OPERATION_DEADLINE_IN_SECONDS)
+        except NotFound:
+            return
+        except Exception as exp:
+            raise NotebookDestroyFailedException(error=str(exp))
+
+    # The following only send the request and return the name of its
+    # long-running operation, tracked by the track_operation task.
+
+    @classmethod
+    def begin_create(cls, instance_id: str, user: User) -> str:
+        request = cls.create_request(instance_id, user)
+        try:
+            operation = cls.get_client().create_instance(request=request)
+            return operation.operation.name
         except Exception as exp:
             raise NotebookStartFailedException(error=str(exp))
 
     @classmethod
-    def stop_instance(cls, instance_id: str) -> None:
+    def begin_start(cls, instance_id: str) -> str | None:
+        """Returns None when the instance isn't stopped, nothing to start."""
         try:
             notebook_instance = cls.get_instance(instance_id)
-            if notebook_instance.state == notebooks_v2.State.ACTIVE:
-                request = StopInstanceRequest(name=notebook_instance.name)
-                client = notebooks_v2.NotebookServiceClient()
-                operation = client.stop_instance(request=request)
-                operation.result()
-
+            if notebook_instance.state != notebooks_v2.State.STOPPED:
+                return None
+            request = StartInstanceRequest(name=notebook_instance.name)
+            operation = cls.get_client().start_instance(request=request)
+            return operation.operation.name
         except Exception as exp:
-            raise NotebookStopFailedException(error=str(exp))
+            raise NotebookStartFailedException(error=str(exp))
 
     @classmethod
-    def destroy_instance(cls, instance_id: str) -> bool:
+    def begin_stop(cls, instance_id: str) -> str | None:
+        """Returns None when the instance isn't active, nothing to stop."""
         try:
-            client = notebooks_v2.NotebookServiceClient()
             notebook_instance = cls.get_instance(instance_id)
+            if notebook_instance.state != notebooks_v2.State.ACTIVE:
+                return None
+            request = StopInstanceRequest(name=notebook_instance.name)
+            operation = cls.get_client().stop_instance(request=request)
+            return operation.operation.name
+        except Exception as exp:
+            raise NotebookStopFailedException(error=str(exp))
 
-            if notebook_instance.state == notebooks_v2.State.ACTIVE:
-                cls.stop_instance(instance_id)
-
-            operation = client.delete_instance(name=notebook_instance.name)
-            operation.result()
-            return True
-
+    @classmethod
+    def begin_destroy(cls, instance_id: str) -> str:
+        try:
+            operation = cls.get_client().delete_instance(
+                name=f"{cls.instances_base_path}{instance_id}"
+            )
+            return operation.operation.name
         except NotFound:
             raise NotebookNotFoundException(
                 detail=_("Instance {instance_id} not found").format(
@@ -153,3 +207,31 @@ class VertexInstanceService:
             )
         except Exception as exp:
             raise NotebookDestroyFailedException(error=str(exp))
+
+    @classmethod
+    def begin_assign(cls, instance_id: str, user: User) -> str:
+        """
+        Moves a stopped warm pool instance to the user: it runs as the
+        user's service account and syncs the user's bucket folder.
+        """
+        if not user.gmail:
+            raise InvalidGoogleAccountException()
+        instance = Instance(
+            name=f"{cls.instances_base_path}{instance_id}",
+            gce_setup=GceSetup(
+                service_accounts=[ServiceAccount(email=user.service_account.email)],
+                metadata=cls.metadata(f"{settings.GCS_NOTEBOOK_BUCKET}/{user.id}"),
+            ),
+        )
+        try:
+            operation = cls.get_client().update_instance(
+                request=UpdateInstanceRequest(
+                    instance=instance,
+                    update_mask=field_mask_pb2.FieldMask(
+                        paths=["gce_setup.service_accounts", "gce_setup.metadata"]
+                    ),
+                )
+            )
+            return operation.operation.name
+        except Exception as exp:
+            raise NotebookStartFailedException(error=str(exp))
@@ -0,0 +1,142 @@
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils import timezone
+
+from api.notebooks.enums import NotebookStatus
+from api.notebooks.models import Notebook
+from api.notebooks.services.notebook_service import VertexInstanceService
+from api.utils.web_socket import send_message
+
+logger = logging.getLogger(__name__)
+
+
+class NotebookStatusService:
+    """
+    Instance states cached on the Notebook rows. The refresh_statuses task
+    updates every notebook from a single list_instances call and pushes the
+    changes to their owners, requests read the cached state and only ask
+    Vertex directly when it's older than NOTEBOOK_STATUS_MAX_AGE.
+
+    The refresh also clears operations whose track_operation task was lost
+    (worker restart, broker loss), so the notebook doesn't stay locked.
+    """
+
+    MESSAGE_TYPE = "notebook_status"
+
+    @classmethod
+    def refresh(cls) -> int:
+        """
+        Updates the state and url of every notebook.
+
+        Returns:
+            int: Amount of notebooks whose state or url changed.
+        """
+        instances = VertexInstanceService.list_instances()
+        now = timezone.now()
+
+        changed = []
+        notebooks = list(Notebook.objects.all())
+        for notebook in notebooks:
+            if notebook.operation and cls.operation_lost(notebook, now):
+                cls.clear_operation(notebook)
+            instance = instances.get(notebook.name)
+            if instance is None and notebook.operation:
+                # still being created, the instance isn't listed yet
+                continue
+            if instance is None:
+                status, url = NotebookStatus.DELETED, notebook.url
+            else:
+                status = VertexInstanceService.state_name(instance)
+                url = instance.proxy_uri or notebook.url
+
+            if (status, url) != (notebook.status, notebook.url):
+                changed.append(notebook)
+            notebook.status, notebook.url = status, url
+            notebook.status_updated_at = now
+
+        Notebook.objects.bulk_update(notebooks, ["status", "url", "status_updated_at"])
+        for notebook in changed:
+            cls.notify(notebook)
+        return len(changed)
+
+    @staticmethod
+    def operation_lost(notebook: Notebook, now) -> bool:
+        """
+        Whether nothing tracks the notebook's operation anymore: it started
+        longer than NOTEBOOK_OPERATION_TIMEOUT ago (its task would have
+        given up by now), or it's done on Vertex and a couple of polls
+        went by without the task clearing it.
+        """
+        interval = settings.NOTEBOOK_OPERATION_POLL_INTERVAL
+        if notebook.operation_started_at is None:
+            return True
+        age = (now - notebook.operation_started_at).total_seconds()
+        if age > settings.NOTEBOOK_OPERATION_TIMEOUT + 2 * interval:
+            return True
+        if age < 2 * interval:
+            return False
+        try:
+            return VertexInstanceService.get_operation(notebook.operation).done
+        except Exception:
+            return False
+
+    @staticmethod
+    def clear_operation(notebook: Notebook) -> None:
+        logger.warning(
+            "Clearing lost operation %s of notebook %s", notebook.operation, notebook
+        )
+        # unless a new operation was set meanwhile
+        Notebook.objects.filter(pk=notebook.pk, operation=notebook.operation).update(
+            operation=None
+        )
+        notebook.operation = None
+
+    @classmethod
+    def set_status(cls, notebook: Notebook, status: str, url: str = None) -> None:
+        changed = status != notebook.status or (url and url != notebook.url)
+        notebook.status = status
+        notebook.url = url or notebook.url
+        notebook.status_updated_at = timezone.now()
+        notebook.save(
+            update_fields=[
+                "status",
+                "url",
+                "status_updated_at",
+                "operation",
+                "operation_started_at",
+                "modified",
+            ]
+        )
+        if changed:
+            cls.notify(notebook)
+
+    @classmethod
+    def get_status(cls, notebook: Notebook) -> str:
+        """Cached state of the notebook, read again from Vertex when stale."""
+        max_age = timedelta(seconds=settings.NOTEBOOK_STATUS_MAX_AGE)
+        if (
+            notebook.status_updated_at is None
+            or timezone.now() - notebook.status_updated_at > max_age
+        ):
+            status = VertexInstanceService.get_status(instance_id=notebook.name)
+            cls.set_status(notebook, status)
+        return notebook.status
+
+    @classmethod
+    def notify(cls, notebook: Notebook, error: str = None) -> None:
+        if not notebook.owner_id:
+            return
+        message = dict(
+            id=notebook.id,
+            name=notebook.name,
+            status=notebook.status,
+            url=notebook.url,
+        )
+        if error:
+            message["error"] = error
+        async_to_sync(send_message)(
+            f"event-{notebook.owner_id}", message, cls.MESSAGE_TYPE
+        )
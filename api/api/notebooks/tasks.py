@@ -0,0 +1,68 @@
+"""
+Celery tasks for notebook instances.
+api/api/notebooks/tasks.py
+"""
+
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="notebooks.refresh_statuses", ignore_result=True)
+def refresh_statuses() -> int:
+    """
+    Refreshes the cached state of every notebook, scheduled by celery beat
+    every NOTEBOOK_STATUS_POLL_INTERVAL seconds.
+    """
+    from api.notebooks.services import NotebookStatusService
+
+    changed = NotebookStatusService.refresh()
+    logger.info("Notebook statuses refreshed, %d changed", changed)
+    return changed
+
+
+@shared_task(
+    bind=True, name="notebooks.track_operation", max_retries=None, ignore_result=True
+)
+def track_operation(
+    self, notebook_id: int, operation: str, action: str, started_at: float
+) -> None:
+    """
+    Polls a Vertex operation every NOTEBOOK_OPERATION_POLL_INTERVAL seconds
+    until it's done or NOTEBOOK_OPERATION_TIMEOUT passes, then updates the
+    notebook and notifies its owner.
+    """
+    from api.notebooks.services import NotebookOperationService
+
+    if not NotebookOperationService.poll(notebook_id, operation, action, started_at):
+        raise self.retry(countdown=settings.NOTEBOOK_OPERATION_POLL_INTERVAL)
+    logger.info("Notebook %s %s finished (%s)", notebook_id, action, operation)
+
+
+@shared_task(name="notebooks.maintain_pool", ignore_result=True)
+def maintain_pool() -> dict:
+    """
+    Resizes the warm pool of notebook instances, scheduled by celery beat
+    every NOTEBOOK_POOL_INTERVAL seconds.
+    """
+    from api.notebooks.services import NotebookPoolService
+
+    result = NotebookPoolService.maintain()
+    logger.info("Notebook pool maintained: %s", result)
+    return result
+
+
+@shared_task(name="notebooks.reap_inactive", ignore_result=True)
+def reap_inactive(dry_run: bool = None) -> dict:
+    """
+    Deletes the instances stopped for a while, scheduled by celery beat
+    every NOTEBOOK_REAPER_INTERVAL seconds.
+    """
+    from api.notebooks.services import NotebookReaperService
+
+    return NotebookReaperService.reap(dry_run=dry_run)
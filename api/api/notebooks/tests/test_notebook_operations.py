@@ -0,0 +1,239 @@
+"""Non-blocking notebook operation tests."""
+
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.db.models.signals import post_save
+from django.utils import timezone
+from factory.django import mute_signals
+from google.cloud import notebooks_v2
+from google.longrunning import operations_pb2
+from google.rpc import status_pb2
+
+from api.notebooks.enums import NotebookAction, NotebookStatus
+from api.notebooks.exceptions import NotebookOperationInProgressException
+from api.notebooks.models import Notebook
+from api.notebooks.serializers import NotebookSerializer
+from api.notebooks.services import (
+    NotebookOperationService,
+    NotebookStatusService,
+    VertexInstanceService,
+)
+from api.notebooks.services import notebook_operation_service
+from api.notebooks.services import notebook_status_service
+from api.users.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+OPERATION = "projects/p/locations/l/operations/op-1"
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    sent = []
+
+    async def send_message(channel_name, message, message_type):
+        sent.append(message)
+
+    monkeypatch.setattr(notebook_status_service, "send_message", send_message)
+    return sent
+
+
+@pytest.fixture
+def delayed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        notebook_operation_service.track_operation,
+        "delay",
+        lambda *args: calls.append(args),
+    )
+    return calls
+
+
+@pytest.fixture
+def notebook():
+    # skips the service account created for new users
+    with mute_signals(post_save):
+        user = UserFactory()
+    return Notebook.objects.create(name="a", owner=user, status=NotebookStatus.STOPPED)
+
+
+def _operation(monkeypatch, done, error=None):
+    operation = operations_pb2.Operation(name=OPERATION, done=done)
+    if error:
+        operation.error.CopyFrom(status_pb2.Status(code=13, message=error))
+    monkeypatch.setattr(VertexInstanceService, "get_operation", lambda name: operation)
+
+
+def _proxy_uri(monkeypatch, url):
+    monkeypatch.setattr(
+        VertexInstanceService,
+        "get_instance",
+        lambda instance_id: SimpleNamespace(proxy_uri=url),
+    )
+
+
+class TestBegin:
+    def test_returns_the_operation(
+        self,
+        monkeypatch,
+        messages,
+        delayed,
+        notebook,
+        django_capture_on_commit_callbacks,
+    ):
+        monkeypatch.setattr(
+            VertexInstanceService, "begin_start", lambda instance_id: OPERATION
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            operation = NotebookOperationService.begin(notebook, NotebookAction.START)
+
+        assert operation == OPERATION
+        notebook.refresh_from_db()
+        assert notebook.status == NotebookStatus.STARTING
+        assert notebook.operation == OPERATION
+        assert delayed[0][:3] == (notebook.id, OPERATION, NotebookAction.START)
+
+    def test_one_operation_at_a_time(self, notebook):
+        stale = Notebook.objects.get(pk=notebook.pk)
+        notebook.operation = OPERATION
+        notebook.save()
+
+        # the locked row is checked, not the instance loaded by the request
+        with pytest.raises(NotebookOperationInProgressException):
+            NotebookOperationService.begin(stale, NotebookAction.STOP)
+
+
+class TestLostOperations:
+    @pytest.fixture(autouse=True)
+    def listing(self, monkeypatch, messages, notebook):
+        monkeypatch.setattr(
+            VertexInstanceService,
+            "list_instances",
+            lambda: {
+                "a": SimpleNamespace(state=notebooks_v2.State.STOPPED, proxy_uri="")
+            },
+        )
+
+    def _started(self, notebook, seconds_ago):
+        notebook.operation = OPERATION
+        notebook.operation_started_at = timezone.now() - timedelta(seconds=seconds_ago)
+        notebook.save()
+
+    def test_running_operation_is_kept(self, monkeypatch, notebook):
+        self._started(notebook, 60)
+        _operation(monkeypatch, done=False)
+
+        NotebookStatusService.refresh()
+
+        notebook.refresh_from_db()
+        assert notebook.operation == OPERATION
+
+    def test_finished_operation_is_cleared(self, monkeypatch, notebook):
+        self._started(notebook, 60)
+        _operation(monkeypatch, done=True)
+
+        NotebookStatusService.refresh()
+
+        notebook.refresh_from_db()
+        assert notebook.operation is None
+
+    def test_timed_out_operation_is_cleared(self, monkeypatch, notebook, settings):
+        self._started(notebook, settings.NOTEBOOK_OPERATION_TIMEOUT + 60)
+
+        def get_operation(name):
+            raise AssertionError("Vertex shouldn't be called")
+
+        monkeypatch.setattr(VertexInstanceService, "get_operation", get_operation)
+
+        NotebookStatusService.refresh()
+
+        notebook.refresh_from_db()
+        assert notebook.operation is None
+
+
+class TestPoll:
+    def test_running_operation_polls_again(self, monkeypatch, notebook):
+        _operation(monkeypatch, done=False)
+
+        assert not NotebookOperationService.poll(
+            notebook.id, OPERATION, NotebookAction.START, time.time()
+        )
+
+    def test_waits_for_the_proxy_url(self, monkeypatch, messages, notebook):
+        notebook.operation = OPERATION
+        notebook.save()
+        _operation(monkeypatch, done=True)
+        _proxy_uri(monkeypatch, "")
+
+        assert not NotebookOperationService.poll(
+            notebook.id, OPERATION, NotebookAction.START, time.time()
+        )
+
+        _proxy_uri(monkeypatch, "https://a.proxy")
+        assert NotebookOperationService.poll(
+            notebook.id, OPERATION, NotebookAction.START, time.time()
+        )
+
+        notebook.refresh_from_db()
+        assert notebook.status == NotebookStatus.ACTIVE
+        assert notebook.url == "https://a.proxy"
+        assert notebook.operation is None
+        assert messages == [
+            dict(id=notebook.id, name="a", status="ACTIVE", url="https://a.proxy")
+        ]
+
+    def test_failed_create_removes_the_notebook(self, monkeypatch, messages, notebook):
+        _operation(monkeypatch, done=True, error="quota exceeded")
+
+        assert NotebookOperationService.poll(
+            notebook.id, OPERATION, NotebookAction.CREATE, time.time()
+        )
+
+        assert not Notebook.objects.exists()
+        assert messages[0]["error"] == "quota exceeded"
+
+    def test_timeout(self, monkeypatch, messages, notebook, settings):
+        settings.NOTEBOOK_OPERATION_TIMEOUT = 60
+        _operation(monkeypatch, done=False)
+        monkeypatch.setattr(
+            VertexInstanceService, "get_status", lambda instance_id: "STOPPED"
+        )
+
+        assert NotebookOperationService.poll(
+            notebook.id, OPERATION, NotebookAction.START, time.time() - 120
+        )
+
+        assert messages[0]["error"] == "Operation timed out"
+        assert messages[0]["status"] == "STOPPED"
+
+    def test_destroy(self, monkeypatch, messages, notebook):
+        _operation(monkeypatch, done=True)
+
+        assert NotebookOperationService.poll(
+            notebook.id, OPERATION, NotebookAction.DESTROY, time.time()
+        )
+
+        assert not Notebook.objects.exists()
+        assert messages[0]["status"] == "DELETED"
+
+
+def test_operation_fields_are_read_only(notebook):
+    serializer = NotebookSerializer(
+        notebook,
+        data={
+            "operation": OPERATION,
+            "operation_started_at": timezone.now(),
+        },
+        partial=True,
+    )
+
+    assert serializer.is_valid(), serializer.errors
+    serializer.save()
+
+    notebook.refresh_from_db()
+    assert notebook.operation is None
+    assert notebook.operation_started_at is None
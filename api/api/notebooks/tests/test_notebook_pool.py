@@ -0,0 +1,130 @@
+"""Warm notebook pool tests."""
+
+import time
+from datetime import timedelta
+
+import pytest
+from django.db.models.signals import post_save
+from django.utils import timezone
+from factory.django import mute_signals
+from google.longrunning import operations_pb2
+
+from api.notebooks.enums import NotebookAction, NotebookStatus
+from api.notebooks.models import Notebook
+from api.notebooks.services import (
+    NotebookOperationService,
+    NotebookPoolService,
+    VertexInstanceService,
+)
+from api.notebooks.services import notebook_operation_service
+from api.users.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def pool(settings, monkeypatch):
+    settings.NOTEBOOK_POOL_MIN_SIZE = 1
+    settings.NOTEBOOK_POOL_MAX_SIZE = 3
+    monkeypatch.setattr(
+        notebook_operation_service.track_operation, "delay", lambda *args: None
+    )
+
+
+@pytest.fixture
+def user():
+    # skips the service account created for new users
+    with mute_signals(post_save):
+        return UserFactory(gmail="user@gmail.com")
+
+
+def _pooled(name, **kwargs):
+    return Notebook.objects.create(
+        name=name, pooled=True, status=NotebookStatus.STOPPED, **kwargs
+    )
+
+
+class TestClaim:
+    def test_claims_the_oldest(self, monkeypatch, user):
+        _pooled("pool-a")
+        _pooled("pool-b")
+        assigned = []
+        monkeypatch.setattr(
+            VertexInstanceService,
+            "begin_assign",
+            lambda name, owner: assigned.append((name, owner)) or "op-1",
+        )
+
+        notebook = NotebookPoolService.claim(user)
+
+        assert notebook.name == "pool-a"
+        assert assigned == [("pool-a", user)]
+        notebook.refresh_from_db()
+        assert notebook.owner == user
+        assert not notebook.pooled
+        assert notebook.status == NotebookStatus.STARTING
+        assert notebook.operation == "op-1"
+        assert list(NotebookPoolService.available().values_list("name", flat=True)) == [
+            "pool-b"
+        ]
+
+    def test_empty_pool(self, user):
+        assert NotebookPoolService.claim(user) is None
+
+    def test_claimed_instance_is_started(self, monkeypatch, user):
+        notebook = _pooled("pool-a", owner=user, operation="op-1")
+        monkeypatch.setattr(
+            VertexInstanceService,
+            "get_operation",
+            lambda name: operations_pb2.Operation(name=name, done=True),
+        )
+        monkeypatch.setattr(
+            VertexInstanceService, "begin_start", lambda instance_id: "op-2"
+        )
+
+        assert NotebookOperationService.poll(
+            notebook.id, "op-1", NotebookAction.CLAIM, time.time()
+        )
+
+        notebook.refresh_from_db()
+        assert notebook.operation == "op-2"
+        assert notebook.status == NotebookStatus.STARTING
+
+
+class TestMaintain:
+    def test_follows_demand(self, monkeypatch, user):
+        for name in ["a", "b"]:
+            Notebook.objects.create(name=name, owner=user)
+        monkeypatch.setattr(
+            VertexInstanceService,
+            "begin_create",
+            lambda instance_id, user: f"op-{instance_id}",
+        )
+
+        result = NotebookPoolService.maintain()
+
+        assert result == dict(target=2, provisioned=2, reaped=0)
+        pool = Notebook.objects.filter(pooled=True)
+        assert pool.count() == 2
+        assert all(n.name.startswith("pool-") and n.operation for n in pool)
+
+    def test_reaps_idle_and_surplus(self, monkeypatch, settings):
+        settings.NOTEBOOK_POOL_MAX_IDLE = 3600
+        old = _pooled("pool-old")
+        Notebook.objects.filter(pk=old.pk).update(
+            created=timezone.now() - timedelta(hours=2)
+        )
+        for name in ["pool-a", "pool-b"]:
+            _pooled(name)
+        destroyed = []
+        monkeypatch.setattr(
+            VertexInstanceService,
+            "begin_destroy",
+            lambda instance_id: destroyed.append(instance_id) or "op",
+        )
+
+        result = NotebookPoolService.maintain()
+
+        # no demand, only the minimum is kept
+        assert result == dict(target=1, provisioned=0, reaped=2)
+        assert destroyed == ["pool-old", "pool-a"]
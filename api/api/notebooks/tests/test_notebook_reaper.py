@@ -0,0 +1,106 @@
+"""Inactive notebook reaper tests."""
+
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.db.models.signals import post_save
+from django.utils import timezone
+from factory.django import mute_signals
+from google.cloud import notebooks_v2
+
+from api.notebooks.exceptions import NotebookDestroyFailedException
+from api.notebooks.models import Notebook
+from api.notebooks.services import NotebookReaperService, VertexInstanceService
+from api.notebooks.services import notebook_status_service
+from api.users.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _instance(name, state, minutes_ago):
+    return SimpleNamespace(
+        name=f"{VertexInstanceService.instances_base_path}{name}",
+        state=state,
+        update_time=timezone.now() - timedelta(minutes=minutes_ago),
+    )
+
+
+@pytest.fixture
+def fleet(monkeypatch, settings):
+    settings.NOTEBOOK_REAPER_MIN_STOPPED = 1800
+    settings.NOTEBOOK_REAPER_WORKERS = 4
+
+    async def send_message(channel_name, message, message_type):
+        pass
+
+    monkeypatch.setattr(notebook_status_service, "send_message", send_message)
+    # skips the service account created for new users
+    with mute_signals(post_save):
+        user = UserFactory()
+    instances = {}
+    for name, state, minutes_ago in [
+        ("old-1", notebooks_v2.State.STOPPED, 60),
+        ("old-2", notebooks_v2.State.STOPPED, 90),
+        ("old-3", notebooks_v2.State.STOPPED, 120),
+        ("recent", notebooks_v2.State.STOPPED, 5),
+        ("active", notebooks_v2.State.ACTIVE, 600),
+    ]:
+        Notebook.objects.create(name=name, owner=user)
+        instances[name] = _instance(name, state, minutes_ago)
+    Notebook.objects.create(name="pool-a", pooled=True)
+    instances["pool-a"] = _instance("pool-a", notebooks_v2.State.STOPPED, 600)
+
+    listed = []
+    monkeypatch.setattr(
+        VertexInstanceService,
+        "list_instances",
+        lambda: listed.append(1) or instances,
+    )
+    return listed
+
+
+class TestReap:
+    def test_deletes_concurrently(self, monkeypatch, fleet):
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def delete_instance(instance_id):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.1)
+            with lock:
+                running[0] -= 1
+            if instance_id == "old-2":
+                raise NotebookDestroyFailedException(error="boom")
+
+        monkeypatch.setattr(VertexInstanceService, "delete_instance", delete_instance)
+
+        metrics = NotebookReaperService.reap()
+
+        assert fleet == [1]
+        assert peak[0] == 3
+        assert metrics["listed"] == 6
+        assert metrics["candidates"] == 3
+        assert metrics["deleted"] == 2
+        assert metrics["failed"] == 1
+        assert sorted(Notebook.objects.values_list("name", flat=True)) == [
+            "active",
+            "old-2",
+            "pool-a",
+            "recent",
+        ]
+
+    def test_dry_run(self, monkeypatch, fleet):
+        def delete_instance(instance_id):
+            raise AssertionError("Nothing should be deleted")
+
+        monkeypatch.setattr(VertexInstanceService, "delete_instance", delete_instance)
+
+        metrics = NotebookReaperService.reap(dry_run=True)
+
+        assert metrics["candidates"] == 3
+        assert metrics["deleted"] == 0
+        assert Notebook.objects.count() == 6
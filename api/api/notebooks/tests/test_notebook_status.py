@@ -0,0 +1,97 @@
+"""Notebook status cache tests."""
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.db.models.signals import post_save
+from django.utils import timezone
+from factory.django import mute_signals
+from google.cloud import notebooks_v2
+
+from api.notebooks.enums import NotebookStatus
+from api.notebooks.models import Notebook
+from api.notebooks.services import NotebookStatusService, VertexInstanceService
+from api.notebooks.services import notebook_status_service
+from api.users.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _instance(name, state, proxy_uri=""):
+    return SimpleNamespace(
+        name=f"{VertexInstanceService.instances_base_path}{name}",
+        state=state,
+        proxy_uri=proxy_uri,
+    )
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    sent = []
+
+    async def send_message(channel_name, message, message_type):
+        sent.append((channel_name, message, message_type))
+
+    monkeypatch.setattr(notebook_status_service, "send_message", send_message)
+    return sent
+
+
+@pytest.fixture
+def notebooks():
+    # skips the service account created for new users
+    with mute_signals(post_save):
+        user = UserFactory()
+    return [
+        Notebook.objects.create(name="a", owner=user, status=NotebookStatus.ACTIVE),
+        Notebook.objects.create(name="b", owner=user, status=NotebookStatus.ACTIVE),
+        Notebook.objects.create(name="c", owner=user, status=NotebookStatus.ACTIVE),
+    ]
+
+
+class TestRefresh:
+    def test_updates_from_one_listing(self, monkeypatch, messages, notebooks):
+        calls = []
+
+        def list_instances():
+            calls.append(1)
+            return {
+                "a": _instance("a", notebooks_v2.State.ACTIVE),
+                "b": _instance("b", notebooks_v2.State.STOPPED, "https://b.proxy"),
+            }
+
+        monkeypatch.setattr(VertexInstanceService, "list_instances", list_instances)
+
+        assert NotebookStatusService.refresh() == 2
+        assert calls == [1]
+
+        statuses = dict(Notebook.objects.values_list("name", "status"))
+        assert statuses == {"a": "ACTIVE", "b": "STOPPED", "c": "DELETED"}
+        assert Notebook.objects.get(name="b").url == "https://b.proxy"
+        assert sorted(m[1]["name"] for m in messages) == ["b", "c"]
+        assert messages[0][0] == f"event-{notebooks[0].owner_id}"
+        assert messages[0][2] == "notebook_status"
+
+
+class TestGetStatus:
+    def test_fresh_status_is_cached(self, monkeypatch, notebooks):
+        notebook = notebooks[0]
+        notebook.status_updated_at = timezone.now()
+
+        def get_status(instance_id):
+            raise AssertionError("Vertex shouldn't be called")
+
+        monkeypatch.setattr(VertexInstanceService, "get_status", get_status)
+
+        assert NotebookStatusService.get_status(notebook) == "ACTIVE"
+
+    def test_stale_status_is_read_again(self, monkeypatch, messages, notebooks):
+        notebook = notebooks[0]
+        notebook.status_updated_at = timezone.now() - timedelta(hours=1)
+        monkeypatch.setattr(
+            VertexInstanceService, "get_status", lambda instance_id: "STOPPED"
+        )
+
+        assert NotebookStatusService.get_status(notebook) == "STOPPED"
+        assert Notebook.objects.get(pk=notebook.pk).status == "STOPPED"
+        assert len(messages) == 1
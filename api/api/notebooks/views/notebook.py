@@ -9,7 +9,12 @@ from api.notebooks.exceptions import (
     NotebookNotFoundException,
 )
 from api.notebooks.models import Notebook
-from api.notebooks.services import VertexInstanceService
+from api.notebooks.enums import NotebookAction
+from api.notebooks.services import (
+    NotebookOperationService,
+    NotebookPoolService,
+    NotebookStatusService,
+)
 from api.notebooks.serializers import NotebookSerializer, StartNotebookSerializer
 from api.utils.pagination import StartEndPagination, SearchQueryPagination
 
@@ -33,58 +38,52 @@ class NotebookViewSet(
         return Notebook.objects.filter(owner=user)
 
     def list(self, request, *args, **kwargs):
+        """
+        Statuses come from the cache kept by the refresh_statuses task,
+        Vertex is only asked for the ones that went stale.
+        """
         queryset = self.filter_queryset(self.get_queryset())
 
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            results = []
-            for notebook in page:
-                notebook_data = self.get_serializer(notebook).data
-                notebook_data["status"] = VertexInstanceService.get_status(
-                    instance_id=notebook_data["name"]
-                )
-                results.append(notebook_data)
+        notebooks = page if page is not None else queryset
+        for notebook in notebooks:
+            NotebookStatusService.get_status(notebook)
 
+        results = self.get_serializer(notebooks, many=True).data
+        if page is not None:
             return self.get_paginated_response(results)
 
-        results = []
-        for notebook in queryset:
-            notebook_data = self.get_serializer(notebook).data
-            notebook_data["status"] = VertexInstanceService.get_status(
-                instance_id=notebook_data["name"]
-            )
-            results.append(notebook_data)
-
         return Response(results)
 
     def perform_create(self, serializer):
-        name = serializer.validated_data["name"]
+        """
+        Claims a warm pool instance when there is one, otherwise only sends
+        the create request. The notebook is STARTING or PROVISIONING until
+        the track_operation task sees the instance serving its proxy url.
+        """
         user = self.request.user
         instance = user.notebooks.first()
 
         if instance:
             raise NotebookAlreadyExistsException()
 
-        instance_url = VertexInstanceService.create_instance(
-            instance_id=name, user=user
-        )
-        serializer.save(name=name, url=instance_url, owner=user)
-
-    def perform_destroy(self, instance):
-        success = VertexInstanceService.destroy_instance(instance_id=instance.name)
-        if success:
-            instance.delete()
+        claimed = NotebookPoolService.claim(user)
+        if claimed is not None:
+            serializer.instance = claimed
+            return
+        NotebookOperationService.create(serializer, user)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        self.perform_destroy(instance)
+        operation = NotebookOperationService.begin(instance, NotebookAction.DESTROY)
         return Response(
             {
-                "detail": _("Notebook '{name}' successfully removed.").format(
+                "detail": _("Notebook '{name}' is being removed.").format(
                     name=instance.name
-                )
+                ),
+                "operation": operation,
             },
-            status=status.HTTP_200_OK,
+            status=status.HTTP_202_ACCEPTED,
         )
 
     @action(
@@ -99,10 +98,15 @@ class NotebookViewSet(
         instance = user.notebooks.filter(pk=pk, owner=user).first()
         if not instance:
             raise NotebookNotFoundException()
-        instance_url = VertexInstanceService.start_instance(instance_id=instance.name)
+        operation = NotebookOperationService.begin(instance, NotebookAction.START)
+        if operation is None:
+            return Response(
+                {"detail": _("Notebook already started"), "url": instance.url},
+                status=status.HTTP_200_OK,
+            )
         return Response(
-            {"detail": _("Notebook started successfully"), "url": instance_url},
-            status=status.HTTP_200_OK,
+            {"detail": _("Notebook is starting"), "operation": operation},
+            status=status.HTTP_202_ACCEPTED,
         )
 
     @action(
@@ -117,10 +121,15 @@ class NotebookViewSet(
         instance = user.notebooks.filter(pk=pk, owner=user).first()
         if not instance:
             raise NotebookNotFoundException()
-        instance_url = VertexInstanceService.stop_instance(instance_id=instance.name)
+        operation = NotebookOperationService.begin(instance, NotebookAction.STOP)
+        if operation is None:
+            return Response(
+                {"detail": _("Notebook already stopped")},
+                status=status.HTTP_200_OK,
+            )
         return Response(
-            {"detail": _("Notebook stopped successfully"), "url": instance_url},
-            status=status.HTTP_200_OK,
+            {"detail": _("Notebook is stopping"), "operation": operation},
+            status=status.HTTP_202_ACCEPTED,
         )
 
     @action(
@@ -135,33 +144,5 @@ class NotebookViewSet(
         instance = user.notebooks.filter(pk=pk, owner=user).first()
         if not instance:
             raise NotebookNotFoundException()
-        instance_status = VertexInstanceService.get_status(instance_id=instance.name)
+        instance_status = NotebookStatusService.get_status(instance)
         return Response({"status": instance_status}, status=status.HTTP_200_OK)
-
-    @action(
-        detail=False,
-        methods=["post"],
-        name="remove_inactives",
-        url_path="remove_inactives",
-        permission_classes=[permissions.AllowAny],
-    )
-    def remove_inactives(self, request, **kwargs):
-        deleted_instances = 0
-        instances = Notebook.objects.all()
-        for instance in instances:
-            instance_status = VertexInstanceService.get_status(instance.name)
-            if instance_status != "STOPPED":
-                continue
-
-            VertexInstanceService.destroy_instance(instance.name)
-            instance.delete()
-            deleted_instances += 1
-
-        return Response(
-            {
-                "detail": _("Deleted {deleted_instances} inactive instances").format(
-                    deleted_instances=deleted_instances
-                )
-            },
-            status=status.HTTP_200_OK,
-        )
@@ -0,0 +1,494 @@
+"""
+Shared HTTP session for every outgoing request to remote files and services.
+
+One requests.Session per process keeps a connection pool per host, so
+previews and downloads from the same provider reuse TLS connections.
+Requests get connect/read timeouts by default and idempotent methods are
+retried with exponential backoff on connection errors and 429/5xx answers.
+
+Urls given by users are read with get_public/request_public instead: every
+redirect hop is resolved and checked to be a public address, and the
+connection is pinned to the checked address so a second DNS answer can't
+point it elsewhere.
+"""
+
+import base64
+import hashlib
+import ipaddress
+import os
+import socket
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_REDIRECTS = 10
+MAX_PINNED_SESSIONS = 64
+
+_session = None
+_pinned_sessions: dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+class BlockedHostError(requests.exceptions.InvalidURL):
+    """The url isn't http(s) or its host resolves to an internal address."""
+
+
+class PinnedAdapter(HTTPAdapter):
+    """
+    Connects to a given address whatever the host of the url, which is
+    still the one sent in the Host header, the TLS SNI and checked against
+    the certificate.
+    """
+
+    def __init__(self, address: str, **kwargs):
+        self.address = address
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        address = self.address
+
+        def pinned(pool_class):
+            class Connection(pool_class.ConnectionCls):
+                def __init__(self, *args, **kwargs):
+                    super().__init__(*args, **kwargs)
+                    self._dns_host = address
+
+            return type(
+                pool_class.__name__, (pool_class,), {"ConnectionCls": Connection}
+            )
+
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: pinned(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+def build_session(address: str = None) -> requests.Session:
+    retry = Retry(
+        total=settings.HTTP_RETRIES,
+        backoff_factor=settings.HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        # only idempotent methods, a POST may have reached the server
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter_kwargs = dict(
+        pool_connections=settings.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    if address:
+        adapter = PinnedAdapter(address, **adapter_kwargs)
+    else:
+        adapter = HTTPAdapter(**adapter_kwargs)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # the session is shared by every user, it mustn't keep cookies
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process wide session, built on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def get_pinned_session(address: str) -> requests.Session:
+    """Process wide session connecting to address, built on first use."""
+    with _lock:
+        if address not in _pinned_sessions:
+            if len(_pinned_sessions) >= MAX_PINNED_SESSIONS:
+                # the oldest one, not closed as it may be in use, its
+                # connections close when it's collected
+                _pinned_sessions.pop(next(iter(_pinned_sessions)))
+            _pinned_sessions[address] = build_session(address)
+        return _pinned_sessions[address]
+
+
+def is_public(address: str) -> bool:
+    return ipaddress.ip_address(address.split("%")[0]).is_global
+
+
+def public_address(url: str) -> str:
+    """
+    Address the url's host resolves to.
+
+    Raises:
+        BlockedHostError: The scheme isn't http(s) or any of the addresses
+            isn't global (loopback, private networks, cloud metadata), unless
+            HTTPS_PROVIDER_ALLOW_PRIVATE_HOSTS.
+        requests.ConnectionError: The host can't be resolved.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ["http", "https"] or not parts.hostname:
+        raise BlockedHostError(f"Url not allowed: {url}")
+
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        addresses = [
+            info[4][0]
+            for info in socket.getaddrinfo(
+                parts.hostname, port, proto=socket.IPPROTO_TCP
+            )
+        ]
+    except (socket.gaierror, UnicodeError) as exc:
+        raise requests.exceptions.ConnectionError(
+            f"Can't resolve {parts.hostname}"
+        ) from exc
+
+    if not settings.HTTPS_PROVIDER_ALLOW_PRIVATE_HOSTS and not all(
+        is_public(address) for address in addresses
+    ):
+        raise BlockedHostError(f"The host {parts.hostname} is not allowed")
+    return addresses[0]
+
+
+def default_timeout() -> tuple[float, float]:
+    return settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Sends a request through the shared session.
+
+    Args:
+        method (str): HTTP method.
+        url (str): Requested url.
+        **kwargs: Passed to requests, timeout defaults to
+            (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT).
+    """
+    kwargs.setdefault("timeout", default_timeout())
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def request_public(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Sends a request to a url given by a user. Redirects are followed here,
+    each hop checked with public_address and sent through a session pinned
+    to the checked address.
+
+    Raises:
+        BlockedHostError: A hop isn't a public http(s) url.
+        requests.TooManyRedirects: More than MAX_REDIRECTS hops.
+    """
+    kwargs.setdefault("timeout", default_timeout())
+    kwargs.pop("allow_redirects", None)
+    for _ in range(MAX_REDIRECTS + 1):
+        session = get_pinned_session(public_address(url))
+        response = session.request(method, url, allow_redirects=False, **kwargs)
+        if not response.is_redirect:
+            return response
+        response.close()
+        url = urllib.parse.urljoin(url, response.headers["Location"])
+    raise requests.exceptions.TooManyRedirects(f"Exceeded {MAX_REDIRECTS} redirects")
+
+
+def get_public(url: str, **kwargs) -> requests.Response:
+    return request_public("GET", url, **kwargs)
+
+
+def connection_stats() -> dict:
+    """
+    Connection reuse of the shared and pinned sessions by host: connections
+    opened and requests sent through them. A reuse ratio close to 0 means
+    every request paid a new handshake.
+    """
+    session = get_session()
+    with _lock:
+        sessions = [session, *_pinned_sessions.values()]
+
+    stats = {}
+    for session in sessions:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                # evicted by another thread since keys() was taken
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = f"{pool.scheme}://{pool.host}:{pool.port}"
+                totals = stats.setdefault(host, dict(connections=0, requests=0))
+                totals["connections"] += pool.num_connections
+                totals["requests"] += pool.num_requests
+
+    for totals in stats.values():
+        requests_sent = totals["requests"]
+        totals["reuse_ratio"] = (
+            1 - totals["connections"] / requests_sent if requests_sent else 0.0
+        )
+    return stats
+
+
+class RangeResponse:
+    """
+    Streamed response that reads a remote file through successive HTTP Range
+    requests: the first one asks for bytes 0..first_size-1 and each following
+    one for as many bytes as already read, so the transfer grows
+    geometrically only while the consumer keeps iterating. Servers that
+    ignore the Range header answer 200 and their response is streamed as is.
+
+    Quacks like the requests.Response used by the preview fetchers:
+    status_code, headers, iter_content, iter_lines and close.
+    """
+
+    iter_lines = requests.Response.iter_lines
+
+    def __init__(self, url: str, first_size: int, **kwargs):
+        self.url = url
+        # ranges must address the stored bytes, not a re-encoded body
+        self.headers_sent = {
+            **kwargs.pop("headers", {}),
+            "Accept-Encoding": "identity",
+        }
+        self.kwargs = kwargs
+        self.encoding = None
+        self.total = None
+
+        self._response = self._get(0, first_size)
+        self.headers = self._response.headers
+        self.ranged = self._response.status_code == 206
+        self.status_code = 200 if self.ranged else self._response.status_code
+        if self.ranged:
+            self.total = self._total_size(self._response)
+            # following ranges fail with 412 if the file changes meanwhile
+            if self.headers.get("ETag"):
+                self.headers_sent["If-Match"] = self.headers["ETag"]
+
+    def _get(self, start: int, size: int) -> requests.Response:
+        headers = {**self.headers_sent, "Range": f"bytes={start}-{start + size - 1}"}
+        return get_public(self.url, stream=True, headers=headers, **self.kwargs)
+
+    @staticmethod
+    def _total_size(response: requests.Response) -> int | None:
+        # Content-Range: bytes 0-99/1234, the total may be "*"
+        total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+        return int(total) if total.isdigit() else None
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False):
+        response = self._response
+        offset = 0
+        while True:
+            size = 0
+            with response:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    size += len(chunk)
+                    yield chunk
+
+            offset += size
+            if not self.ranged or size == 0:
+                return
+            if self.total is not None and offset >= self.total:
+                return
+
+            response = self._get(offset, offset)
+            if response.status_code == 416:
+                response.close()
+                return
+            if response.status_code != 206:
+                response.close()
+                raise requests.HTTPError(
+                    f"Range request failed with status {response.status_code}",
+                    response=response,
+                )
+            self._response = response
+
+    def close(self) -> None:
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def stream(url: str, ranged: bool = False, **kwargs):
+    """
+    Opens a streamed GET of a url given by a user. With ranged the content
+    is read through HTTP Range requests of growing size, starting at
+    HTTP_RANGE_FIRST_SIZE bytes, for reads that only need the head of the
+    file.
+    """
+    if ranged:
+        return RangeResponse(url, settings.HTTP_RANGE_FIRST_SIZE, **kwargs)
+    return get_public(url, stream=True, **kwargs)
+
+
+def fetch_all(
+    urls: list, fetch, workers: int, validate=None, cancel: threading.Event = None
+) -> list:
+    """
+    Calls fetch(url) for every url concurrently from a pool of up to
+    workers threads, so reading many small files costs about as much as
+    the slowest one.
+
+    Args:
+        urls (list[str]): Urls to fetch.
+        fetch: Function reading one url.
+        workers (int): Maximum concurrent fetches.
+        validate: Optional function called with each result as soon as it
+            arrives, in completion order.
+        cancel: Event set on failure, for fetches writing to a shared
+            resource. They must return soon after it's set, the running
+            ones are waited for before the failure is re-raised.
+
+    Returns:
+        (list): Results in the order of the urls.
+
+    The first exception raised by fetch or validate is re-raised right
+    away (once the running fetches return, with cancel), fetches that
+    didn't start yet are cancelled.
+    """
+    results = [None] * len(urls)
+    executor = ThreadPoolExecutor(max(1, min(workers, len(urls))))
+    try:
+        futures = {executor.submit(fetch, url): idx for idx, url in enumerate(urls)}
+        for future in as_completed(futures):
+            result = future.result()
+            if validate is not None:
+                validate(result)
+            results[futures[future]] = result
+    except BaseException:
+        if cancel is not None:
+            cancel.set()
+        raise
+    finally:
+        executor.shutdown(wait=cancel is not None, cancel_futures=True)
+    return results
+
+
+class DownloadError(Exception):
+    """A ranged download couldn't be completed or doesn't match its checksum."""
+
+
+def download_part(
+    url: str,
+    fd: int,
+    start: int,
+    end: int,
+    headers: dict,
+    retries: int,
+    cancel: threading.Event,
+) -> None:
+    """
+    Downloads bytes start..end of the url into the file descriptor at the
+    same offsets. A part interrupted midway is resumed from the last byte
+    written, giving up after retries attempts in a row that wrote nothing.
+    Stops between chunks once cancel is set.
+    """
+    position = start
+    failures = 0
+    while position <= end and not cancel.is_set():
+        attempt_start = position
+        range_headers = {**headers, "Range": f"bytes={position}-{end}"}
+        try:
+            with get_public(url, stream=True, headers=range_headers) as r:
+                content_range = r.headers.get("Content-Range", "")
+                if r.status_code != 206 or not content_range.startswith(
+                    f"bytes {position}-"
+                ):
+                    raise DownloadError(
+                        f"Unexpected answer to range {position}-{end}: "
+                        f"{r.status_code} {content_range}"
+                    )
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if cancel.is_set():
+                        return
+                    chunk = chunk[: end + 1 - position]
+                    os.pwrite(fd, chunk, position)
+                    position += len(chunk)
+                if position == attempt_start:
+                    raise DownloadError(f"Empty answer to range {position}-{end}")
+        except (requests.RequestException, DownloadError) as exc:
+            # the retries bound consecutive attempts that wrote nothing
+            if position > attempt_start:
+                failures = 0
+            failures += 1
+            if failures > retries:
+                raise DownloadError(str(exc)) from exc
+            cancel.wait(settings.HTTP_BACKOFF_FACTOR * 2 ** (failures - 1))
+        else:
+            failures = 0
+
+
+def parallel_download(
+    url: str,
+    file,
+    size: int,
+    workers: int,
+    part_size: int,
+    etag: str = None,
+    md5: str = None,
+) -> None:
+    """
+    Downloads a file of a known size with concurrent Range requests, each
+    connection writing its parts straight at their offsets of the file.
+
+    Args:
+        url (str): File url, the server must accept byte ranges.
+        file: Open binary file with a file descriptor.
+        size (int): Content-Length of the file.
+        workers (int): Concurrent connections.
+        part_size (int): Bytes requested by each range.
+        etag (str): Ranges are requested with If-Match, so a file that
+            changes during the download fails instead of being mixed.
+        md5 (str): Base64 MD5 (Content-MD5) the content is checked against.
+
+    Raises:
+        DownloadError: A part failed after its retries, or the checksum
+            doesn't match.
+    """
+    headers = {"Accept-Encoding": "identity"}
+    if etag:
+        headers["If-Match"] = etag
+
+    fd = file.fileno()
+    os.ftruncate(fd, size)
+    parts = [
+        (start, min(start + part_size, size) - 1) for start in range(0, size, part_size)
+    ]
+    # a failed part stops the others, none writes to fd once this returns
+    cancel = threading.Event()
+    fetch_all(
+        parts,
+        lambda part: download_part(
+            url, fd, part[0], part[1], headers, settings.HTTP_DOWNLOAD_RETRIES, cancel
+        ),
+        workers,
+        cancel=cancel,
+    )
+
+    file.seek(0)
+    if md5:
+        digest = hashlib.md5()
+        while chunk := file.read(DOWNLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+        file.seek(0)
+        if base64.b64encode(digest.digest()).decode() != md5:
+            raise DownloadError("Checksum mismatch")
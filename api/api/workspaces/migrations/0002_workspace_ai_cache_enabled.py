@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-19 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("workspaces", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="workspace",
+            name="ai_cache_enabled",
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -103,6 +103,8 @@ class Workspace(BaseModel):
     )
     ai_provider = models.CharField(max_length=50, blank=True, default="")
     ai_model = models.CharField(max_length=100, blank=True, default="")
+    # answers to chats of members may be served from the shared response cache
+    ai_cache_enabled = models.BooleanField(default=True)
     created_by = models.ForeignKey(
         "users.User", on_delete=models.PROTECT, related_name="created_workspaces"
     )
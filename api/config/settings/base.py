@@ -375,11 +375,152 @@ AI_PROVIDER = os.getenv("AI_PROVIDER", "openai")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Streamed chat answers are sent to the WebSocket in batches, at most one
+# message per AI_STREAM_FLUSH_INTERVAL seconds.
+AI_STREAM_FLUSH_INTERVAL = env.float("AI_STREAM_FLUSH_INTERVAL", 0.1)
+# Chat prompts describe at most AI_CONTEXT_MAX_COLUMNS columns of the
+# table, the ones closest to the question (see api/api/ai/context.py).
+AI_CONTEXT_MAX_COLUMNS = env.int("AI_CONTEXT_MAX_COLUMNS", 60)
+# Self-hosted Ollama: each process sends at most OLLAMA_MAX_CONCURRENCY
+# generations at a time per server, others wait up to OLLAMA_QUEUE_TIMEOUT
+# seconds for a slot. OLLAMA_KEEP_ALIVE keeps the model loaded between
+# requests ("30m", or -1 to pin it).
+OLLAMA_MAX_CONCURRENCY = env.int("OLLAMA_MAX_CONCURRENCY", 1)
+OLLAMA_QUEUE_TIMEOUT = env.float("OLLAMA_QUEUE_TIMEOUT", 60)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# AI_PROVIDER=router: requests go to the cheapest healthy provider of
+# AI_ROUTER_PROVIDERS (cheapest first) and fail over to the next ones. A
+# provider's circuit opens after AI_ROUTER_FAILURE_THRESHOLD failures in a
+# row or an error rate of AI_ROUTER_MAX_ERROR_RATE over its last
+# AI_ROUTER_WINDOW requests, and is tried again after AI_ROUTER_COOLDOWN
+# seconds. Requests without an answer after AI_ROUTER_HEDGE_DELAY seconds
+# (0 disables it) are also sent to the next provider; providers with a p95
+# latency over AI_ROUTER_SLOW_P95 seconds (0 disables it) are tried last.
+AI_ROUTER_PROVIDERS = env.list("AI_ROUTER_PROVIDERS", default=["groq", "openai"])
+AI_ROUTER_WINDOW = env.int("AI_ROUTER_WINDOW", 100)
+AI_ROUTER_FAILURE_THRESHOLD = env.int("AI_ROUTER_FAILURE_THRESHOLD", 5)
+AI_ROUTER_MAX_ERROR_RATE = env.float("AI_ROUTER_MAX_ERROR_RATE", 0.5)
+AI_ROUTER_COOLDOWN = env.float("AI_ROUTER_COOLDOWN", 30)
+AI_ROUTER_HEDGE_DELAY = env.float("AI_ROUTER_HEDGE_DELAY", 5)
+AI_ROUTER_SLOW_P95 = env.float("AI_ROUTER_SLOW_P95", 0)
 
 GOOGLE_DRIVE_KEY = os.getenv("GOOGLE_DRIVE_KEY")
 
 FILE_UPLOAD_LIMIT = 100_000_000
 
+# Outgoing HTTP (api/utils/http.py) — one pooled session per process for
+# remote files and AI services. Timeouts are in seconds; retries only apply
+# to idempotent methods, backing off HTTP_BACKOFF_FACTOR * 2 ** (retry - 1).
+HTTP_CONNECT_TIMEOUT = env.float("HTTP_CONNECT_TIMEOUT", 5)
+HTTP_READ_TIMEOUT = env.float("HTTP_READ_TIMEOUT", 60)
+HTTP_RETRIES = env.int("HTTP_RETRIES", 3)
+HTTP_BACKOFF_FACTOR = env.float("HTTP_BACKOFF_FACTOR", 0.5)
+HTTP_POOL_CONNECTIONS = env.int("HTTP_POOL_CONNECTIONS", 10)
+HTTP_POOL_MAXSIZE = env.int("HTTP_POOL_MAXSIZE", 20)
+
+# Url previews read the head of remote files through Range requests, the
+# first one of HTTP_RANGE_FIRST_SIZE bytes, each following one doubling
+# what was read, until enough preview lines are parsed.
+DATASETS_PREVIEW_RANGE_REQUESTS = env.bool("DATASETS_PREVIEW_RANGE_REQUESTS", True)
+HTTP_RANGE_FIRST_SIZE = env.int("HTTP_RANGE_FIRST_SIZE", 64 * 1024)
+# Files of a folder previewed concurrently
+DATASETS_PREVIEW_WORKERS = env.int("DATASETS_PREVIEW_WORKERS", 8)
+
+# Files from generic HTTPS urls of at least HTTP_PARALLEL_DOWNLOAD_MIN_SIZE
+# bytes, served with Accept-Ranges, are downloaded over HTTP_DOWNLOAD_WORKERS
+# connections in parts of HTTP_DOWNLOAD_PART_SIZE, each part resumed up to
+# HTTP_DOWNLOAD_RETRIES times.
+HTTP_PARALLEL_DOWNLOAD_MIN_SIZE = env.int(
+    "HTTP_PARALLEL_DOWNLOAD_MIN_SIZE", 16 * 1024 * 1024
+)
+HTTP_DOWNLOAD_WORKERS = env.int("HTTP_DOWNLOAD_WORKERS", 4)
+HTTP_DOWNLOAD_PART_SIZE = env.int("HTTP_DOWNLOAD_PART_SIZE", 8 * 1024 * 1024)
+HTTP_DOWNLOAD_RETRIES = env.int("HTTP_DOWNLOAD_RETRIES", 3)
+# Urls given by users (and every redirect they lead to) resolving to
+# loopback/private addresses are rejected, see http.request_public
+HTTPS_PROVIDER_ALLOW_PRIVATE_HOSTS = env.bool(
+    "HTTPS_PROVIDER_ALLOW_PRIVATE_HOSTS", False
+)
+
+# Concurrent head_object calls when listing S3 folders, only objects whose
+# content type can't be told from the extension are requested.
+S3_HEAD_OBJECT_WORKERS = env.int("S3_HEAD_OBJECT_WORKERS", 8)
+
+# Provider metadata/preview cache — folder listings, file metadata and url
+# previews are cached by normalized url and object version (ETag, GCS
+# generation, Drive modifiedTime). With PROVIDER_CACHE_URL it's shared by
+# every worker through Redis (bound it with maxmemory + allkeys-lru), else
+# each process keeps its own LRU of PROVIDER_CACHE_MAX_ENTRIES.
+PROVIDER_CACHE_ALIAS = "providers"
+PROVIDER_CACHE_URL = os.getenv("PROVIDER_CACHE_URL")
+PROVIDER_CACHE_TIMEOUT = env.int("PROVIDER_CACHE_TIMEOUT", 60)
+PROVIDER_PREVIEW_CACHE_TIMEOUT = env.int("PROVIDER_PREVIEW_CACHE_TIMEOUT", 300)
+PROVIDER_CACHE_MAX_ENTRIES = env.int("PROVIDER_CACHE_MAX_ENTRIES", 1000)
+PROVIDER_CACHE_MAX_ENTRY_SIZE = env.int("PROVIDER_CACHE_MAX_ENTRY_SIZE", 1024 * 1024)
+if PROVIDER_CACHE_URL:
+    PROVIDER_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": PROVIDER_CACHE_URL,
+        "KEY_PREFIX": "glapagos",
+    }
+else:
+    PROVIDER_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "providers",
+        "OPTIONS": {"MAX_ENTRIES": PROVIDER_CACHE_MAX_ENTRIES},
+    }
+
+# AI chat response cache — answers keyed by normalized question, table path,
+# schema hash and provider/model (see api/api/ai/cache.py). Shared through
+# Redis with AI_CACHE_URL, else a per-process LRU of AI_CACHE_MAX_ENTRIES.
+AI_CACHE_ALIAS = "ai"
+AI_CACHE_URL = os.getenv("AI_CACHE_URL")
+AI_CACHE_ENABLED = env.bool("AI_CACHE_ENABLED", True)
+AI_CACHE_TIMEOUT = env.int("AI_CACHE_TIMEOUT", 86400)
+AI_CACHE_MAX_ENTRIES = env.int("AI_CACHE_MAX_ENTRIES", 1000)
+AI_CACHE_MAX_ENTRY_SIZE = env.int("AI_CACHE_MAX_ENTRY_SIZE", 64 * 1024)
+if AI_CACHE_URL:
+    AI_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": AI_CACHE_URL,
+        "KEY_PREFIX": "glapagos",
+    }
+else:
+    AI_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ai",
+        "OPTIONS": {"MAX_ENTRIES": AI_CACHE_MAX_ENTRIES},
+    }
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    PROVIDER_CACHE_ALIAS: PROVIDER_CACHE,
+    AI_CACHE_ALIAS: AI_CACHE,
+}
+
+# Compressed uploads (.gz/.zst) — FILE_UPLOAD_LIMIT applies to the compressed
+# size, these bound what a single upload may expand to while decompressing.
+FILE_DECOMPRESSED_SIZE_LIMIT = env.int("FILE_DECOMPRESSED_SIZE_LIMIT", 2_000_000_000)
+FILE_DECOMPRESSION_RATIO_LIMIT = env.int("FILE_DECOMPRESSION_RATIO_LIMIT", 100)
+
+# Columnar load stage — when enabled, CSV/JSON uploads with a confirmed
+# schema are streamed into Parquet (one row group per block read) before
+# being loaded into BigQuery with SourceFormat.PARQUET.
+DATASETS_PARQUET_CONVERSION = env.bool("DATASETS_PARQUET_CONVERSION", False)
+DATASETS_PARQUET_BLOCK_SIZE = env.int("DATASETS_PARQUET_BLOCK_SIZE", 8 * 1024 * 1024)
+DATASETS_PARQUET_ROW_GROUP_SIZE = env.int("DATASETS_PARQUET_ROW_GROUP_SIZE", 100_000)
+
+# Memory budget, in bytes, for the streamed CSV parse done while validating
+# uploads. Files are read in blocks sized from it regardless of their size.
+DATASETS_CSV_MEMORY_BUDGET = env.int("DATASETS_CSV_MEMORY_BUDGET", 64 * 1024 * 1024)
+
+# Rows sampled (split between the head, middle and tail of each column) to
+# infer the BigQuery types shown in previews.
+DATASETS_SCHEMA_SAMPLE_SIZE = env.int("DATASETS_SCHEMA_SAMPLE_SIZE", 1000)
+
+# Share of the sampled values a type must fit to be inferred despite a few
+# outliers, reported as its confidence. Below it the column is a STRING.
+DATASETS_SCHEMA_TYPE_THRESHOLD = env.float("DATASETS_SCHEMA_TYPE_THRESHOLD", 0.99)
+
 SECURED_FIELDS_KEY = os.getenv("SECURED_FIELDS_KEY")
 SECURED_FIELDS_HASH_SALT = os.getenv("SECURED_FIELDS_HASH_SALT")
 
@@ -393,3 +534,55 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+
+# Notebook states are cached on the Notebook rows by a beat task listing
+# every instance once per NOTEBOOK_STATUS_POLL_INTERVAL seconds. Requests
+# read the cache and only ask Vertex when it's older than
+# NOTEBOOK_STATUS_MAX_AGE (e.g. beat isn't running).
+NOTEBOOK_STATUS_POLL_INTERVAL = env.int("NOTEBOOK_STATUS_POLL_INTERVAL", 30)
+NOTEBOOK_STATUS_MAX_AGE = env.int("NOTEBOOK_STATUS_MAX_AGE", 120)
+
+# Create/start/stop/destroy return right away with the Vertex operation
+# name, the track_operation task polls it every NOTEBOOK_OPERATION_POLL_INTERVAL
+# seconds and gives up after NOTEBOOK_OPERATION_TIMEOUT.
+NOTEBOOK_OPERATION_POLL_INTERVAL = env.int("NOTEBOOK_OPERATION_POLL_INTERVAL", 10)
+NOTEBOOK_OPERATION_TIMEOUT = env.int("NOTEBOOK_OPERATION_TIMEOUT", 900)
+
+# Warm pool of stopped instances claimed by new notebooks. Its size follows
+# the notebooks requested in the last NOTEBOOK_POOL_DEMAND_WINDOW seconds,
+# bounded by MIN/MAX (MAX 0 disables the pool); instances unclaimed for
+# NOTEBOOK_POOL_MAX_IDLE seconds are destroyed. They run as
+# NOTEBOOK_POOL_SERVICE_ACCOUNT until claimed.
+NOTEBOOK_POOL_MIN_SIZE = env.int("NOTEBOOK_POOL_MIN_SIZE", 0)
+NOTEBOOK_POOL_MAX_SIZE = env.int("NOTEBOOK_POOL_MAX_SIZE", 0)
+NOTEBOOK_POOL_DEMAND_WINDOW = env.int("NOTEBOOK_POOL_DEMAND_WINDOW", 3600)
+NOTEBOOK_POOL_MAX_IDLE = env.int("NOTEBOOK_POOL_MAX_IDLE", 86400)
+NOTEBOOK_POOL_INTERVAL = env.int("NOTEBOOK_POOL_INTERVAL", 300)
+NOTEBOOK_POOL_SERVICE_ACCOUNT = os.getenv("NOTEBOOK_POOL_SERVICE_ACCOUNT")
+
+# Instances stopped (updateTime) for NOTEBOOK_REAPER_MIN_STOPPED seconds are
+# deleted by a beat task every NOTEBOOK_REAPER_INTERVAL seconds, up to
+# NOTEBOOK_REAPER_WORKERS deletions at a time. A dry run only logs them.
+NOTEBOOK_REAPER_INTERVAL = env.int("NOTEBOOK_REAPER_INTERVAL", 1800)
+NOTEBOOK_REAPER_MIN_STOPPED = env.int("NOTEBOOK_REAPER_MIN_STOPPED", 1800)
+NOTEBOOK_REAPER_WORKERS = env.int("NOTEBOOK_REAPER_WORKERS", 8)
+NOTEBOOK_REAPER_DRY_RUN = env.bool("NOTEBOOK_REAPER_DRY_RUN", False)
+
+# Default periodic tasks, DatabaseScheduler syncs them into django_celery_beat
+CELERY_BEAT_SCHEDULE = {
+    "refresh-notebook-statuses": {
+        "task": "notebooks.refresh_statuses",
+        "schedule": NOTEBOOK_STATUS_POLL_INTERVAL,
+        "options": {"expires": NOTEBOOK_STATUS_POLL_INTERVAL},
+    },
+    "maintain-notebook-pool": {
+        "task": "notebooks.maintain_pool",
+        "schedule": NOTEBOOK_POOL_INTERVAL,
+        "options": {"expires": NOTEBOOK_POOL_INTERVAL},
+    },
+    "reap-inactive-notebooks": {
+        "task": "notebooks.reap_inactive",
+        "schedule": NOTEBOOK_REAPER_INTERVAL,
+        "options": {"expires": NOTEBOOK_REAPER_INTERVAL},
+    },
+}
@@ -28,7 +28,9 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "",
-    }
+    },
+    PROVIDER_CACHE_ALIAS: PROVIDER_CACHE,  # NOQA
+    AI_CACHE_ALIAS: AI_CACHE,  # NOQA
 }
 
 # Templates